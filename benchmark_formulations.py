@@ -0,0 +1,110 @@
+"""
+Compares model size, build time and solve time across the values of one setting, e.g.
+
+    python benchmark_formulations.py examples/test1 ROCOF_FORMULATION full system_inertia
+
+The fleet can be enlarged with FLEET_MULTIPLIER=<n> in the environment, which copies every unit
+n times and scales demand by n, so that the growth of each formulation can be seen.
+"""
+import denkiuc.uc_model as uc
+import denkiuc.build_profiler as bp
+import os
+import shutil
+import sys
+import tempfile
+import time
+import pandas as pd
+
+
+def benchmark_setting(prob_path, setting, values, fleet_multiplier=1):
+    summary = dict()
+
+    for value in values:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            inputs_path = os.path.join(temp_dir, 'inputs')
+            shutil.copytree(prob_path, inputs_path)
+            scale_fleet(inputs_path, fleet_multiplier)
+            override_setting(inputs_path, setting, value)
+
+            time_start = time.perf_counter()
+            prob = uc.run_opt_problem('%s_%s' % (setting, value), inputs_path,
+                                      os.path.join(temp_dir, 'outputs'))
+            total_time = time.perf_counter() - time_start
+
+        build_profile_df = bp.build_profile_to_df(prob['stats'])
+
+        summary[value] = {
+            'Rows': build_profile_df['Rows'].sum(),
+            'Nonzeros': build_profile_df['Nonzeros'].sum(),
+            'BuildTime_s': build_profile_df['WallTime_s'].sum(),
+            'SolverTime_s': prob['stats']['solver_time'],
+            'TotalTime_s': total_time,
+            'Status': prob['stats']['optimality_status'],
+            'ObjFnValue': prob['stats']['obj_fn_value']
+            }
+
+    summary_df = pd.DataFrame(summary).T
+    summary_df.index.name = setting
+
+    return summary_df
+
+
+def override_setting(inputs_path, setting, value):
+    settings_path = os.path.join(inputs_path, 'settings.csv')
+    settings_df = pd.read_csv(settings_path, index_col=0)
+
+    if setting not in settings_df.index:
+        default_settings_path = \
+            os.path.join(os.path.dirname(uc.__file__), 'default_files', 'settings.csv')
+        default_settings_df = pd.read_csv(default_settings_path, index_col=0)
+        settings_df.loc[setting] = default_settings_df.loc[setting]
+
+    settings_df.loc[setting, 'Value'] = value
+    settings_df.to_csv(settings_path)
+
+
+def scale_fleet(inputs_path, fleet_multiplier):
+    if fleet_multiplier == 1:
+        return
+
+    def copy_units(file_name):
+        file_path = os.path.join(inputs_path, file_name)
+        if not os.path.exists(file_path):
+            return
+
+        unit_df = pd.read_csv(file_path, index_col=0)
+        copies = list()
+        for n in range(fleet_multiplier):
+            copy_df = unit_df.copy()
+            copy_df.index = ['%s_%d' % (u, n) for u in unit_df.index]
+            copies.append(copy_df)
+
+        unit_df = pd.concat(copies)
+        unit_df.index.name = 'Unit'
+        unit_df.to_csv(file_path)
+
+    copy_units('unit_data.csv')
+    copy_units('initial_state.csv')
+
+    demand_path = os.path.join(inputs_path, 'demand.csv')
+    demand_df = pd.read_csv(demand_path, index_col=0)
+    demand_df = demand_df * fleet_multiplier
+    demand_df.to_csv(demand_path)
+
+
+def main():
+    if len(sys.argv) < 4:
+        print('Usage: python benchmark_formulations.py <prob_path> <SETTING> <value> [<value> ...]')
+        exit()
+
+    prob_path, setting, values = sys.argv[1], sys.argv[2], sys.argv[3:]
+    fleet_multiplier = int(os.environ.get('FLEET_MULTIPLIER', 1))
+
+    summary_df = benchmark_setting(prob_path, setting, values, fleet_multiplier)
+
+    print('\nBenchmark of %s (fleet multiplier %d)' % (setting, fleet_multiplier))
+    print(summary_df.to_string())
+
+
+if __name__ == '__main__':
+    main()
@@ -13,7 +13,7 @@ def add_custom_results(data, results, results_path, settings, sets):
 
     if settings['INCL_UNIT_COMMITMENT']:
         new_results['inertia_dispatch'] = add_inertia_dispatch(data, results)
-        new_results['max_rocof'] = add_maximum_rocof(data, new_results, settings)
+        new_results['max_rocof'] = add_maximum_rocof(data, results, settings)
 
     for name, result in new_results.items():
         # result = result.round(3)
@@ -26,12 +26,28 @@ def add_custom_results(data, results, results_path, settings, sets):
     return results
 
 
+def write_inertia_results(data, vars, results_path, settings):
+    """
+    Writes the inertia dispatch and maximum RoCoF of the solution, from the num_committed
+    result (with the look ahead).
+    """
+    results = {'num_committed': vars['num_committed'].result_df}
+    inertia_results = {'inertia_dispatch': add_inertia_dispatch(data, results),
+                       'max_rocof': add_maximum_rocof(data, results, settings)}
+
+    for name, result in inertia_results.items():
+        result.to_csv(os.path.join(results_path, name + '.csv'))
+
+    print("Inertia dispatch and maximum RoCoF written")
+
+
 def add_charge_losses(data, results):
+    params = data['params']
     charge_losses = results['charge_after_losses'].copy()
 
     for col in charge_losses.columns.to_list():
         u = col[1]
-        rt_eff = data['units']['RTEfficiency'][u]
+        rt_eff = params.units['RTEfficiency'][params.unit_pos[u]]
         charge_losses[col] = charge_losses[col] * (1 - rt_eff) / rt_eff
 
     return charge_losses
@@ -42,55 +58,60 @@ def add_total_charge_load(results, new_results):
     return total_charge_load
 
 
-def add_inertia_dispatch(data, results):
-    inertia_dispatch = results['num_commited'].copy()
+def unit_tensor(result_df, scenarios, units):
+    """
+    A result with (scenario, unit) columns as an (interval, scenario, unit) array.
+    """
+    cols = pd.MultiIndex.from_product([scenarios, units])
+    return result_df[cols].to_numpy(dtype=float).reshape(len(result_df), len(scenarios), -1)
+
 
-    for col in inertia_dispatch.columns:
-        for i in inertia_dispatch.index:
-            u = col[1]
-            inertia_dispatch.loc[i, col] = \
-                inertia_dispatch.loc[i, col] \
-                * data['units']['InertialConst_s'][u] * data['units']['Capacity_MW'][u]
+def add_inertia_dispatch(data, results):
+    params = data['params']
+    num_committed = results['num_committed']
+    units = num_committed.columns.get_level_values(1)
+    inertia_per_unit = params.units['InertialConst_s'] * params.units['Capacity_MW']
 
-    scenarios = set([c[0] for c in inertia_dispatch.columns])
-    for s in scenarios:
-        filtered_cols = [c for c in inertia_dispatch.columns if c[0] == s]
-        inertia_dispatch[(s, 'SystemInertia')] = inertia_dispatch[filtered_cols].sum(axis=1)
+    inertia_dispatch = \
+        num_committed.astype(float) * inertia_per_unit[[params.unit_pos[u] for u in units]]
 
-    return inertia_dispatch
+    system_inertia = inertia_dispatch.groupby(level=0, axis=1).sum()
+    system_inertia.columns = pd.MultiIndex.from_product([system_inertia.columns, ['SystemInertia']])
 
+    return pd.concat([inertia_dispatch, system_inertia], axis=1)
 
-def add_maximum_rocof(data, new_results, settings):
-    df_cols = ['MaxRocof', 'RocofLimit', 'ResponsibleUnit']
-    df_index = new_results['inertia_dispatch'].index
-    max_rocof_df = pd.DataFrame(index=df_index, columns=df_cols)
 
-    max_rocof_df.loc[:, 'RocofLimit'] = settings['MAX_ROCOF']
+def add_maximum_rocof(data, results, settings):
+    """
+    The RoCoF if the largest (committed) unit fails, in the worst scenario of each interval:
+    the size of the failed unit x frequency / (2 x the inertia of the other units).
+    """
+    import numpy as np
 
-    df_cols = new_results['inertia_dispatch'].columns
-    units = set([c[1] for c in df_cols if c[1] != 'SystemInertia'])
-    scenarios = set([c[0] for c in df_cols if c[1] != 'SystemInertia'])
+    params = data['params']
+    num_committed = results['num_committed']
+    scenarios = num_committed.columns.unique(level=0)
+    units = num_committed.columns.unique(level=1)
+    unit_pos = [params.unit_pos[u] for u in units]
 
-    for i in new_results['inertia_dispatch'].index:
-        max_rocof = 0
-        for s in scenarios:
-            system_inertia = new_results['inertia_dispatch'][(s, 'SystemInertia')][i]
-            for u in units:
-                units_inertia = new_results['inertia_dispatch'][(s, u)][i]
-                available_inertia = system_inertia - units_inertia
-                contingency_size = \
-                    new_results['inertia_dispatch'][(s, u)][i] \
-                    / data['units']['InertialConst_s'][u]
+    num_committed = unit_tensor(num_committed, scenarios, units)
+    contingency_size = num_committed * params.units['Capacity_MW'][unit_pos]
+    inertia = contingency_size * params.units['InertialConst_s'][unit_pos]
+    available_inertia = inertia.sum(axis=2, keepdims=True) - inertia
 
-                rocof_in_units_failure = \
-                    contingency_size * settings['SYSTEM_FREQUENCY'] / (2 * available_inertia)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rocof = np.where(contingency_size > 0,
+                         contingency_size * settings['SYSTEM_FREQUENCY'] / (2 * available_inertia),
+                         0)
 
-                if rocof_in_units_failure > max_rocof:
-                    max_rocof = rocof_in_units_failure
-                    responsible_unit = u
+    rocof = rocof.reshape(len(rocof), -1)
+    worst = rocof.argmax(axis=1)
+    max_rocof = rocof[np.arange(len(rocof)), worst]
 
-            max_rocof_df.loc[i, 'MaxRocof'] = max_rocof
-            max_rocof_df.loc[i, 'ResponsibleUnit'] = responsible_unit
+    max_rocof_df = pd.DataFrame(index=results['num_committed'].index)
+    max_rocof_df['MaxRocof'] = max_rocof
+    max_rocof_df['RocofLimit'] = settings['MAX_ROCOF']
+    max_rocof_df['ResponsibleUnit'] = np.where(max_rocof > 0, units[worst % len(units)], None)
 
     return max_rocof_df
 
@@ -128,11 +149,16 @@ def add_final_state(data, vars, sets, paths):
         final_state['power_generated'].loc[u] = \
             vars['power_generated'].result_df[(first_scenario, u)][final_interval]
 
+    params = data['params']
+    storage_capacity_MWh = \
+        params.unit_values('Capacity_MW', 'units_storage') \
+        * params.unit_values('StorageCap_h', 'units_storage')
+
     final_state['storage_fraction'] = pd.Series(index=sets['units_storage'].indices)
-    for u in sets['units_storage'].indices:
+    for k, u in enumerate(sets['units_storage'].indices):
         final_state['storage_fraction'].loc[u] = \
             vars['energy_in_reservoir'].result_df[(first_scenario, u)][final_interval] \
-            / (data['units']['Capacity_MW'][u] * data['units']['StorageCap_h'][u])
+            / storage_capacity_MWh[k]
     return final_state
 
 
@@ -3,13 +3,18 @@ import pandas as pd
 import denkiuc.misc_functions as mf
 import sys
 
+# Changes whenever the same inputs and seed would give different traces, so that traces
+# stored by an earlier version are not reused
+generator_version = 2
+
 
 def main(paramters):
     trace_locations = load_trace_locations(paramters['INPUT_FOLDER'])
     deterministic_traces = load_deterministic_traces(trace_locations, paramters['INPUT_FOLDER'])
     arma_vals_df = load_arma_values(paramters['INPUT_FOLDER'])
     stochastic_traces = add_arma_scenarios(paramters, deterministic_traces, arma_vals_df)
-    write_traces_to_sql(stochastic_traces, paramters)
+
+    return stochastic_traces
 
 
 def load_trace_locations(INPUT_FOLDER):
@@ -47,72 +52,127 @@ def load_arma_values(INPUT_FOLDER):
 
 
 def add_arma_scenarios(paramters, deterministic_traces, arma_vals_df):
+    """
+    The ARMA scenarios of each trace (see stream_arma_scenarios), generated in one chunk.
+    """
     import numpy as np
 
-    def fill_arma_vals(scenario_indices, new_traces, deterministic_trace):
-        for scenario in scenario_indices[1:]:
-            new_traces.loc[:, scenario] = deterministic_trace
+    stochastic_traces = dict()
+    num_intervals = len(list(deterministic_traces.values())[0])
+    chunks = list(stream_arma_scenarios(paramters, deterministic_traces, arma_vals_df,
+                                        max(num_intervals, 1)))
 
-            forecast_error = [0] * len(new_traces)
+    for trace_name, deterministic_trace in deterministic_traces.items():
+        stochastic_traces[trace_name] = \
+            pd.DataFrame(np.concatenate([chunk[trace_name] for start, chunk in chunks]),
+                         index=deterministic_trace.index,
+                         columns=list(range(paramters['NUM_SCENARIOS'])))
 
-            distribution = np.random.normal(0, arma_sigma, len(new_traces))
+    return stochastic_traces
 
-            for j, i in enumerate(new_traces.index.to_list()[1:]):
-                forecast_error[j+1] = \
-                    arma_alpha * forecast_error[j] \
-                    + distribution[j+1] + distribution[j] * arma_beta
 
-                if trace_name == 'demand':
-                    new_traces.loc[i, scenario] = (1 + forecast_error[j+1]) * new_traces.loc[i, 0]
-                elif trace_name in ['wind', 'solarPV']:
-                    new_traces.loc[i, scenario] = forecast_error[j+1] + new_traces.loc[i, 0]
+def stream_arma_scenarios(paramters, deterministic_traces, arma_vals_df, chunk_intervals):
+    """
+    Yields (first interval position, {trace name: (interval, scenario) array}) for each chunk of
+    chunk_intervals intervals. Scenario 0 of each trace is the deterministic trace, and the other
+    scenarios add an ARMA(1,1) forecast error to it (multiplicative for demand, additive for
+    wind and solarPV), which is zero in the first interval. Each scenario of each trace draws
+    its noise from its own generator, seeded with RANDOM_SEED, the trace name and the scenario,
+    so a seed gives the same traces bit for bit on every run, whatever the chunk size and
+    however many scenarios are generated.
+    """
+    trace_chunks = dict()
 
-        return new_traces
+    for trace_name, deterministic_trace in deterministic_traces.items():
+        random_generators = \
+            scenario_random_generators(paramters['RANDOM_SEED'], trace_name,
+                                       paramters['NUM_SCENARIOS'])
+        trace_chunks[trace_name] = \
+            arma_trace_chunks(trace_name, deterministic_trace.iloc[:, 0].to_numpy(dtype=float),
+                              arma_vals_df[trace_name], random_generators, chunk_intervals)
 
-    def enforce_limits(new_traces, trace_name):
-        if trace_name in ['wind', 'solarPV']:
-            new_traces = new_traces.clip(lower=0, upper=1)
-        if trace_name in ['demand']:
-            new_traces = new_traces.clip(lower=0)
+    num_intervals = len(list(deterministic_traces.values())[0])
 
-        return new_traces
+    for start in range(0, num_intervals, chunk_intervals):
+        yield start, {trace_name: next(chunks) for trace_name, chunks in trace_chunks.items()}
 
-    np.random.seed(paramters['RANDOM_SEED'])
-    stochastic_traces = dict()
-    scenario_indices = list(range(paramters['NUM_SCENARIOS']))
 
-    for trace_name, deterministic_trace in deterministic_traces.items():
-        deterministic_trace = deterministic_trace.iloc[:, 0]
-        new_traces = pd.DataFrame(index=deterministic_trace.index, columns=scenario_indices)
+def scenario_random_generators(random_seed, trace_name, num_scenarios):
+    """
+    A random generator for each scenario after scenario 0.
+    """
+    import numpy as np
+    import zlib
 
-        arma_alpha = arma_vals_df[trace_name]['alpha']
-        arma_beta = arma_vals_df[trace_name]['beta']
-        arma_sigma = arma_vals_df[trace_name]['sigma']
+    trace_key = zlib.crc32(trace_name.encode())
 
-        new_traces.loc[:, 0] = deterministic_trace.iloc[0]
-        new_traces = fill_arma_vals(scenario_indices, new_traces, deterministic_trace)
-        new_traces = enforce_limits(new_traces, trace_name)
-        new_traces.round(5)
+    return [np.random.default_rng([random_seed, trace_key, s]) for s in range(1, num_scenarios)]
 
-        stochastic_traces[trace_name] = new_traces
 
-    return stochastic_traces
+def arma_trace_chunks(trace_name, deterministic_trace, arma_vals, random_generators,
+                      chunk_intervals):
+    import numpy as np
 
+    error_chunks = arma_forecast_error_chunks(arma_vals, len(deterministic_trace),
+                                              random_generators, chunk_intervals)
 
-def write_traces_to_sql(stochastic_traces, paramters):
-    import sqlite3
+    for start, forecast_error in zip(range(0, len(deterministic_trace), chunk_intervals),
+                                     error_chunks):
+        deterministic_chunk = deterministic_trace[start:start + chunk_intervals, None]
+        forecast_error = \
+            np.concatenate([np.zeros((len(deterministic_chunk), 1)), forecast_error], axis=1)
 
-    arma_out_filename = '%03d_arma_traces.db' % paramters['NUM_SCENARIOS']
-    arma_out_dir = os.path.join(paramters['INPUT_FOLDER'], 'arma_traces')
-    arma_out_path = os.path.join(arma_out_dir, arma_out_filename)
-    mf.make_folder(arma_out_dir, keep_existing=True)
+        if trace_name == 'demand':
+            new_traces = (1 + forecast_error) * deterministic_chunk
+        elif trace_name in ['wind', 'solarPV']:
+            new_traces = forecast_error + deterministic_chunk
+        else:
+            new_traces = np.repeat(deterministic_chunk, forecast_error.shape[1], axis=1)
+
+        yield enforce_limits(new_traces, trace_name)
+
+
+def arma_forecast_error_chunks(arma_vals, num_intervals, random_generators, chunk_intervals):
+    """
+    Yields the ARMA(1,1) forecast errors (intervals x scenarios) of each chunk, from
+        error[i] = alpha * error[i-1] + noise[i] + beta * noise[i-1]
+    with error[0] = 0, as a filter along each scenario's row of a normal noise matrix. The last
+    noise (MA state) and the filter state (AR state) carry over from one chunk to the next.
+    """
+    import numpy as np
+    from scipy.signal import lfilter
+
+    last_noise = np.zeros(len(random_generators))
+    filter_state = np.zeros((len(random_generators), 1))
 
-    db_connection = sqlite3.connect(arma_out_path)
+    for start in range(0, num_intervals, chunk_intervals):
+        num_chunk_intervals = min(chunk_intervals, num_intervals - start)
+        noise = np.array([random_generator.normal(0, arma_vals['sigma'], num_chunk_intervals)
+                          for random_generator in random_generators])
+        noise = noise.reshape(len(random_generators), num_chunk_intervals)
+
+        moving_average = noise.copy()
+        moving_average[:, 1:] += arma_vals['beta'] * noise[:, :-1]
+        moving_average[:, 0] += arma_vals['beta'] * last_noise
+        if start == 0:
+            moving_average[:, 0] = 0
+
+        forecast_error, filter_state = \
+            lfilter([1], [1, -arma_vals['alpha']], moving_average, axis=1, zi=filter_state)
+        last_noise = noise[:, -1]
+
+        yield forecast_error.T
+
+
+def enforce_limits(new_traces, trace_name):
+    import numpy as np
 
-    for trace_name, traces in stochastic_traces.items():
-        traces.to_sql(trace_name, db_connection, if_exists='replace')
+    if trace_name in ['wind', 'solarPV']:
+        new_traces = np.clip(new_traces, 0, 1)
+    if trace_name in ['demand']:
+        new_traces = np.clip(new_traces, 0, None)
 
-    db_connection.close()
+    return new_traces
 
 
 def run_arma_model(PATH_TO_INPUTS, NUM_SCENARIOS, RANDOM_SEED=0):
@@ -124,7 +184,7 @@ def run_arma_model(PATH_TO_INPUTS, NUM_SCENARIOS, RANDOM_SEED=0):
             'RANDOM_SEED': RANDOM_SEED
          }
 
-    main(paramters)
+    return main(paramters)
 
 
 if __name__ == '__main__':
@@ -133,11 +193,13 @@ if __name__ == '__main__':
               " (optional) random seed.")
 
     PATH_TO_INPUTS = sys.argv[1]
-    NUM_SCENARIOS = sys.argv[2]
+    NUM_SCENARIOS = int(sys.argv[2])
 
     if len(sys.argv) > 3:
-        RANDOM_SEED = sys.argv[3]
+        RANDOM_SEED = int(sys.argv[3])
     else:
         RANDOM_SEED = 0
 
-    run_arma_model(PATH_TO_INPUTS, NUM_SCENARIOS, RANDOM_SEED)
+    import denkiuc.trace_store as ts
+    ts.load_traces(os.path.join(PATH_TO_INPUTS, 'arma_traces'), PATH_TO_INPUTS, NUM_SCENARIOS,
+                   RANDOM_SEED)
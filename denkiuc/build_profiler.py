@@ -0,0 +1,79 @@
+import itertools
+import numpy as np
+import time
+import tracemalloc
+import pandas as pd
+import pulp as pp
+
+
+def start_memory_tracing(settings):
+    if settings['PROFILE_MEMORY'] and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def stop_memory_tracing():
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def count_rows_and_nonzeros(result, rows_before):
+    from denkiuc.matrix_model import dkBlock
+
+    if isinstance(result, pp.LpProblem):
+        new_constraints = itertools.islice(result.constraints.values(), rows_before, None)
+        nonzeros = sum(len(c) for c in new_constraints)
+        return len(result.constraints) - rows_before, nonzeros
+
+    if isinstance(result, dkBlock):
+        return result.num_rows, sum(len(c) for c in result.cols)
+
+    if isinstance(result, list):
+        block_counts = [count_rows_and_nonzeros(blk, rows_before) for blk in result]
+        return tuple(int(x) for x in np.sum(block_counts, axis=0))
+
+    if isinstance(result, pp.LpAffineExpression):
+        return 0, len(result)
+
+    return 0, 0
+
+
+def profile_build_step(prob, name, kind, build_function):
+    """
+    Calls build_function(prob) and records the wall time, rows and nonzeros added, and the
+    change in traced Python memory (if PROFILE_MEMORY is on) in prob['stats']['build_profile'].
+    """
+    rows_before = len(prob['mod'].constraints)
+    memory_before = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else None
+    time_start = time.perf_counter()
+
+    result = build_function(prob)
+
+    wall_time = time.perf_counter() - time_start
+    rows, nonzeros = count_rows_and_nonzeros(result, rows_before)
+
+    if memory_before is None:
+        memory_delta_MB = float('nan')
+    else:
+        memory_delta_MB = (tracemalloc.get_traced_memory()[0] - memory_before) / 1e6
+
+    profile = prob['stats'].setdefault('build_profile', list())
+    profile.append({'Name': name, 'Kind': kind, 'WallTime_s': wall_time, 'Rows': rows,
+                    'Nonzeros': nonzeros, 'MemoryDelta_MB': memory_delta_MB})
+
+    return result
+
+
+def build_profile_to_df(stats):
+    columns = ['Name', 'Kind', 'WallTime_s', 'Rows', 'Nonzeros', 'MemoryDelta_MB']
+    build_profile_df = pd.DataFrame(stats.get('build_profile', list()), columns=columns)
+    build_profile_df = build_profile_df.set_index('Name')
+
+    return build_profile_df
+
+
+def write_build_profile(stats, results_path):
+    import os
+
+    build_profile_df = build_profile_to_df(stats)
+    build_profile_df.to_csv(os.path.join(results_path, 'build_profile.csv'))
+    print('Build profile written')
@@ -0,0 +1,182 @@
+import os
+import hashlib
+import numpy as np
+import pandas as pd
+
+snapshot_version = '1'
+table_names = ['units', 'initial_state', 'as_reqt']
+
+
+def source_files(paths):
+    """
+    The files which the compiled inputs are made from. The technology categories come from
+    the inputs folder if they are there, otherwise from the default files.
+    """
+    from denkiuc.load_data import default_files_path
+
+    tech_cat_file = os.path.join(paths['inputs'], 'technology_categories.csv')
+    if not os.path.exists(tech_cat_file):
+        tech_cat_file = os.path.join(default_files_path, 'technology_categories.csv')
+
+    return [os.path.join(paths['inputs'], 'unit_data.csv'),
+            os.path.join(paths['inputs'], 'reserve_requirement.csv'),
+            os.path.join(paths['inputs'], 'initial_state.csv'),
+            tech_cat_file,
+            os.path.join(default_files_path, 'all_reserve_indices.csv')]
+
+
+def inputs_hash(paths):
+    """
+    SHA-256 of the name and contents of each source file (a missing file is hashed as
+    missing), so a snapshot is only reused while all of its source files are unchanged.
+    """
+    inputs_sha = hashlib.sha256(snapshot_version.encode())
+
+    for source_file in source_files(paths):
+        inputs_sha.update(os.path.basename(source_file).encode())
+        if os.path.exists(source_file):
+            with open(source_file, 'rb') as f:
+                inputs_sha.update(f.read())
+        else:
+            inputs_sha.update(b'missing')
+
+    return inputs_sha.hexdigest()
+
+
+def load_compiled_inputs(paths):
+    """
+    The unit data, reserve requirement, initial state, unit subsets and reserve indices, from
+    the snapshot of the inputs folder if one matches the source files, otherwise compiled from
+    the source files and written as a snapshot (replacing any older snapshot).
+    """
+    snapshot_path = \
+        os.path.join(paths['compiled_inputs'], inputs_hash(paths) + '.npz')
+
+    if os.path.exists(snapshot_path):
+        print('Loading compiled inputs', snapshot_path)
+        return read_snapshot(snapshot_path)
+
+    compiled = compile_inputs(paths)
+    write_snapshot(compiled, snapshot_path)
+
+    return compiled
+
+
+def compile_inputs(paths):
+    import denkiuc.load_data as ld
+
+    compiled = dict()
+    missing_values = dict()
+
+    compiled['as_reqt'], missing_values = \
+        ld.load_ancillary_service_requirements(paths, missing_values)
+    compiled['units'] = ld.load_unit_data(paths)
+    compiled['initial_state'], missing_values = ld.load_initial_state(paths, missing_values)
+    compiled['missing_values'] = missing_values
+
+    compiled['unit_subsets'] = ld.find_unit_subsets(compiled['units'], paths)
+    compiled['reserve_indices'] = ld.find_reserve_indices(compiled['as_reqt'])
+
+    return compiled
+
+
+def write_snapshot(compiled, snapshot_path):
+    """
+    Writes the compiled inputs as one uncompressed .npz of typed arrays (see pack_table), with
+    each unit subset as an array of unit names.
+    """
+    if os.path.exists(os.path.dirname(snapshot_path)):
+        for old_snapshot in os.listdir(os.path.dirname(snapshot_path)):
+            os.remove(os.path.join(os.path.dirname(snapshot_path), old_snapshot))
+    else:
+        os.makedirs(os.path.dirname(snapshot_path))
+
+    arrays = dict()
+
+    for table_name in table_names:
+        missing = compiled['missing_values'].get(table_name, False)
+        arrays[table_name + '.missing'] = np.array(missing)
+        if not missing:
+            arrays.update(pack_table(table_name, compiled[table_name]))
+
+    for subset_name, subset_indices in compiled['unit_subsets'].items():
+        arrays['unit_subsets.' + subset_name] = np.array(subset_indices, dtype=str)
+
+    arrays['reserve_indices'] = np.array(compiled['reserve_indices'], dtype=str)
+
+    np.savez(snapshot_path, **arrays)
+    print('Inputs compiled to', snapshot_path)
+
+
+def read_snapshot(snapshot_path):
+    compiled = dict()
+    compiled['missing_values'] = dict()
+
+    with np.load(snapshot_path, allow_pickle=False) as arrays:
+        for table_name in table_names:
+            if arrays[table_name + '.missing']:
+                compiled[table_name] = False
+            else:
+                compiled[table_name] = unpack_table(table_name, arrays)
+
+            if table_name != 'units':
+                compiled['missing_values'][table_name] = bool(arrays[table_name + '.missing'])
+
+        compiled['unit_subsets'] = \
+            {key[len('unit_subsets.'):]: arrays[key].tolist()
+             for key in arrays.files if key.startswith('unit_subsets.')}
+        compiled['reserve_indices'] = arrays['reserve_indices'].tolist()
+
+    return compiled
+
+
+def pack_table(table_name, df):
+    """
+    A table as its index, its column names and a 2D block for each dtype (text blocks as fixed
+    width strings with a mask of missing values).
+    """
+    arrays = dict()
+    arrays[table_name + '.index'] = pack_block(df.index.to_numpy())[0]
+    arrays[table_name + '.index_name'] = np.array(df.index.name or '')
+    arrays[table_name + '.columns'] = np.array(df.columns, dtype=str)
+
+    for dtype in df.dtypes.astype(str).unique():
+        block_columns = [col for col in df.columns if str(df[col].dtype) == dtype]
+        block, missing = pack_block(df[block_columns].to_numpy())
+        arrays['%s.block.%s' % (table_name, dtype)] = block
+        arrays['%s.block_columns.%s' % (table_name, dtype)] = np.array(block_columns, dtype=str)
+        if missing is not None:
+            arrays['%s.missing.%s' % (table_name, dtype)] = missing
+
+    return arrays
+
+
+def pack_block(values):
+    if values.dtype != object:
+        return values, None
+
+    missing = pd.isna(values)
+    return np.where(missing, '', values).astype(str), missing
+
+
+def unpack_table(table_name, arrays):
+    columns = dict()
+
+    for key in arrays.files:
+        if not key.startswith(table_name + '.block.'):
+            continue
+
+        dtype = key[len(table_name + '.block.'):]
+        block = arrays[key]
+        if '%s.missing.%s' % (table_name, dtype) in arrays.files:
+            block = block.astype(object)
+            block[arrays['%s.missing.%s' % (table_name, dtype)]] = np.nan
+
+        block_columns = arrays['%s.block_columns.%s' % (table_name, dtype)].tolist()
+        for n, col in enumerate(block_columns):
+            columns[col] = block[:, n]
+
+    index = pd.Index(arrays[table_name + '.index'].tolist(),
+                     name=arrays[table_name + '.index_name'].item() or None)
+
+    return pd.DataFrame(columns, index=index, columns=arrays[table_name + '.columns'].tolist())
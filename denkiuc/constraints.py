@@ -1,13 +1,21 @@
+import numpy as np
 import pulp as pp
 import denkiuc.misc_functions as mf
+import denkiuc.persistent_model as pm
+import denkiuc.row_index as ri
 
 
 def cnt_supply_eq_demand(prob):
     sets, data, vars, mod = mf.prob_unpacker(prob, ['sets', 'data', 'vars', 'mod'])
+    params = data['params']
 
-    for i in sets['intervals'].indices:
+    demand = params.traces['demand']
+    rt_efficiency = params.unit_values('RTEfficiency', 'units_storage')
+    storage_units = list(zip(sets['units_storage'].indices, rt_efficiency))
+
+    for pi, i in enumerate(sets['intervals'].indices):
         for s in sets['scenarios'].indices:
-            label = 'meet_demand_i_%d_s_%d' % (i, s)
+            label = ri.row_label(prob, 'meet_demand_i_%(i)d_s_%(s)d', i=i, s=s)
 
             condition = \
                 (
@@ -15,10 +23,9 @@ def cnt_supply_eq_demand(prob):
                            for u in sets['units'].indices])
                  + vars['unserved_power'].var[(i, s)]
                  ==
-                 data['traces']['demand'][s][i]
-                 + pp.lpSum([vars['charge_after_losses'].var[(i, s, u)]
-                             * (1 / data['units']['RTEfficiency'][u])
-                             for u in sets['units_storage'].indices])
+                 demand[pi, s]
+                 + pp.lpSum([vars['charge_after_losses'].var[(i, s, u)] * (1 / rt_efficiency)
+                             for u, rt_efficiency in storage_units])
                  )
 
             mod += condition, label
@@ -28,18 +35,20 @@ def cnt_supply_eq_demand(prob):
 
 def cnt_meet_reserve_requirement(prob):
     sets, data, vars, mod = mf.prob_unpacker(prob, ['sets', 'data', 'vars', 'mod'])
+    as_reqt = data['params'].as_reqt
 
-    for r in sets['reserves'].indices:
-        for i in sets['intervals'].indices:
+    for pr, r in enumerate(sets['reserves'].indices):
+        for pi, i in enumerate(sets['intervals'].indices):
             for s in sets['scenarios'].indices:
-                label = 'meet_reserve_requirement_i_%d_s_%d_r_%s' % (i, s, r)
+                label = ri.row_label(prob, 'meet_reserve_requirement_i_%(i)d_s_%(s)d_r_%(r)s',
+                                     i=i, s=s, r=r)
                 condition = \
                     (
                      pp.lpSum([vars['reserve_enabled'].var[(i, s, u, r)]
                                for u in sets['units'].indices])
                      + vars['unserved_reserve'].var[(i, s, r)]
                      >=
-                     data['as_reqt'][r][i]
+                     as_reqt[pi, pr]
                      )
 
                 mod += condition, label
@@ -50,19 +59,21 @@ def cnt_meet_reserve_requirement(prob):
 def cnt_variable_resource_availability(prob):
     sets, data, vars, mod = mf.prob_unpacker(prob, ['sets', 'data', 'vars', 'mod'])
 
+    params = data['params']
+
     for u in sets['units_variable'].indices:
-        region = data['units']['Region'][u]
-        technology = data['units']['Technology'][u]
+        trace = params.resource_trace(u)
+        capacity = params.units['Capacity_MW'][params.unit_pos[u]]
 
         for s in sets['scenarios'].indices:
-            trace = mf.get_resource_trace(s, region, technology, data)
-            for i in sets['intervals'].indices:
-                label = 'variable_resource_availability_u_%s_i_%d_s_%d' % (u, i, s)
+            for pi, i in enumerate(sets['intervals'].indices):
+                label = ri.row_label(prob, 'variable_resource_availability_u_%(u)s_i_%(i)d_s_%(s)d',
+                                     i=i, s=s, u=u)
 
                 condition = \
                     (
                      vars['power_generated'].var[(i, s, u)]
-                     <= trace[i] * data['units']['Capacity_MW'][u]
+                     <= trace[pi, s] * capacity
                     )
 
                 mod += condition, label
@@ -72,33 +83,25 @@ def cnt_variable_resource_availability(prob):
 
 def cnt_commitment_continuity(prob):
     sets, data, vars, mod = mf.prob_unpacker(prob, ['sets', 'data', 'vars', 'mod'])
+    params = data['params']
 
     for i in sets['intervals'].indices:
         for u in sets['units_commit'].indices:
+            for s in sets['scenarios'].indices:
+                label = ri.row_label(prob, 'commitment_continuity_%(u)s_i_%(i)s_s_%(s)d',
+                                     i=i, s=s, u=u)
 
-            if i == min(sets['intervals'].indices):
-                for s in sets['scenarios'].indices:
-                    label = 'commitment_continuity_%s_i_%s_s_%d' % (u, i, s)
-
-                    condition = \
-                        (
-                         vars['num_committed'].var[(i, s, u)]
-                         ==
-                         data['initial_state']['NumCommited'][u]
-                         + vars['num_starting_up'].var[(i, s, u)]
-                         - vars['num_shutting_down'].var[(i, s, u)]
-                         )
-
-                    mod += condition, label
-
-            if i > min(sets['intervals'].indices):
-                label = 'commitment_continuity_%s_i_%s_s+%d' % (u, i, s)
+                if i == min(sets['intervals'].indices):
+                    previous_num_committed = \
+                        params.initial_state['NumCommited'][params.unit_pos[u]]
+                else:
+                    previous_num_committed = vars['num_committed'].var[(i-1, s, u)]
 
                 condition = \
                     (
                      vars['num_committed'].var[(i, s, u)]
                      ==
-                     vars['num_committed'].var[(i-1, s, u)]
+                     previous_num_committed
                      + vars['num_starting_up'].var[(i, s, u)]
                      - vars['num_shutting_down'].var[(i, s, u)]
                      )
@@ -109,20 +112,26 @@ def cnt_commitment_continuity(prob):
 
 
 def cnt_inflexible_commitment(prob):
-    sets, data, vars, mod = mf.prob_unpacker(prob, ['sets', 'data', 'vars', 'mod'])
+    """
+    Inflexible units are committed before the scenario is known, so their commitment in each
+    scenario must equal that of the first scenario.
+    """
+    sets, vars, mod = mf.prob_unpacker(prob, ['sets', 'vars', 'mod'])
+    label_format = 'inflexible_commit_same_across_scenarios_u_%(u)s_i_%(i)s_s_%(s)s'
+    s0 = sets['scenarios'].indices[0]
 
     for i in sets['intervals'].indices:
-        for s in sets['scenarios'].indices:
+        for s in sets['scenarios'].indices[1:]:
             for u in sets['units_inflex'].indices:
-                label = 'inflexible_commit_same_across_scenarios_u_%s_i_%s_s_%s' % (u, s, i)
+                label = ri.row_label(prob, label_format, i=i, s=s, u=u)
                 condition = \
                     (
                      vars['num_committed'].var[(i, s, u)]
                      ==
-                     vars['num_committed_all_scenarios'].var[(i, u)]
+                     vars['num_committed'].var[(i, s0, u)]
                      )
 
-            mod += condition, label
+                mod += condition, label
 
     return mod
 
@@ -133,7 +142,8 @@ def cnt_max_unit_committed(prob):
     for i in sets['intervals'].indices:
         for s in sets['scenarios'].indices:
             for u in sets['units_commit'].indices:
-                label = 'num_units_commit_lt_exist_%s_int_%s_s_%d' % (u, i, s)
+                label = ri.row_label(prob, 'num_units_commit_lt_exist_%(u)s_int_%(i)s_s_%(s)d',
+                                     i=i, s=s, u=u)
 
                 condition = \
                     (vars['num_committed'].var[(i, s, u)]
@@ -147,18 +157,21 @@ def cnt_max_unit_committed(prob):
 
 def cnt_power_lt_committed_capacity(prob):
     sets, data, vars, mod = mf.prob_unpacker(prob, ['sets', 'data', 'vars', 'mod'])
+    capacity = dict(zip(sets['units_commit'].indices,
+                        data['params'].unit_values('Capacity_MW', 'units_commit')))
 
     for i in sets['intervals'].indices:
         for s in sets['scenarios'].indices:
             for u in sets['units_commit'].indices:
-                label = 'power_lt_commited_cap_%s_int_%s_s_%s' % (u, i, s)
+                label = ri.row_label(prob, 'power_lt_commited_cap_%(u)s_int_%(i)s_s_%(s)s',
+                                     i=i, s=s, u=u)
 
                 condition = \
                     (vars['power_generated'].var[(i, s, u)]
                      + pp.lpSum(vars['reserve_enabled'].var[(i, s, u, r)]
                                 for r in sets['raise_reserves'].indices)
                      <=
-                     vars['num_committed'].var[(i, s, u)] * data['units']['Capacity_MW'][u])
+                     vars['num_committed'].var[(i, s, u)] * capacity[u])
 
                 mod += condition, label
 
@@ -167,20 +180,23 @@ def cnt_power_lt_committed_capacity(prob):
 
 def cnt_power_gt_min_stable_gen(prob):
     sets, data, vars, mod = mf.prob_unpacker(prob, ['sets', 'data', 'vars', 'mod'])
+    params = data['params']
+    min_gen_MW = dict(zip(sets['units_commit'].indices,
+                          params.unit_values('Capacity_MW', 'units_commit')
+                          * params.unit_values('MinGen_pctCap', 'units_commit')))
 
     for i in sets['intervals'].indices:
         for s in sets['scenarios'].indices:
             for u in sets['units_commit'].indices:
-                label = 'power_gt_min_stable_gen_%s_int_%s_s_%s' % (u, i, s)
+                label = ri.row_label(prob, 'power_gt_min_stable_gen_%(u)s_int_%(i)s_s_%(s)s',
+                                     i=i, s=s, u=u)
 
                 condition = \
                     (vars['power_generated'].var[(i, s, u)]
                      - pp.lpSum(vars['reserve_enabled'].var[(i, s, u, r)]
                                 for r in sets['lower_reserves'].indices)
                      >=
-                     vars['num_committed'].var[(i, s, u)]
-                     * data['units']['Capacity_MW'][u]
-                     * data['units']['MinGen_pctCap'][u])
+                     vars['num_committed'].var[(i, s, u)] * min_gen_MW[u])
 
                 mod += condition, label
     return mod
@@ -188,45 +204,103 @@ def cnt_power_gt_min_stable_gen(prob):
 
 def cnt_power_lt_capacity(prob):
     sets, data, vars, mod = mf.prob_unpacker(prob, ['sets', 'data', 'vars', 'mod'])
+    capacity = dict(zip(sets['units'].indices, data['params'].units['Capacity_MW']))
 
     for i in sets['intervals'].indices:
         for s in sets['scenarios'].indices:
             for u in sets['units'].indices:
-                label = 'power_lt_cap_%s_i_%d_s_%d' % (u, i, s)
+                label = ri.row_label(prob, 'power_lt_cap_%(u)s_i_%(i)d_s_%(s)d', i=i, s=s, u=u)
 
                 condition = \
                     (vars['power_generated'].var[(i, s, u)]
                      + pp.lpSum(vars['reserve_enabled'].var[(i, s, u, r)]
                                 for r in sets['raise_reserves'].indices)
                      <=
-                     data['units']['Capacity_MW'][u] * vars['num_built'].var[u]
+                     capacity[u] * vars['num_built'].var[u]
                      )
 
                 mod += condition, label
     return mod
 
 
+def min_time_window_starts(params, column):
+    """
+    Position (in the intervals set) of the first interval in the minimum up/down time window
+    ending at each (interval, commit unit). The window holds the intervals which start less
+    than the minimum time before the start of the last interval in it.
+    """
+    start_hours = params.interval_start_hours
+    window_earliest_start = \
+        start_hours[:, None] - params.unit_values(column, 'units_commit')[None, :]
+
+    return np.searchsorted(start_hours, window_earliest_start + 1e-9, side='right')
+
+
+def define_cumulative_variable(prob, var_name, cumulative_name):
+    sets, vars, mod = mf.prob_unpacker(prob, ['sets', 'vars', 'mod'])
+    intervals = sets['intervals'].indices
+
+    for pi, i in enumerate(intervals):
+        for s in sets['scenarios'].indices:
+            for u in sets['units_commit'].indices:
+                label = ri.row_label(prob, 'define_' + cumulative_name + '_i_%(i)d_u_%(u)s_s_%(s)d',
+                                     i=i, s=s, u=u)
+
+                if pi == 0:
+                    previous_total = 0
+                else:
+                    previous_total = vars[cumulative_name].var[(intervals[pi - 1], s, u)]
+
+                condition = (
+                    vars[cumulative_name].var[(i, s, u)]
+                    ==
+                    previous_total + vars[var_name].var[(i, s, u)]
+                    )
+
+                mod += condition, label
+
+    return mod
+
+
+def window_sum(prob, var_name, window_starts, pi, s, k):
+    """
+    Sum of var_name over the window ending at intervals[pi] for the k-th commit unit. With
+    MIN_UP_DOWN_FORMULATION = 'cumulative' this is the difference of two cumulative totals,
+    rather than one term per interval in the window.
+    """
+    sets, vars, settings = mf.prob_unpacker(prob, ['sets', 'vars', 'settings'])
+    intervals = sets['intervals'].indices
+    u = sets['units_commit'].indices[k]
+    window_start = window_starts[pi, k]
+
+    if settings['MIN_UP_DOWN_FORMULATION'] == 'cumulative':
+        cumulative_name = 'cumulative_' + var_name
+        total = vars[cumulative_name].var[(intervals[pi], s, u)]
+        if window_start > 0:
+            total = total - vars[cumulative_name].var[(intervals[window_start - 1], s, u)]
+        return total
+
+    return pp.lpSum([vars[var_name].var[(i2, s, u)] for i2 in intervals[window_start:pi + 1]])
+
+
 def cnt_minimum_up_time(prob):
     sets, data, vars, mod, settings = \
         mf.prob_unpacker(prob, ['sets', 'data', 'vars', 'mod', 'settings'])
 
-    i0 = min(sets['intervals'].indices)
+    window_starts = min_time_window_starts(data['params'], 'MinUpTime_h')
 
-    for i in sets['intervals'].indices:
-        i_high = i + 1
-
-        for u in sets['units_commit'].indices:
-            unit_up_time = data['units']['MinUpTime_h'][u]
-            i_low = 1 + max(i0 - 1, i - settings['INTERVALS_PER_HOUR'] * unit_up_time)
+    if settings['MIN_UP_DOWN_FORMULATION'] == 'cumulative':
+        mod = define_cumulative_variable(prob, 'num_starting_up', 'cumulative_num_starting_up')
 
+    for pi, i in enumerate(sets['intervals'].indices):
+        for k, u in enumerate(sets['units_commit'].indices):
             for s in sets['scenarios'].indices:
-                label = 'minimum_up_time_i_%d_u_%s_s_%d' % (i, u, s)
+                label = ri.row_label(prob, 'minimum_up_time_i_%(i)d_u_%(u)s_s_%(s)d', i=i, s=s, u=u)
 
                 condition = (
                     vars['num_committed'].var[(i, s, u)]
                     >=
-                    pp.lpSum([vars['num_starting_up'].var[(i2, s, u)]
-                              for i2 in range(i_low, i_high)])
+                    window_sum(prob, 'num_starting_up', window_starts, pi, s, k)
                     )
 
                 mod += condition, label
@@ -238,24 +312,22 @@ def cnt_minimum_down_time(prob):
     sets, data, vars, mod, settings = \
         mf.prob_unpacker(prob, ['sets', 'data', 'vars', 'mod', 'settings'])
 
-    i0 = min(sets['intervals'].indices)
+    window_starts = min_time_window_starts(data['params'], 'MinDownTime_h')
 
-    for i in sets['intervals'].indices:
-        i_high = i + 1
+    if settings['MIN_UP_DOWN_FORMULATION'] == 'cumulative':
+        mod = define_cumulative_variable(prob, 'num_shutting_down',
+                                         'cumulative_num_shutting_down')
 
-        for u in sets['units_commit'].indices:
-            unit_down_time = data['units']['MinDownTime_h'][u]
-            if i - i0 <= unit_down_time:
-                pass
-
-            i_low = 1 + max(i0 - 1, i - settings['INTERVALS_PER_HOUR'] * unit_down_time)
+    for pi, i in enumerate(sets['intervals'].indices):
+        for k, u in enumerate(sets['units_commit'].indices):
             for s in sets['scenarios'].indices:
-                label = 'minimum_down_time_i_%d_u_%s_s_%d' % (i, u, s)
+                label = ri.row_label(prob, 'minimum_down_time_i_%(i)d_u_%(u)s_s_%(s)d',
+                                     i=i, s=s, u=u)
+
                 condition = (
                     vars['num_built'].var[u] - vars['num_committed'].var[(i, s, u)]
                     >=
-                    pp.lpSum([vars['num_shutting_down'].var[(i2, s, u)]
-                              for i2 in range(i_low, i_high)])
+                    window_sum(prob, 'num_shutting_down', window_starts, pi, s, k)
                     )
 
                 mod += condition, label
@@ -264,64 +336,71 @@ def cnt_minimum_down_time(prob):
 
 
 def cnt_storage_continuity(prob):
-    sets, data, vars, mod, settings = \
-        mf.prob_unpacker(prob, ['sets', 'data', 'vars', 'mod', 'settings'])
+    sets, data, vars, mod = mf.prob_unpacker(prob, ['sets', 'data', 'vars', 'mod'])
 
-    for i in sets['intervals'].indices:
+    interval_hours = data['params'].interval_hours
+
+    for pi, i in enumerate(sets['intervals'].indices):
         if i > min(sets['intervals'].indices):
             for s in sets['scenarios'].indices:
                 for u in sets['units_storage'].indices:
-                    label = 'storage_continuity_%s_int_%d_s_%d' % (u, i, s)
+                    label = ri.row_label(prob, 'storage_continuity_%(u)s_int_%(i)d_s_%(s)d',
+                                         i=i, s=s, u=u)
 
                     condition = \
                         (vars['energy_in_reservoir'].var[(i, s, u)]
                          ==
                          vars['energy_in_reservoir'].var[(i-1, s, u)]
-                         + vars['charge_after_losses'].var[(i, s, u)]
-                         * (1 / settings['INTERVALS_PER_HOUR'])
-                         - vars['power_generated'].var[(i, s, u)]
-                         * (1 / settings['INTERVALS_PER_HOUR'])
+                         + vars['charge_after_losses'].var[(i, s, u)] * interval_hours[pi]
+                         - vars['power_generated'].var[(i, s, u)] * interval_hours[pi]
                          )
                     mod += condition, label
     return mod
 
 
 def cnt_storage_continuity_first_int(prob):
-    sets, data, vars, mod, settings = \
-        mf.prob_unpacker(prob, ['sets', 'data', 'vars', 'mod', 'settings'])
+    sets, data, vars, mod = mf.prob_unpacker(prob, ['sets', 'data', 'vars', 'mod'])
+
+    params = data['params']
+    initial_energy_in_reservoir = \
+        dict(zip(sets['units_storage'].indices,
+                 params.initial_state_values('StorageLevel_frac', 'units_storage')
+                 * params.unit_values('StorageCap_h', 'units_storage')
+                 * params.unit_values('Capacity_MW', 'units_storage')))
 
     for s in sets['scenarios'].indices:
         for u in sets['units_storage'].indices:
             i = min(sets['intervals'].indices)
-            initial_energy_in_reservoir \
-                = (data['initial_state']['StorageLevel_frac'][u]
-                   * data['units']['StorageCap_h'][u]
-                   * data['units']['Capacity_MW'][u])
-            label = 'storage_continuity_%s_int_%d_s%d' % (u, i, s)
+            label = ri.row_label(prob, 'storage_continuity_%(u)s_int_%(i)d_s%(s)d', i=i, s=s, u=u)
             condition = \
                 (vars['energy_in_reservoir'].var[(i, s, u)]
                  ==
-                 initial_energy_in_reservoir
-                 + vars['charge_after_losses'].var[(i, s, u)]
-                 * (1 / settings['INTERVALS_PER_HOUR'])
-                 - vars['power_generated'].var[(i, s, u)] * (1 / settings['INTERVALS_PER_HOUR']))
+                 initial_energy_in_reservoir[u]
+                 + vars['charge_after_losses'].var[(i, s, u)] * params.interval_hours[0]
+                 - vars['power_generated'].var[(i, s, u)] * params.interval_hours[0])
             mod += condition, label
     return mod
 
 
 def cnt_max_stored_energy(prob):
     sets, data, vars, mod = mf.prob_unpacker(prob, ['sets', 'data', 'vars', 'mod'])
+    params = data['params']
+    storage_capacity_MWh = \
+        dict(zip(sets['units_storage'].indices,
+                 params.unit_values('StorageCap_h', 'units_storage')
+                 * params.unit_values('Capacity_MW', 'units_storage')))
 
     for i in sets['intervals'].indices:
         for s in sets['scenarios'].indices:
             for u in sets['units_storage'].indices:
-                label = 'max_stored_energy_%s_int_%s_s_%s' % (u, i, s)
+                label = ri.row_label(prob, 'max_stored_energy_%(u)s_int_%(i)s_s_%(s)s',
+                                     i=i, s=s, u=u)
 
                 condition = \
                     (
                      vars['energy_in_reservoir'].var[(i, s, u)]
                      <=
-                     data['units']['StorageCap_h'][u] * data['units']['Capacity_MW'][u]
+                     storage_capacity_MWh[u]
                     )
 
                 mod += condition, label
@@ -330,16 +409,20 @@ def cnt_max_stored_energy(prob):
 
 def cnt_max_charge(prob):
     sets, data, vars, mod = mf.prob_unpacker(prob, ['sets', 'data', 'vars', 'mod'])
+    params = data['params']
+    charge_capacity_MW = \
+        dict(zip(sets['units_storage'].indices,
+                 params.unit_values('RTEfficiency', 'units_storage')
+                 * params.unit_values('Capacity_MW', 'units_storage')))
 
     for i in sets['intervals'].indices:
         for s in sets['scenarios'].indices:
             for u in sets['units_storage'].indices:
-                label = 'max_charge_%s_int_%d_s%d' % (u, i, s)
+                label = ri.row_label(prob, 'max_charge_%(u)s_int_%(i)d_s%(s)d', i=i, s=s, u=u)
                 condition = \
                     (vars['charge_after_losses'].var[(i, s, u)]
                      <=
-                     data['units']['RTEfficiency'][u]
-                     * data['units']['Capacity_MW'][u])
+                     charge_capacity_MW[u])
                 mod += condition, label
 
     return mod
@@ -347,15 +430,17 @@ def cnt_max_charge(prob):
 
 def cnt_maximum_reserve_enablement(prob):
     sets, data, vars, mod = mf.prob_unpacker(prob, ['sets', 'data', 'vars', 'mod'])
+    params = data['params']
+    label_format = 'maximum_reserves_enabled_i_%(i)d_s_%(s)s_u_%(u)s_r_%(r)s'
 
-    for u in sets['units'].indices:
+    for pu, u in enumerate(sets['units'].indices):
         if u in sets['units_commit'].indices:
-            for r in sets['reserves'].indices:
-                max_reserves_per_unit = mf.get_max_reserves_per_unit(u, r, data['units'])
+            for pr, r in enumerate(sets['reserves'].indices):
+                max_reserves_per_unit = params.max_reserves_per_unit[pu, pr]
 
                 for i in sets['intervals'].indices:
                     for s in sets['scenarios'].indices:
-                        label = 'maximum_reserves_enabled_i_%d_s_%s_u_%s_r_%s' % (i, s, u, r)
+                        label = ri.row_label(prob, label_format, i=i, s=s, u=u, r=r)
                         condition = (
                             vars['reserve_enabled'].var[(i, s, u, r)]
                             <=
@@ -364,12 +449,12 @@ def cnt_maximum_reserve_enablement(prob):
                         mod += condition, label
 
         else:
-            for r in sets['reserves'].indices:
-                max_reserves_per_unit = mf.get_max_reserves_per_unit(u, r, data['units'])
+            for pr, r in enumerate(sets['reserves'].indices):
+                max_reserves_per_unit = params.max_reserves_per_unit[pu, pr]
 
                 for i in sets['intervals'].indices:
                     for s in sets['scenarios'].indices:
-                        label = 'maximum_reserves_enabled_i_%d_s_%s_u_%s_r_%s' % (i, s, u, r)
+                        label = ri.row_label(prob, label_format, i=i, s=s, u=u, r=r)
                         condition = (
                             vars['reserve_enabled'].var[(i, s, u, r)]
                             <=
@@ -395,36 +480,48 @@ def cnt_limit_rocof(prob):
 
         return condition
 
-    for i in sets['intervals'].indices:
+    params = data['params']
+    capacity = dict(zip(sets['units'].indices, params.units['Capacity_MW']))
+    inertia_per_unit = \
+        dict(zip(sets['units'].indices,
+                 params.units['InertialConst_s'] * params.units['Capacity_MW']))
+
+    trace_shape = (len(sets['intervals'].indices), len(sets['scenarios'].indices))
+    non_commit_contingency = dict()
+    for u in sets['units'].indices:
+        if u in sets['units_commit'].indices:
+            continue
+        elif u in sets['units_variable'].indices:
+            non_commit_contingency[u] = params.resource_trace(u) * capacity[u]
+        elif u in sets['units_storage'].indices:
+            non_commit_contingency[u] = np.full(trace_shape, capacity[u])
+        else:
+            non_commit_contingency[u] = np.zeros(trace_shape)
+
+    use_system_inertia_var = settings['ROCOF_FORMULATION'] == 'system_inertia'
+
+    for pi, i in enumerate(sets['intervals'].indices):
         for s in sets['scenarios'].indices:
-            system_inertia = \
-                pp.lpSum(vars['num_committed'].var[(i, s, u2)]
-                         * data['units']['InertialConst_s'][u2]
-                         * data['units']['Capacity_MW'][u2]
+            total_inertia = \
+                pp.lpSum(vars['num_committed'].var[(i, s, u2)] * inertia_per_unit[u2]
                          for u2 in sets['units_commit'].indices)
 
+            if use_system_inertia_var:
+                system_inertia = vars['system_inertia'].var[(i, s)]
+                label = ri.row_label(prob, 'define_system_inertia_int_%(i)d_s_%(s)d', i=i, s=s)
+                mod += system_inertia == total_inertia, label
+            else:
+                system_inertia = total_inertia
+
             for u in sets['units'].indices:
-                label = 'limit_rocof_%s_int_%d_s_%d' % (u, i, s)
+                label = ri.row_label(prob, 'limit_rocof_%(u)s_int_%(i)d_s_%(s)d', i=i, s=s, u=u)
 
                 if u in sets['units_commit'].indices:
-                    units_inertia = \
-                        vars['num_committed'].var[(i, s, u)] \
-                        * data['units']['InertialConst_s'][u] \
-                        * data['units']['Capacity_MW'][u]
-
-                    contingency_size = \
-                        vars['is_committed'].var[(i, s, u)] * data['units']['Capacity_MW'][u]
-
-                elif u in sets['units_variable'].indices:
-                    units_inertia = 0
-                    technology = data['units']['Technology'][u]
-                    region = data['units']['Region'][u]
-                    trace = mf.get_resource_trace(s, region, technology, data)
-                    contingency_size = trace[i] * data['units']['Capacity_MW'][u]
-
-                elif u in sets['units_storage'].indices:
+                    units_inertia = vars['num_committed'].var[(i, s, u)] * inertia_per_unit[u]
+                    contingency_size = vars['is_committed'].var[(i, s, u)] * capacity[u]
+                else:
                     units_inertia = 0
-                    contingency_size = data['units']['Capacity_MW'][u]
+                    contingency_size = non_commit_contingency[u][pi, s]
 
                 available_inertia = system_inertia - units_inertia
 
@@ -437,13 +534,16 @@ def cnt_limit_rocof(prob):
 
 def cnt_define_is_committed(prob):
     sets, data, vars, mod = mf.prob_unpacker(prob, ['sets', 'data', 'vars', 'mod'])
+    num_units = dict(zip(sets['units_commit'].indices,
+                         data['params'].unit_values('NoUnits', 'units_commit')))
 
     for i in sets['intervals'].indices:
         for s in sets['scenarios'].indices:
             for u in sets['units_commit'].indices:
-                BIG_M = max(1000, data['units']['NoUnits'][u])
+                BIG_M = max(1000, num_units[u])
 
-                label = 'define_is_committed_%s_int_%d_s_%d' % (u, i, s)
+                label = ri.row_label(prob, 'define_is_committed_%(u)s_int_%(i)d_s_%(s)d',
+                                     i=i, s=s, u=u)
 
                 condition = \
                     (
@@ -457,36 +557,51 @@ def cnt_define_is_committed(prob):
     return mod
 
 
+def ramp_rate_parameters(sets, params):
+    """
+    The ramp limits are (interval, commit unit) arrays, as they scale with the duration of
+    each interval.
+    """
+    units_commit = sets['units_commit'].indices
+    capacity = params.unit_values('Capacity_MW', 'units_commit')
+    min_gen = params.unit_values('MinGen_pctCap', 'units_commit')
+    ramp_up = params.unit_values('RampRateUp_pctCapphr', 'units_commit')
+    ramp_down = params.unit_values('RampRateDown_pctCapphr', 'units_commit')
+    interval_hours = params.interval_hours[:, None]
+
+    ramp_params = dict()
+    ramp_params['initial_power'] = \
+        dict(zip(units_commit, params.initial_state_values('PowerGeneration_MW', 'units_commit')))
+    ramp_params['committed_ramp_MW'] = ramp_up * capacity * interval_hours
+    ramp_params['start_up_ramp_MW'] = np.maximum(ramp_up * interval_hours, min_gen) * capacity
+    ramp_params['shut_down_ramp_MW'] = np.maximum(ramp_down * interval_hours, min_gen) * capacity
+
+    return ramp_params
+
+
 def cnt_ramp_rate_up(prob):
-    sets, data, vars, mod, settings = \
-        mf.prob_unpacker(prob, ['sets', 'data', 'vars', 'mod', 'settings'])
+    sets, data, vars, mod = mf.prob_unpacker(prob, ['sets', 'data', 'vars', 'mod'])
+    ramp_params = ramp_rate_parameters(sets, data['params'])
 
-    for i in sets['intervals'].indices:
+    for pi, i in enumerate(sets['intervals'].indices):
         for s in sets['scenarios'].indices:
-            for u in sets['units_commit'].indices:
-                label = 'ramp_rate_up_%s_int_%d_s_%d' % (u, i, s)
+            for k, u in enumerate(sets['units_commit'].indices):
+                label = ri.row_label(prob, 'ramp_rate_up_%(u)s_int_%(i)d_s_%(s)d', i=i, s=s, u=u)
 
                 if i == sets['intervals'].indices[0]:
                     ramp = \
                         vars['power_generated'].var[(i, s, u)] \
-                        - data['initial_state']['PowerGeneration_MW'][u]
+                        - ramp_params['initial_power'][u]
                 else:
                     ramp = \
                         vars['power_generated'].var[(i, s, u)] \
                         - vars['power_generated'].var[(i-1, s, u)]
 
                 committed_ramp_capacity = \
-                    vars['num_committed'].var[(i, s, u)] \
-                    * data['units']['RampRateUp_pctCapphr'][u] \
-                    * data['units']['Capacity_MW'][u] \
-                    / settings['INTERVALS_PER_HOUR']
+                    vars['num_committed'].var[(i, s, u)] * ramp_params['committed_ramp_MW'][pi, k]
 
                 start_up_ramp_capacity = \
-                    vars['num_starting_up'].var[(i, s, u)] \
-                    * max(data['units']['RampRateUp_pctCapphr'][u]
-                          / settings['INTERVALS_PER_HOUR'],
-                          data['units']['MinGen_pctCap'][u]) \
-                    * data['units']['Capacity_MW'][u]
+                    vars['num_starting_up'].var[(i, s, u)] * ramp_params['start_up_ramp_MW'][pi, k]
 
                 condition = ramp <= committed_ramp_capacity + start_up_ramp_capacity
 
@@ -496,17 +611,17 @@ def cnt_ramp_rate_up(prob):
 
 
 def cnt_ramp_rate_down(prob):
-    sets, data, vars, mod, settings = \
-        mf.prob_unpacker(prob, ['sets', 'data', 'vars', 'mod', 'settings'])
+    sets, data, vars, mod = mf.prob_unpacker(prob, ['sets', 'data', 'vars', 'mod'])
+    ramp_params = ramp_rate_parameters(sets, data['params'])
 
-    for i in sets['intervals'].indices:
+    for pi, i in enumerate(sets['intervals'].indices):
         for s in sets['scenarios'].indices:
-            for u in sets['units_commit'].indices:
-                label = 'ramp_rate_down_%s_int_%d_s_%d' % (u, i, s)
+            for k, u in enumerate(sets['units_commit'].indices):
+                label = ri.row_label(prob, 'ramp_rate_down_%(u)s_int_%(i)d_s_%(s)d', i=i, s=s, u=u)
 
                 if i == sets['intervals'].indices[0]:
                     ramp = \
-                        data['initial_state']['PowerGeneration_MW'][u] \
+                        ramp_params['initial_power'][u] \
                         - vars['power_generated'].var[(i, s, u)]
                 else:
                     ramp = \
@@ -514,17 +629,11 @@ def cnt_ramp_rate_down(prob):
                         - vars['power_generated'].var[(i, s, u)]
 
                 committed_ramp_capacity = \
-                    vars['num_committed'].var[(i, s, u)] \
-                    * data['units']['RampRateUp_pctCapphr'][u] \
-                    * data['units']['Capacity_MW'][u] \
-                    / settings['INTERVALS_PER_HOUR']
+                    vars['num_committed'].var[(i, s, u)] * ramp_params['committed_ramp_MW'][pi, k]
 
                 shut_down_ramp_capacity = \
                     vars['num_shutting_down'].var[(i, s, u)] \
-                    * max(data['units']['RampRateDown_pctCapphr'][u]
-                          / settings['INTERVALS_PER_HOUR'],
-                          data['units']['MinGen_pctCap'][u]) \
-                    * data['units']['Capacity_MW'][u]
+                    * ramp_params['shut_down_ramp_MW'][pi, k]
 
                 condition = ramp <= committed_ramp_capacity + shut_down_ramp_capacity
 
@@ -535,10 +644,11 @@ def cnt_ramp_rate_down(prob):
 
 def cnt_num_built_fixed(prob):
     sets, data, vars, mod = mf.prob_unpacker(prob, ['sets', 'data', 'vars', 'mod'])
+    num_units = data['params'].units['NoUnits']
 
-    for u in sets['units'].indices:
-        label = 'num_built_fixed_%s' % u
-        condition = vars['num_built'].var[u] == data['units']['NoUnits'][u]
+    for pu, u in enumerate(sets['units'].indices):
+        label = ri.row_label(prob, 'num_built_fixed_%(u)s', u=u)
+        condition = vars['num_built'].var[u] == num_units[pu]
 
         mod += condition, label
 
@@ -605,12 +715,14 @@ def add_ge_constraints(prob):
 
 
 def add_all_constraints_to_dataframe(prob, cnts_df):
+    from denkiuc.build_profiler import profile_build_step
 
     cnts_df.loc['supply_eq_demand', 'Cnst'] = cnt_supply_eq_demand
     cnts_df.loc['meet_reserve_requirement', 'Cnst'] = cnt_meet_reserve_requirement
     cnts_df.loc['power_lt_capacity', 'Cnst'] = cnt_power_lt_capacity
     cnts_df.loc['variable_resource_availability', 'Cnst'] = cnt_variable_resource_availability
     cnts_df.loc['commitment_continuity', 'Cnst'] = cnt_commitment_continuity
+    cnts_df.loc['inflexible_commitment', 'Cnst'] = cnt_inflexible_commitment
     cnts_df.loc['max_unit_committed', 'Cnst'] = cnt_max_unit_committed
     cnts_df.loc['power_lt_committed_capacity', 'Cnst'] = cnt_power_lt_committed_capacity
     cnts_df.loc['power_gt_min_stable_gen', 'Cnst'] = cnt_power_gt_min_stable_gen
@@ -631,7 +743,11 @@ def add_all_constraints_to_dataframe(prob, cnts_df):
     print('\nAdding the following constraints')
     for cnt in cnts_to_add_df.index:
         print(' -' + cnt)
-        prob['mod'] = cnts_df['Cnst'][cnt](prob)
+        if 'row_index' in prob:
+            prob['row_index'].start_family(cnt)
+        rows_before = len(prob['mod'].constraints)
+        prob['mod'] = profile_build_step(prob, cnt, 'constraint', cnts_df['Cnst'][cnt])
+        pm.record_family_rows(prob, cnt, rows_before)
 
     print('\nAll constraints are added')
     return prob['mod']
@@ -1,4 +1,5 @@
 import os
+import numpy as np
 import pandas as pd
 import logging
 import denkiuc.misc_functions as mf
@@ -8,11 +9,20 @@ default_files_path = os.path.join(module_path, 'default_files')
 
 
 def load_settings(paths):
-    import csv
-
     settings = dict()
+    settings = read_settings_file(paths['settings'], settings)
+    settings = read_settings_file(os.path.join(default_files_path, 'settings.csv'), settings)
+
+    if 'OUTPUTS_PATH' not in settings.keys():
+        settings['OUTPUTS_PATH'] = os.path.join(os.getcwd(), 'denki-outputs')
 
-    with open(paths['settings']) as f:
+    return settings
+
+
+def read_settings_file(settings_path, settings):
+    import csv
+
+    with open(settings_path) as f:
         settings_data = csv.DictReader(f)
         for row in settings_data:
             if row['Type'] == 'int':
@@ -31,9 +41,6 @@ def load_settings(paths):
             if row['Type'] == 'float':
                 settings.setdefault(row['Parameter'], float(row['Value']))
 
-    if 'OUTPUTS_PATH' not in settings.keys():
-        settings['OUTPUTS_PATH'] = os.path.join(os.getcwd(), 'denki-outputs')
-
     return settings
 
 
@@ -58,6 +65,77 @@ class dkSet():
         self.subsets.append(subset)
 
 
+class dkParams():
+    """
+    Model parameters compiled into numpy arrays. Unit data and the initial state are indexed
+    by position in sets['units'], traces are (interval, scenario) arrays and the reserve
+    requirement is an (interval, reserve) array.
+    """
+    def __init__(self, data, sets):
+        self.unit_pos = {u: n for n, u in enumerate(sets['units'].indices)}
+        self.subset_pos = self.make_subset_positions(sets)
+
+        self.units = self.compile_unit_table(data['units'], sets['units'])
+        if data['missing_values']['initial_state']:
+            self.initial_state = dict()
+        else:
+            self.initial_state = self.compile_unit_table(data['initial_state'], sets['units'])
+
+        self.traces = dict()
+        for trace_name, trace in data['traces'].items():
+            trace = trace.loc[sets['intervals'].indices, sets['scenarios'].indices]
+            self.traces[trace_name] = np.ascontiguousarray(trace.to_numpy(dtype=float))
+
+        as_reqt = data['as_reqt'].loc[sets['intervals'].indices, sets['reserves'].indices]
+        self.as_reqt = np.ascontiguousarray(as_reqt.to_numpy(dtype=float))
+
+        self.interval_hours = \
+            data['interval_hours'].loc[sets['intervals'].indices].to_numpy(dtype=float)
+        self.interval_start_hours = np.concatenate(([0], np.cumsum(self.interval_hours)[:-1]))
+
+        self.probability_of_scenario = \
+            np.array([data['probability_of_scenario'][s] for s in sets['scenarios'].indices])
+
+        self.max_reserves_per_unit = np.array(
+            [[mf.get_max_reserves_per_unit(u, r, data['units'])
+              for r in sets['reserves'].indices] for u in sets['units'].indices],
+            dtype=float).reshape(len(sets['units'].indices), len(sets['reserves'].indices))
+
+    def make_subset_positions(self, sets):
+        subset_pos = dict()
+        master_sets = ['units', 'intervals', 'scenarios', 'reserves']
+
+        for master_name in master_sets:
+            master_positions = {x: n for n, x in enumerate(sets[master_name].indices)}
+            for subset in [sets[master_name]] + sets[master_name].subsets:
+                subset_pos[subset.name] = \
+                    np.array([master_positions[x] for x in subset.indices], dtype=int)
+
+        return subset_pos
+
+    def compile_unit_table(self, unit_df, units):
+        unit_df = unit_df.reindex(units.indices)
+        table = dict()
+
+        for col in unit_df.columns:
+            if pd.api.types.is_numeric_dtype(unit_df[col]):
+                table[col] = np.ascontiguousarray(unit_df[col].to_numpy(dtype=float))
+            else:
+                table[col] = unit_df[col].to_numpy(dtype=object)
+
+        return table
+
+    def unit_values(self, column, subset_name='units'):
+        return self.units[column][self.subset_pos[subset_name]]
+
+    def initial_state_values(self, column, subset_name='units'):
+        return self.initial_state[column][self.subset_pos[subset_name]]
+
+    def resource_trace(self, u):
+        technology = self.units['Technology'][self.unit_pos[u]]
+        return self.traces[mf.get_resource_trace_name(technology)]
+
+
 def load_master_sets(data, settings):
     sets = dict()
 
@@ -65,34 +143,62 @@ def load_master_sets(data, settings):
     sets['units'] = dkSet('units', data['units'].index.to_list())
     sets['scenarios'] = dkSet('scenarios', list(range(settings['NUM_SCENARIOS'])))
 
+    if 'reserve_indices' not in data:
+        data['reserve_indices'] = find_reserve_indices(data['as_reqt'])
+
+    sets['reserves'] = dkSet('reserves', data['reserve_indices'])
+
+    return sets
+
+
+def find_reserve_indices(as_reqt):
+    """
+    The reserves in the reserve requirement, in the order of all_reserve_indices.csv.
+    """
     all_reserve_indices = \
         pd.read_csv(os.path.join(default_files_path, 'all_reserve_indices.csv'))
-    reserve_indices = \
-        [r for r in all_reserve_indices['ReserveType'] if r in data['as_reqt'].columns]
 
-    sets['reserves'] = dkSet('reserves', reserve_indices)
+    if as_reqt is False:
+        return list()
 
-    return sets
+    return [r for r in all_reserve_indices['ReserveType'] if r in as_reqt.columns]
 
 
-def load_unit_subsets(data, sets, paths):
-    units_commit = create_unit_subsets('Commit', data, sets['units'], paths)
-    units_storage = create_unit_subsets('Storage', data, sets['units'], paths)
-    units_variable = create_unit_subsets('Variable', data, sets['units'], paths)
-    units_renewable = create_unit_subsets('Renewable', data, sets['units'], paths)
-    units_thermal = create_unit_subsets('Thermal', data, sets['units'], paths)
+unit_subset_categories = {
+    'units_commit': ('Commit', 'units'),
+    'units_storage': ('Storage', 'units'),
+    'units_variable': ('Variable', 'units'),
+    'units_renewable': ('Renewable', 'units'),
+    'units_thermal': ('Thermal', 'units'),
+    'units_inflex': ('Inflexible', 'units_commit'),
+    'units_flex': ('Flexible', 'units_commit')
+    }
 
-    sets['units_commit'] = dkSet('units_commit', units_commit, sets['units'])
-    sets['units_storage'] = dkSet('units_storage', units_storage, sets['units'])
-    sets['units_variable'] = dkSet('units_variable', units_variable, sets['units'])
-    sets['units_renewable'] = dkSet('units_renewable', units_renewable, sets['units'])
-    sets['units_thermal'] = dkSet('units_thermal', units_thermal, sets['units'])
 
-    units_inflex = create_unit_subsets('Inflexible', data, sets['units_commit'], paths)
-    units_flex = create_unit_subsets('Flexible', data, sets['units_commit'], paths)
+def find_unit_subsets(units_df, paths):
+    """
+    The units in each subset of unit_subset_categories, by the technology categories (which
+    are read once for all of the subsets).
+    """
+    tech_categories_df = read_tech_categories_file(paths)
+    unit_subsets = {'units': units_df.index.to_list()}
+
+    for subset_name, (category, master_name) in unit_subset_categories.items():
+        unit_subsets[subset_name] = \
+            create_unit_subsets(category, units_df, unit_subsets[master_name], tech_categories_df)
+
+    del unit_subsets['units']
 
-    sets['units_inflex'] = dkSet('units_inflex', units_inflex, sets['units_commit'])
-    sets['units_flex'] = dkSet('units_flex', units_flex, sets['units_commit'])
+    return unit_subsets
+
+
+def load_unit_subsets(data, sets, paths):
+    if 'unit_subsets' not in data:
+        data['unit_subsets'] = find_unit_subsets(data['units'], paths)
+
+    for subset_name, (category, master_name) in unit_subset_categories.items():
+        sets[subset_name] = \
+            dkSet(subset_name, data['unit_subsets'][subset_name], sets[master_name])
 
     return sets
 
@@ -115,8 +221,51 @@ def add_reserve_subsets(sets):
     return sets
 
 
+def num_look_ahead_intervals(settings):
+    return int(np.ceil(settings['LOOK_AHEAD_INTS'] / settings['LOOK_AHEAD_BLOCK_INTS']))
+
+
+def aggregate_look_ahead(data, settings):
+    """
+    Merges the look ahead intervals into blocks of LOOK_AHEAD_BLOCK_INTS intervals (the last
+    block may be shorter), taking the mean of the traces and reserve requirement over each
+    block. The blocks are numbered on from the first look ahead interval, and the duration of
+    each interval (in hours) is kept in data['interval_hours'].
+    """
+    intervals = data['traces']['demand'].index.to_list()
+    num_main = len(intervals) - settings['LOOK_AHEAD_INTS']
+    block_size = settings['LOOK_AHEAD_BLOCK_INTS']
+
+    data['interval_hours'] = \
+        pd.Series(1 / settings['INTERVALS_PER_HOUR'], index=intervals, name='Hours')
+    data['interval_hours'].index.name = 'Interval'
+
+    if block_size <= 1 or settings['LOOK_AHEAD_INTS'] == 0:
+        return data
+
+    first_block = intervals[num_main]
+    block_of_interval = \
+        intervals[:num_main] \
+        + [first_block + n // block_size for n in range(settings['LOOK_AHEAD_INTS'])]
+
+    for trace_name, trace in data['traces'].items():
+        data['traces'][trace_name] = trace.groupby(block_of_interval).mean()
+
+    if not data['missing_values']['as_reqt']:
+        data['as_reqt'] = \
+            data['as_reqt'].set_axis(intervals, axis=0).groupby(block_of_interval).mean()
+
+    data['interval_hours'] = data['interval_hours'].groupby(block_of_interval).sum()
+    data['interval_hours'].index.name = 'Interval'
+
+    print('Look ahead merged from %d intervals to %d blocks'
+          % (settings['LOOK_AHEAD_INTS'], num_look_ahead_intervals(settings)))
+
+    return data
+
+
 def load_interval_subsets(settings, sets):
-    last_main_interval = len(sets['intervals'].indices) - settings['LOOK_AHEAD_INTS'] - 1
+    last_main_interval = len(sets['intervals'].indices) - num_look_ahead_intervals(settings) - 1
 
     main_intervals = \
         [i for num, i in enumerate(sets['intervals'].indices) if num <= last_main_interval]
@@ -156,46 +305,62 @@ def make_multi_sets(sets):
     return m_sets
 
 
-def create_unit_subsets(subset, data, units, paths):
-    def read_tech_categories_file():
-        filename = 'technology_categories.csv'
-        paths['tech_cat_file'] = os.path.join(paths['inputs'], filename)
-
-        if os.path.exists(paths['tech_cat_file']):
-            tech_categories_df = pd.read_csv(paths['tech_cat_file'], index_col=0)
-        else:
-            tech_categories_df = mf.load_default_file(filename)
+def read_tech_categories_file(paths):
+    filename = 'technology_categories.csv'
+    paths['tech_cat_file'] = os.path.join(paths['inputs'], filename)
 
-        return tech_categories_df
+    if os.path.exists(paths['tech_cat_file']):
+        tech_categories_df = pd.read_csv(paths['tech_cat_file'], index_col=0)
+    else:
+        tech_categories_df = mf.load_default_file(filename)
 
-    def add_indices_to_subset():
-        subset_indices = []
+    return tech_categories_df
 
-        for u in units.indices:
-            unit_tech = data['units']['Technology'][u]
-            if tech_categories_df[subset][unit_tech] == 1:
-                subset_indices.append(u)
 
-        return subset_indices
+def create_unit_subsets(subset, units_df, unit_indices, tech_categories_df):
+    unit_techs = units_df['Technology'][unit_indices].to_numpy()
+    in_subset = tech_categories_df[subset][unit_techs].to_numpy() == 1
 
-    tech_categories_df = read_tech_categories_file()
-    subset_indices = add_indices_to_subset()
+    return [u for u, member in zip(unit_indices, in_subset) if member]
 
-    return subset_indices
 
+def define_scenario_probability(scenarios, data=None):
+    """
+    Equal probabilities, unless the scenarios were reduced from a larger pool (see
+    load_stochastic_traces), when the reduced probabilities are used.
+    """
+    if data is not None and 'scenario_reduction' in data:
+        return data['scenario_reduction']['probability']
 
-def define_scenario_probability(scenarios):
     scenario_prob = dict()
     for s in scenarios.indices:
         scenario_prob[s] = 1 / len(scenarios.indices)
     return scenario_prob
 
 
-def load_data(paths, settings):
+def load_data(paths, settings, series_window=None):
+    """
+    Loads the inputs of a problem. The traces come from series_window (the day's window of the
+    series traces, see series_traces.day_window) if it is given, otherwise from the ARMA trace
+    store.
+    """
     data = dict()
     missing_values = dict()
 
-    data['traces'] = load_stochastic_traces(paths, settings)
+    if settings['SCENARIO_POOL_SIZE'] > settings['NUM_SCENARIOS']:
+        import denkiuc.scenario_reduction as sr
+        pool_settings = dict(settings, NUM_SCENARIOS=settings['SCENARIO_POOL_SIZE'])
+        data['traces'], data['scenario_reduction'] = \
+            sr.reduce_traces(load_stochastic_traces(paths, pool_settings, series_window),
+                             settings['SCENARIO_POOL_SIZE'], settings['NUM_SCENARIOS'])
+    else:
+        data['traces'] = load_stochastic_traces(paths, settings, series_window)
+
+    if settings['COMPILE_INPUTS']:
+        import denkiuc.compiled_inputs as ci
+        data.update(ci.load_compiled_inputs(paths))
+        return data
+
     data['as_reqt'], missing_values = load_ancillary_service_requirements(paths, missing_values)
     data['units'] = load_unit_data(paths)
     data['initial_state'], missing_values = load_initial_state(paths, missing_values)
@@ -205,47 +370,15 @@ def load_data(paths, settings):
     return data
 
 
-def load_stochastic_traces(paths, settings):
-    import denkiuc.arma_generator as ag
-    import sqlite3
-
-    traces = dict()
-    mf.make_folder(paths['arma_out_dir'])
-
-    def generate_new_arma_db_if_needed(paths, settings):
-        arma_dbs = os.listdir(paths['arma_out_dir'])
-
-        if len(arma_dbs) == 0:
-            ag.run_arma_model(paths['inputs'], settings['NUM_SCENARIOS'], settings['RANDOM_SEED'])
-            return
-
-        max_scenario_db = max([int(f[0:3]) for f in arma_dbs])
-        if settings['NUM_SCENARIOS'] > max_scenario_db:
-            ag.run_arma_model(paths['inputs'], settings['NUM_SCENARIOS'], settings['RANDOM_SEED'])
-
-    def find_arma_db(paths, settings):
-        for db_file in os.listdir(paths['arma_out_dir']):
-            if int(db_file[0:3]) >= settings['NUM_SCENARIOS']:
-                return db_file
-
-    def load_traces_from_db_file(paths, db_file):
-        arma_db_path = os.path.join(paths['arma_out_dir'], db_file)
-        db_connection = sqlite3.connect(arma_db_path)
-
-        for trace_name in ['wind', 'solarPV', 'demand']:
-            query = 'select * from %s' % trace_name
-            traces[trace_name] = pd.read_sql_query(query, db_connection, index_col='Interval')
-            traces[trace_name].columns = traces[trace_name].columns.map(int)
-
-        db_connection.close()
-
-        return traces
+def load_stochastic_traces(paths, settings, series_window=None):
+    import denkiuc.trace_store as ts
 
-    generate_new_arma_db_if_needed(paths, settings)
-    db_file = find_arma_db(paths, settings)
-    traces = load_traces_from_db_file(paths, db_file)
+    if series_window is not None:
+        import denkiuc.series_traces as st
+        return st.window_traces(series_window, settings['NUM_SCENARIOS'])
 
-    return traces
+    return ts.load_traces(paths['arma_out_dir'], paths['inputs'], settings['NUM_SCENARIOS'],
+                          settings['RANDOM_SEED'], chunk_intervals=settings['ARMA_CHUNK_INTS'])
 
 
 def load_ancillary_service_requirements(paths, missing_values):
@@ -336,7 +469,7 @@ def validate_initial_state_data(data, sets):
 def add_default_values(data, sets):
     if data['missing_values']['as_reqt']:
         data['as_reqt'] = \
-            pd.DataFrame(0, index=sets['intervals'].indices, columns=sets['reserves'])
+            pd.DataFrame(0, index=sets['intervals'].indices, columns=sets['reserves'].indices)
 
     return data
 
@@ -0,0 +1,827 @@
+import numpy as np
+import pulp as pp
+import denkiuc.misc_functions as mf
+
+
+class dkBlock():
+    """
+    A family of constraints stored as COO triplets. Rows are numbered locally over the
+    block's shape (e.g. intervals x scenarios x units) and are offset when the blocks are
+    stacked into the model matrix. Sense is one of 'E' (==), 'L' (<=) or 'G' (>=). dims names
+    the set along each axis of the block, and dim_offsets the position in that set of the
+    first row along the axis.
+    """
+    def __init__(self, name, shape, sense, dims=None, dim_offsets=None):
+        self.name = name
+        self.shape = shape
+        self.sense = sense
+        self.dims = dims
+        self.dim_offsets = (0,) * len(shape) if dim_offsets is None else dim_offsets
+        self.num_rows = int(np.prod(shape))
+        self.row_ids = np.arange(self.num_rows).reshape(shape)
+        self.rhs = np.zeros(shape)
+        self.rows = list()
+        self.cols = list()
+        self.coefs = list()
+
+    def add_terms(self, cols, coefs, row_ids=None):
+        if row_ids is None:
+            row_ids = self.row_ids
+
+        row_ids, cols, coefs = np.broadcast_arrays(row_ids, cols, np.asarray(coefs, dtype=float))
+        self.rows.append(row_ids.ravel())
+        self.cols.append(cols.ravel())
+        self.coefs.append(coefs.ravel())
+
+    def coo(self):
+        if len(self.rows) == 0:
+            return np.zeros(0, dtype=int), np.zeros(0, dtype=int), np.zeros(0)
+
+        return np.concatenate(self.rows), np.concatenate(self.cols), np.concatenate(self.coefs)
+
+
+dim_keys = {'intervals': 'i', 'scenarios': 's', 'reserves': 'r', 'units': 'u',
+            'units_commit': 'u', 'units_variable': 'u', 'units_storage': 'u',
+            'units_inflex': 'u'}
+
+
+def axes(*sizes):
+    return np.ix_(*[np.arange(n) for n in sizes])
+
+
+def num_in(sets, set_name):
+    return len(sets[set_name].indices)
+
+
+def blk_supply_eq_demand(prob):
+    sets, data, vars = mf.prob_unpacker(prob, ['sets', 'data', 'vars'])
+    params = data['params']
+    nI, nS, nU, nUst = [num_in(sets, x) for x in
+                        ['intervals', 'scenarios', 'units', 'units_storage']]
+
+    blk = dkBlock('supply_eq_demand', (nI, nS), 'E', ('intervals', 'scenarios'))
+    i, s, u = axes(nI, nS, nU)
+    blk.add_terms(vars['power_generated'].columns(i, s, u), 1, blk.row_ids[:, :, None])
+
+    i, s, k = axes(nI, nS, nUst)
+    rt_eff = params.unit_values('RTEfficiency', 'units_storage')
+    blk.add_terms(vars['charge_after_losses'].columns(i, s, k), -1 / rt_eff,
+                  blk.row_ids[:, :, None])
+
+    i, s = axes(nI, nS)
+    blk.add_terms(vars['unserved_power'].columns(i, s), 1)
+    blk.rhs[:] = params.traces['demand']
+
+    return blk
+
+
+def blk_meet_reserve_requirement(prob):
+    sets, data, vars = mf.prob_unpacker(prob, ['sets', 'data', 'vars'])
+    params = data['params']
+    nR, nI, nS, nU = [num_in(sets, x) for x in ['reserves', 'intervals', 'scenarios', 'units']]
+
+    blk = dkBlock('meet_reserve_requirement', (nR, nI, nS), 'G',
+                  ('reserves', 'intervals', 'scenarios'))
+    r, i, s, u = axes(nR, nI, nS, nU)
+    blk.add_terms(vars['reserve_enabled'].columns(i, s, u, r), 1, blk.row_ids[..., None])
+
+    r, i, s = axes(nR, nI, nS)
+    blk.add_terms(vars['unserved_reserve'].columns(i, s, r), 1)
+
+    blk.rhs[:] = params.as_reqt.T[:, :, None]
+
+    return blk
+
+
+def blk_variable_resource_availability(prob):
+    sets, data, vars = mf.prob_unpacker(prob, ['sets', 'data', 'vars'])
+    params = data['params']
+    nUv, nS, nI = [num_in(sets, x) for x in ['units_variable', 'scenarios', 'intervals']]
+    var_pos = params.subset_pos['units_variable']
+
+    blk = dkBlock('variable_resource_availability', (nUv, nS, nI), 'L',
+                  ('units_variable', 'scenarios', 'intervals'))
+    k, s, i = axes(nUv, nS, nI)
+    blk.add_terms(vars['power_generated'].columns(i, s, var_pos[k]), 1)
+
+    capacity = params.unit_values('Capacity_MW', 'units_variable')
+    for n, u in enumerate(sets['units_variable'].indices):
+        blk.rhs[n] = params.resource_trace(u).T * capacity[n]
+
+    return blk
+
+
+def blk_commitment_continuity(prob):
+    sets, data, vars = mf.prob_unpacker(prob, ['sets', 'data', 'vars'])
+    params = data['params']
+    nI, nS, nUc = [num_in(sets, x) for x in ['intervals', 'scenarios', 'units_commit']]
+
+    blk = dkBlock('commitment_continuity', (nI, nS, nUc), 'E',
+                  ('intervals', 'scenarios', 'units_commit'))
+    i, s, k = axes(nI, nS, nUc)
+    blk.add_terms(vars['num_committed'].columns(i, s, k), 1)
+    blk.add_terms(vars['num_starting_up'].columns(i, s, k), -1)
+    blk.add_terms(vars['num_shutting_down'].columns(i, s, k), 1)
+    blk.add_terms(vars['num_committed'].columns(i[:-1], s, k), -1, blk.row_ids[1:])
+
+    blk.rhs[0] = params.initial_state_values('NumCommited', 'units_commit')
+
+    return blk
+
+
+def blk_inflexible_commitment(prob):
+    sets, vars = mf.prob_unpacker(prob, ['sets', 'vars'])
+    nI, nS, nUi = [num_in(sets, x) for x in ['intervals', 'scenarios', 'units_inflex']]
+    inflex_pos = np.array([sets['units_commit'].indices.index(u)
+                           for u in sets['units_inflex'].indices], dtype=int)
+
+    blk = dkBlock('inflexible_commitment', (nI, nS - 1, nUi), 'E',
+                  ('intervals', 'scenarios', 'units_inflex'), dim_offsets=(0, 1, 0))
+    i, s, k = axes(nI, nS - 1, nUi)
+    blk.add_terms(vars['num_committed'].columns(i, s + 1, inflex_pos[k]), 1)
+    blk.add_terms(vars['num_committed'].columns(i, 0, inflex_pos[k]), -1)
+
+    return blk
+
+
+def blk_max_unit_committed(prob):
+    sets, data, vars = mf.prob_unpacker(prob, ['sets', 'data', 'vars'])
+    params = data['params']
+    nI, nS, nUc = [num_in(sets, x) for x in ['intervals', 'scenarios', 'units_commit']]
+    commit_pos = params.subset_pos['units_commit']
+
+    blk = dkBlock('max_unit_committed', (nI, nS, nUc), 'L',
+                  ('intervals', 'scenarios', 'units_commit'))
+    i, s, k = axes(nI, nS, nUc)
+    blk.add_terms(vars['num_committed'].columns(i, s, k), 1)
+    blk.add_terms(vars['num_built'].columns(commit_pos[k]), -1)
+
+    return blk
+
+
+def blk_power_lt_committed_capacity(prob):
+    sets, data, vars = mf.prob_unpacker(prob, ['sets', 'data', 'vars'])
+    params = data['params']
+    nI, nS, nUc = [num_in(sets, x) for x in ['intervals', 'scenarios', 'units_commit']]
+    commit_pos = params.subset_pos['units_commit']
+
+    blk = dkBlock('power_lt_committed_capacity', (nI, nS, nUc), 'L',
+                  ('intervals', 'scenarios', 'units_commit'))
+    i, s, k = axes(nI, nS, nUc)
+    blk.add_terms(vars['power_generated'].columns(i, s, commit_pos[k]), 1)
+
+    for r in params.subset_pos['raise_reserves']:
+        blk.add_terms(vars['reserve_enabled'].columns(i, s, commit_pos[k], r), 1)
+
+    capacity = params.unit_values('Capacity_MW', 'units_commit')
+    blk.add_terms(vars['num_committed'].columns(i, s, k), -capacity)
+
+    return blk
+
+
+def blk_power_gt_min_stable_gen(prob):
+    sets, data, vars = mf.prob_unpacker(prob, ['sets', 'data', 'vars'])
+    params = data['params']
+    nI, nS, nUc = [num_in(sets, x) for x in ['intervals', 'scenarios', 'units_commit']]
+    commit_pos = params.subset_pos['units_commit']
+
+    blk = dkBlock('power_gt_min_stable_gen', (nI, nS, nUc), 'G',
+                  ('intervals', 'scenarios', 'units_commit'))
+    i, s, k = axes(nI, nS, nUc)
+    blk.add_terms(vars['power_generated'].columns(i, s, commit_pos[k]), 1)
+
+    for r in params.subset_pos['lower_reserves']:
+        blk.add_terms(vars['reserve_enabled'].columns(i, s, commit_pos[k], r), -1)
+
+    min_gen_MW = \
+        params.unit_values('Capacity_MW', 'units_commit') \
+        * params.unit_values('MinGen_pctCap', 'units_commit')
+    blk.add_terms(vars['num_committed'].columns(i, s, k), -min_gen_MW)
+
+    return blk
+
+
+def blk_power_lt_capacity(prob):
+    sets, data, vars = mf.prob_unpacker(prob, ['sets', 'data', 'vars'])
+    params = data['params']
+    nI, nS, nU = [num_in(sets, x) for x in ['intervals', 'scenarios', 'units']]
+
+    blk = dkBlock('power_lt_capacity', (nI, nS, nU), 'L', ('intervals', 'scenarios', 'units'))
+    i, s, u = axes(nI, nS, nU)
+    blk.add_terms(vars['power_generated'].columns(i, s, u), 1)
+
+    for r in params.subset_pos['raise_reserves']:
+        blk.add_terms(vars['reserve_enabled'].columns(i, s, u, r), 1)
+
+    capacity = params.unit_values('Capacity_MW', 'units')
+    blk.add_terms(vars['num_built'].columns(u), -capacity)
+
+    return blk
+
+
+def add_window_terms(blk, var, window_starts, coef):
+    """
+    Adds var[(i2, s, u)] * coef for every i2 in the window from window_starts[i, u] to
+    interval i. Rows of blk are (interval, unit, scenario).
+    """
+    nI, nUc, nS = blk.shape
+    window_size = np.arange(nI)[:, None] + 1 - window_starts
+
+    for lag in range(window_size.max(initial=0)):
+        i, k = np.nonzero(lag < window_size)
+        s = np.arange(nS)[None, :]
+        blk.add_terms(var.columns((i - lag)[:, None], s, k[:, None]), coef, blk.row_ids[i, k, :])
+
+
+def add_min_time_terms(prob, blk, var_name, column):
+    """
+    Subtracts the sum of var_name over each minimum up/down time window from the rows of blk.
+    With MIN_UP_DOWN_FORMULATION = 'cumulative' the window sum is the difference of two
+    cumulative totals, and the block defining those totals is returned along with blk.
+    """
+    from denkiuc.constraints import min_time_window_starts
+
+    data, vars, settings = mf.prob_unpacker(prob, ['data', 'vars', 'settings'])
+    nI, nUc, nS = blk.shape
+    window_starts = min_time_window_starts(data['params'], column)
+
+    if settings['MIN_UP_DOWN_FORMULATION'] != 'cumulative':
+        add_window_terms(blk, vars[var_name], window_starts, -1)
+        return blk
+
+    cumulative = vars['cumulative_' + var_name]
+
+    define_blk = dkBlock('define_cumulative_' + var_name, (nI, nUc, nS), 'E',
+                         ('intervals', 'units_commit', 'scenarios'))
+    i, k, s = axes(nI, nUc, nS)
+    define_blk.add_terms(cumulative.columns(i, s, k), 1)
+    define_blk.add_terms(vars[var_name].columns(i, s, k), -1)
+    i, k, s = axes(nI - 1, nUc, nS)
+    define_blk.add_terms(cumulative.columns(i, s, k), -1, define_blk.row_ids[1:])
+
+    i, k, s = axes(nI, nUc, nS)
+    blk.add_terms(cumulative.columns(i, s, k), -1)
+
+    i, k = np.nonzero(window_starts > 0)
+    s = np.arange(nS)[None, :]
+    blk.add_terms(cumulative.columns((window_starts[i, k] - 1)[:, None], s, k[:, None]), 1,
+                  blk.row_ids[i, k, :])
+
+    return [blk, define_blk]
+
+
+def blk_minimum_up_time(prob):
+    sets, vars = mf.prob_unpacker(prob, ['sets', 'vars'])
+    nI, nUc, nS = [num_in(sets, x) for x in ['intervals', 'units_commit', 'scenarios']]
+
+    blk = dkBlock('minimum_up_time', (nI, nUc, nS), 'G', ('intervals', 'units_commit', 'scenarios'))
+    i, k, s = axes(nI, nUc, nS)
+    blk.add_terms(vars['num_committed'].columns(i, s, k), 1)
+
+    return add_min_time_terms(prob, blk, 'num_starting_up', 'MinUpTime_h')
+
+
+def blk_minimum_down_time(prob):
+    sets, data, vars = mf.prob_unpacker(prob, ['sets', 'data', 'vars'])
+    nI, nUc, nS = [num_in(sets, x) for x in ['intervals', 'units_commit', 'scenarios']]
+    commit_pos = data['params'].subset_pos['units_commit']
+
+    blk = dkBlock('minimum_down_time', (nI, nUc, nS), 'G',
+                  ('intervals', 'units_commit', 'scenarios'))
+    i, k, s = axes(nI, nUc, nS)
+    blk.add_terms(vars['num_built'].columns(commit_pos[k]), 1)
+    blk.add_terms(vars['num_committed'].columns(i, s, k), -1)
+
+    return add_min_time_terms(prob, blk, 'num_shutting_down', 'MinDownTime_h')
+
+
+def blk_storage_continuity(prob):
+    sets, data, vars = mf.prob_unpacker(prob, ['sets', 'data', 'vars'])
+    params = data['params']
+    nI, nS, nUst = [num_in(sets, x) for x in ['intervals', 'scenarios', 'units_storage']]
+    storage_pos = params.subset_pos['units_storage']
+
+    blk = dkBlock('storage_continuity', (nI - 1, nS, nUst), 'E',
+                  ('intervals', 'scenarios', 'units_storage'),
+                  dim_offsets=(1, 0, 0))
+    i, s, k = axes(nI - 1, nS, nUst)
+    blk.add_terms(vars['energy_in_reservoir'].columns(i + 1, s, k), 1)
+    blk.add_terms(vars['energy_in_reservoir'].columns(i, s, k), -1)
+    hours = params.interval_hours[i + 1]
+    blk.add_terms(vars['charge_after_losses'].columns(i + 1, s, k), -hours)
+    blk.add_terms(vars['power_generated'].columns(i + 1, s, storage_pos[k]), hours)
+
+    return blk
+
+
+def blk_storage_continuity_first_int(prob):
+    sets, data, vars = mf.prob_unpacker(prob, ['sets', 'data', 'vars'])
+    params = data['params']
+    nS, nUst = [num_in(sets, x) for x in ['scenarios', 'units_storage']]
+    storage_pos = params.subset_pos['units_storage']
+    hours_per_interval = params.interval_hours[0]
+
+    blk = dkBlock('storage_continuity_first_int', (nS, nUst), 'E', ('scenarios', 'units_storage'))
+    s, k = axes(nS, nUst)
+    blk.add_terms(vars['energy_in_reservoir'].columns(0, s, k), 1)
+    blk.add_terms(vars['charge_after_losses'].columns(0, s, k), -hours_per_interval)
+    blk.add_terms(vars['power_generated'].columns(0, s, storage_pos[k]), hours_per_interval)
+
+    blk.rhs[:] = \
+        params.initial_state_values('StorageLevel_frac', 'units_storage') \
+        * params.unit_values('StorageCap_h', 'units_storage') \
+        * params.unit_values('Capacity_MW', 'units_storage')
+
+    return blk
+
+
+def blk_max_stored_energy(prob):
+    sets, data, vars = mf.prob_unpacker(prob, ['sets', 'data', 'vars'])
+    params = data['params']
+    nI, nS, nUst = [num_in(sets, x) for x in ['intervals', 'scenarios', 'units_storage']]
+
+    blk = dkBlock('max_stored_energy', (nI, nS, nUst), 'L',
+                  ('intervals', 'scenarios', 'units_storage'))
+    i, s, k = axes(nI, nS, nUst)
+    blk.add_terms(vars['energy_in_reservoir'].columns(i, s, k), 1)
+    blk.rhs[:] = \
+        params.unit_values('StorageCap_h', 'units_storage') \
+        * params.unit_values('Capacity_MW', 'units_storage')
+
+    return blk
+
+
+def blk_max_charge(prob):
+    sets, data, vars = mf.prob_unpacker(prob, ['sets', 'data', 'vars'])
+    params = data['params']
+    nI, nS, nUst = [num_in(sets, x) for x in ['intervals', 'scenarios', 'units_storage']]
+
+    blk = dkBlock('max_charge', (nI, nS, nUst), 'L', ('intervals', 'scenarios', 'units_storage'))
+    i, s, k = axes(nI, nS, nUst)
+    blk.add_terms(vars['charge_after_losses'].columns(i, s, k), 1)
+    blk.rhs[:] = \
+        params.unit_values('RTEfficiency', 'units_storage') \
+        * params.unit_values('Capacity_MW', 'units_storage')
+
+    return blk
+
+
+def blk_maximum_reserve_enablement(prob):
+    sets, data, vars = mf.prob_unpacker(prob, ['sets', 'data', 'vars'])
+    params = data['params']
+    nI, nS, nU, nR, nUc = [num_in(sets, x) for x in
+                           ['intervals', 'scenarios', 'units', 'reserves', 'units_commit']]
+    commit_pos = params.subset_pos['units_commit']
+    other_pos = np.setdiff1d(np.arange(nU), commit_pos)
+
+    max_reserves_per_unit = params.max_reserves_per_unit
+
+    blk = dkBlock('maximum_reserve_enablement', (nI, nS, nU, nR), 'L',
+                  ('intervals', 'scenarios', 'units', 'reserves'))
+    i, s, u, r = axes(nI, nS, nU, nR)
+    blk.add_terms(vars['reserve_enabled'].columns(i, s, u, r), 1)
+
+    i, s, k, r = axes(nI, nS, nUc, nR)
+    blk.add_terms(vars['num_committed'].columns(i, s, k),
+                  -max_reserves_per_unit[commit_pos], blk.row_ids[:, :, commit_pos, :])
+
+    i, s, k, r = axes(nI, nS, len(other_pos), nR)
+    blk.add_terms(vars['num_built'].columns(other_pos[k]),
+                  -max_reserves_per_unit[other_pos], blk.row_ids[:, :, other_pos, :])
+
+    return blk
+
+
+def blk_limit_rocof(prob):
+    """
+    With ROCOF_FORMULATION = 'system_inertia' the system inertia is held in its own variable,
+    defined once per (interval, scenario), so each contingency row only references that
+    variable and the unit's own terms. Otherwise every row carries the full inertia sum.
+    """
+    sets, data, vars, settings = mf.prob_unpacker(prob, ['sets', 'data', 'vars', 'settings'])
+    params = data['params']
+    nI, nS, nU, nUc = [num_in(sets, x) for x in
+                       ['intervals', 'scenarios', 'units', 'units_commit']]
+    commit_pos = params.subset_pos['units_commit']
+    max_rocof_x2 = 2 * settings['MAX_ROCOF']
+
+    capacity = params.unit_values('Capacity_MW', 'units')
+    inertia_per_unit = params.unit_values('InertialConst_s', 'units_commit') * capacity[commit_pos]
+
+    blk = dkBlock('limit_rocof', (nI, nS, nU), 'G', ('intervals', 'scenarios', 'units'))
+    blocks = [blk]
+
+    if settings['ROCOF_FORMULATION'] == 'system_inertia':
+        define_blk = dkBlock('define_system_inertia', (nI, nS), 'E', ('intervals', 'scenarios'))
+        i, s, k = axes(nI, nS, nUc)
+        define_blk.add_terms(vars['num_committed'].columns(i, s, k), -inertia_per_unit,
+                             define_blk.row_ids[..., None])
+        i, s = axes(nI, nS)
+        define_blk.add_terms(vars['system_inertia'].columns(i, s), 1)
+        blocks.append(define_blk)
+
+        i, s, u = axes(nI, nS, nU)
+        blk.add_terms(vars['system_inertia'].columns(i, s), max_rocof_x2, blk.row_ids)
+    else:
+        i, s, u, k = axes(nI, nS, nU, nUc)
+        blk.add_terms(vars['num_committed'].columns(i, s, k), max_rocof_x2 * inertia_per_unit,
+                      blk.row_ids[..., None])
+
+    i, s, k = axes(nI, nS, nUc)
+    rows = blk.row_ids[:, :, commit_pos]
+    blk.add_terms(vars['num_committed'].columns(i, s, k), -max_rocof_x2 * inertia_per_unit, rows)
+    blk.add_terms(vars['is_committed'].columns(i, s, k),
+                  -capacity[commit_pos] * settings['SYSTEM_FREQUENCY'], rows)
+
+    for n, u in enumerate(sets['units'].indices):
+        if u in sets['units_commit'].indices:
+            continue
+
+        elif u in sets['units_variable'].indices:
+            blk.rhs[:, :, n] = \
+                params.resource_trace(u) * capacity[n] * settings['SYSTEM_FREQUENCY']
+
+        elif u in sets['units_storage'].indices:
+            blk.rhs[:, :, n] = capacity[n] * settings['SYSTEM_FREQUENCY']
+
+    return blocks
+
+
+def blk_define_is_committed(prob):
+    sets, data, vars = mf.prob_unpacker(prob, ['sets', 'data', 'vars'])
+    params = data['params']
+    nI, nS, nUc = [num_in(sets, x) for x in ['intervals', 'scenarios', 'units_commit']]
+
+    blk = dkBlock('define_is_committed', (nI, nS, nUc), 'L',
+                  ('intervals', 'scenarios', 'units_commit'))
+    i, s, k = axes(nI, nS, nUc)
+    big_m = np.maximum(1000, params.unit_values('NoUnits', 'units_commit'))
+    blk.add_terms(vars['num_committed'].columns(i, s, k), 1)
+    blk.add_terms(vars['is_committed'].columns(i, s, k), -big_m)
+
+    return blk
+
+
+def ramp_rate_block(prob, name, direction):
+    sets, data, vars = mf.prob_unpacker(prob, ['sets', 'data', 'vars'])
+    params = data['params']
+    nI, nS, nUc = [num_in(sets, x) for x in ['intervals', 'scenarios', 'units_commit']]
+    commit_pos = params.subset_pos['units_commit']
+
+    capacity = params.unit_values('Capacity_MW', 'units_commit')
+    min_gen = params.unit_values('MinGen_pctCap', 'units_commit')
+    ramp_up = params.unit_values('RampRateUp_pctCapphr', 'units_commit')
+    ramp_down = params.unit_values('RampRateDown_pctCapphr', 'units_commit')
+    initial_power = \
+        params.initial_state_values('PowerGeneration_MW', 'units_commit')
+
+    blk = dkBlock(name, (nI, nS, nUc), 'L', ('intervals', 'scenarios', 'units_commit'))
+    i, s, k = axes(nI, nS, nUc)
+    power = vars['power_generated']
+    blk.add_terms(power.columns(i, s, commit_pos[k]), direction)
+    blk.add_terms(power.columns(i[:-1], s, commit_pos[k]), -direction, blk.row_ids[1:])
+    blk.rhs[0] = direction * initial_power
+
+    hours = params.interval_hours[i]
+    blk.add_terms(vars['num_committed'].columns(i, s, k), -ramp_up * capacity * hours)
+
+    if direction == 1:
+        start_var = vars['num_starting_up']
+        start_ramp = np.maximum(ramp_up * hours, min_gen)
+    else:
+        start_var = vars['num_shutting_down']
+        start_ramp = np.maximum(ramp_down * hours, min_gen)
+
+    blk.add_terms(start_var.columns(i, s, k), -start_ramp * capacity)
+
+    return blk
+
+
+def blk_ramp_rate_up(prob):
+    return ramp_rate_block(prob, 'ramp_rate_up', 1)
+
+
+def blk_ramp_rate_down(prob):
+    return ramp_rate_block(prob, 'ramp_rate_down', -1)
+
+
+def blk_num_built_fixed(prob):
+    sets, data, vars = mf.prob_unpacker(prob, ['sets', 'data', 'vars'])
+    params = data['params']
+    nU = num_in(sets, 'units')
+
+    blk = dkBlock('num_built_fixed', (nU,), 'E', ('units',))
+    blk.add_terms(vars['num_built'].columns(np.arange(nU)), 1)
+    blk.rhs[:] = params.unit_values('NoUnits', 'units')
+
+    return blk
+
+
+def assign_columns(vars):
+    col_vars = list()
+
+    for name, dkvar in vars.items():
+        dkvar.col_offset = len(col_vars)
+        col_vars += [dkvar.var[ind] for ind in dkvar.sets_indices]
+
+    return col_vars
+
+
+def add_all_blocks(prob, cnts_df):
+    from denkiuc.build_profiler import profile_build_step
+
+    blk_functions = {
+        'supply_eq_demand': blk_supply_eq_demand,
+        'meet_reserve_requirement': blk_meet_reserve_requirement,
+        'power_lt_capacity': blk_power_lt_capacity,
+        'variable_resource_availability': blk_variable_resource_availability,
+        'commitment_continuity': blk_commitment_continuity,
+        'inflexible_commitment': blk_inflexible_commitment,
+        'max_unit_committed': blk_max_unit_committed,
+        'power_lt_committed_capacity': blk_power_lt_committed_capacity,
+        'power_gt_min_stable_gen': blk_power_gt_min_stable_gen,
+        'minimum_up_time': blk_minimum_up_time,
+        'minimum_down_time': blk_minimum_down_time,
+        'ramp_rate_up': blk_ramp_rate_up,
+        'ramp_rate_down': blk_ramp_rate_down,
+        'storage_continuity': blk_storage_continuity,
+        'storage_continuity_first_int': blk_storage_continuity_first_int,
+        'max_stored_energy': blk_max_stored_energy,
+        'max_charge': blk_max_charge,
+        'maximum_reserve_enablement': blk_maximum_reserve_enablement,
+        'limit_rocof': blk_limit_rocof,
+        'define_is_committed': blk_define_is_committed,
+        'num_built_fixed': blk_num_built_fixed
+        }
+
+    blocks = list()
+    cnts_to_add_df = cnts_df[cnts_df['Include'] == 1]
+    print('\nAssembling the following constraint blocks')
+    for cnt in cnts_to_add_df.index:
+        print(' -' + cnt)
+        new_blocks = profile_build_step(prob, cnt, 'constraint', blk_functions[cnt])
+        blocks += new_blocks if isinstance(new_blocks, list) else [new_blocks]
+
+    print('\nAll constraint blocks are assembled')
+    return blocks
+
+
+def objective_vector(objective, col_vars):
+    col_of_var = {v.name: n for n, v in enumerate(col_vars)}
+    obj_coefs = np.zeros(len(col_vars))
+
+    for v, coef in objective.items():
+        obj_coefs[col_of_var[v.name]] += coef
+
+    return obj_coefs, objective.constant
+
+
+def sum_duplicate_entries(rows, cols, coefs):
+    """
+    Combines repeated (row, col) entries, e.g. a unit's own inertia appearing in both the system
+    and unit terms of limit_rocof, and drops entries which cancel to zero.
+    """
+    order = np.lexsort((cols, rows))
+    rows, cols, coefs = rows[order], cols[order], coefs[order]
+
+    is_new_entry = np.ones(len(rows), dtype=bool)
+    is_new_entry[1:] = (rows[1:] != rows[:-1]) | (cols[1:] != cols[:-1])
+    starts = np.nonzero(is_new_entry)[0]
+
+    rows, cols = rows[starts], cols[starts]
+    coefs = np.add.reduceat(coefs, starts) if len(starts) > 0 else coefs
+    is_nonzero = coefs != 0
+
+    return rows[is_nonzero], cols[is_nonzero], coefs[is_nonzero]
+
+
+def assemble_model(prob, cnts_df):
+    matrix = dict()
+
+    col_vars = assign_columns(prob['vars'])
+    blocks = add_all_blocks(prob, cnts_df)
+
+    rows, cols, coefs, row_lb, row_ub, row_sense = [], [], [], [], [], []
+    block_starts = dict()
+    num_rows = 0
+
+    for blk in blocks:
+        blk_rows, blk_cols, blk_coefs = blk.coo()
+        rows.append(blk_rows + num_rows)
+        cols.append(blk_cols)
+        coefs.append(blk_coefs)
+
+        rhs = blk.rhs.ravel()
+        row_lb.append(rhs if blk.sense in ['E', 'G'] else np.full(blk.num_rows, -np.inf))
+        row_ub.append(rhs if blk.sense in ['E', 'L'] else np.full(blk.num_rows, np.inf))
+        row_sense.append(np.full(blk.num_rows, blk.sense, dtype='<U1'))
+
+        block_starts[blk.name] = (num_rows, blk.num_rows, blk.sense)
+        num_rows += blk.num_rows
+
+        if 'row_index' in prob:
+            prob['row_index'].add_block(blk, prob['sets'], dim_keys)
+
+    matrix['rows'], matrix['cols'], matrix['coefs'] = \
+        sum_duplicate_entries(np.concatenate(rows), np.concatenate(cols), np.concatenate(coefs))
+    matrix['row_lb'] = np.concatenate(row_lb)
+    matrix['row_ub'] = np.concatenate(row_ub)
+    matrix['row_sense'] = np.concatenate(row_sense)
+    matrix['kept_rows'] = np.arange(num_rows)
+    matrix['blocks'] = block_starts
+    matrix['shape'] = (num_rows, len(col_vars))
+    matrix['compact_names'] = prob['settings']['NAMING_MODE'] == 'compact'
+
+    matrix['col_vars'] = col_vars
+    matrix['col_lb'] = \
+        np.array([-np.inf if v.lowBound is None else v.lowBound for v in col_vars], dtype=float)
+    matrix['col_ub'] = \
+        np.array([np.inf if v.upBound is None else v.upBound for v in col_vars], dtype=float)
+    matrix['integrality'] = \
+        np.array([v.cat in [pp.LpInteger, pp.LpBinary] for v in col_vars], dtype=int)
+
+    matrix['obj'], matrix['obj_constant'] = objective_vector(prob['mod'].objective, col_vars)
+
+    print('Matrix model has %d rows, %d columns and %d nonzeros'
+          % (num_rows, len(col_vars), len(matrix['coefs'])))
+
+    return matrix
+
+
+def make_row_names(matrix):
+    """
+    Names of the rows left in the matrix, numbered by their position before presolve.
+    """
+    if matrix['compact_names']:
+        return ['c%d' % n for n in matrix['kept_rows']]
+
+    row_names = list()
+    for name, (start, num_rows, sense) in matrix['blocks'].items():
+        row_names += ['%s_%d' % (name, n) for n in range(num_rows)]
+
+    return [row_names[n] for n in matrix['kept_rows']]
+
+
+def write_mps(matrix, mps_path):
+    num_rows, num_cols = matrix['shape']
+    row_names = make_row_names(matrix)
+    col_names = [v.name for v in matrix['col_vars']]
+
+    row_sense = matrix['row_sense']
+
+    order = np.lexsort((matrix['rows'], matrix['cols']))
+    entries_by_col = np.split(order, np.searchsorted(matrix['cols'][order], np.arange(1, num_cols)))
+
+    lines = ['NAME denkiuc', 'ROWS', ' N  OBJ']
+    lines += [' %s  %s' % (sense, name) for sense, name in zip(row_sense, row_names)]
+    lines.append('COLUMNS')
+
+    is_int_section = False
+    for c, entries in enumerate(entries_by_col):
+        is_int = bool(matrix['integrality'][c])
+        if is_int != is_int_section:
+            marker = 'INTORG' if is_int else 'INTEND'
+            lines.append("    MARKER                 'MARKER'                 '%s'" % marker)
+            is_int_section = is_int
+
+        if matrix['obj'][c] != 0 or len(entries) == 0:
+            lines.append('    %s  OBJ  %.12g' % (col_names[c], matrix['obj'][c]))
+        for e in entries:
+            lines.append('    %s  %s  %.12g'
+                         % (col_names[c], row_names[matrix['rows'][e]], matrix['coefs'][e]))
+
+    if is_int_section:
+        lines.append("    MARKER                 'MARKER'                 'INTEND'")
+
+    lines.append('RHS')
+    rhs = np.where(row_sense == 'L', matrix['row_ub'], matrix['row_lb'])
+    for r in np.nonzero(rhs)[0]:
+        lines.append('    RHS  %s  %.12g' % (row_names[r], rhs[r]))
+    if matrix['obj_constant'] != 0:
+        lines.append('    RHS  OBJ  %.12g' % -matrix['obj_constant'])
+
+    lines.append('BOUNDS')
+    for c in range(num_cols):
+        lb, ub = matrix['col_lb'][c], matrix['col_ub'][c]
+        if lb == ub:
+            lines.append(' FX BND  %s  %.12g' % (col_names[c], lb))
+            continue
+        if lb == -np.inf:
+            lines.append(' MI BND  %s' % col_names[c])
+        elif lb != 0:
+            lines.append(' LO BND  %s  %.12g' % (col_names[c], lb))
+        if ub != np.inf:
+            lines.append(' UP BND  %s  %.12g' % (col_names[c], ub))
+        elif matrix['integrality'][c]:
+            lines.append(' PL BND  %s' % col_names[c])
+
+    lines.append('ENDATA')
+
+    with open(mps_path, 'w') as f:
+        f.write('\n'.join(lines) + '\n')
+
+    print('Matrix model written to', mps_path)
+
+
+def solve_matrix_model(prob):
+    """
+    Solves the matrix model in process, with highspy if SOLVER is highs (and it is installed)
+    and scipy's milp otherwise. The primal values (and row duals, when the solver gives them)
+    are kept as arrays in prob['solution'] rather than being copied into the PuLP variables.
+    """
+    matrix, mod, settings = mf.prob_unpacker(prob, ['matrix', 'mod', 'settings'])
+
+    if settings['SOLVER'] == 'highs' and pp.HiGHS().available():
+        status, col_value, row_dual, solver_stats = solve_with_highspy(matrix, settings)
+    else:
+        status, col_value, row_dual, solver_stats = solve_with_milp(matrix, settings)
+
+    mod.status = status
+    prob['solution'] = {'col_value': col_value, 'row_dual': row_dual}
+    solver_stats['time_to_first_incumbent'] = float('nan')
+
+    return mod, solver_stats
+
+
+def solve_with_milp(matrix, settings):
+    import scipy.sparse
+    from scipy.optimize import Bounds, LinearConstraint, milp
+
+    A = scipy.sparse.csr_matrix((matrix['coefs'], (matrix['rows'], matrix['cols'])),
+                                shape=matrix['shape'])
+
+    result = milp(matrix['obj'],
+                  integrality=matrix['integrality'],
+                  bounds=Bounds(matrix['col_lb'], matrix['col_ub']),
+                  constraints=LinearConstraint(A, matrix['row_lb'], matrix['row_ub']),
+                  options={'time_limit': settings['SOLVER_TIME_LIMIT'],
+                           'mip_rel_gap': settings['SOLVER_REL_GAP'],
+                           'presolve': settings['SOLVER_PRESOLVE']})
+
+    status_map = {0: pp.LpStatusOptimal, 1: pp.LpStatusNotSolved, 2: pp.LpStatusInfeasible,
+                  3: pp.LpStatusUnbounded, 4: pp.LpStatusUndefined}
+    status = status_map[result.status]
+    if result.x is not None and result.status == 1:
+        status = pp.LpStatusOptimal
+
+    solver_stats = {'solver': 'scipy_milp',
+                    'mip_nodes': getattr(result, 'mip_node_count', None),
+                    'mip_iterations': None,
+                    'mip_best_bound': getattr(result, 'mip_dual_bound', None),
+                    'mip_gap': getattr(result, 'mip_gap', None)}
+
+    return status, result.x, None, solver_stats
+
+
+def solve_with_highspy(matrix, settings):
+    import highspy
+    import scipy.sparse
+
+    A = scipy.sparse.csc_matrix((matrix['coefs'], (matrix['rows'], matrix['cols'])),
+                                shape=matrix['shape'])
+
+    lp = highspy.HighsLp()
+    lp.num_row_, lp.num_col_ = matrix['shape']
+    lp.col_cost_ = matrix['obj']
+    lp.offset_ = matrix['obj_constant']
+    lp.col_lower_, lp.col_upper_ = matrix['col_lb'], matrix['col_ub']
+    lp.row_lower_, lp.row_upper_ = matrix['row_lb'], matrix['row_ub']
+    lp.a_matrix_.format_ = highspy.MatrixFormat.kColwise
+    lp.a_matrix_.start_, lp.a_matrix_.index_, lp.a_matrix_.value_ = \
+        A.indptr, A.indices, A.data
+    lp.integrality_ = [highspy.HighsVarType.kInteger if is_int else highspy.HighsVarType.kContinuous
+                       for is_int in matrix['integrality']]
+
+    h = highspy.Highs()
+    h.setOptionValue('output_flag', False)
+    h.setOptionValue('threads', settings['SOLVER_THREADS'])
+    h.setOptionValue('time_limit', float(settings['SOLVER_TIME_LIMIT']))
+    h.setOptionValue('mip_rel_gap', settings['SOLVER_REL_GAP'])
+    h.setOptionValue('presolve', 'on' if settings['SOLVER_PRESOLVE'] else 'off')
+    h.passModel(lp)
+    h.run()
+
+    model_status = h.getModelStatus()
+    info = h.getInfo()
+    solution = h.getSolution()
+    has_primal = info.primal_solution_status == 2
+
+    if model_status == highspy.HighsModelStatus.kOptimal or has_primal:
+        status = pp.LpStatusOptimal
+    elif model_status == highspy.HighsModelStatus.kInfeasible:
+        status = pp.LpStatusInfeasible
+    elif model_status == highspy.HighsModelStatus.kUnbounded:
+        status = pp.LpStatusUnbounded
+    else:
+        status = pp.LpStatusNotSolved
+
+    col_value = np.array(solution.col_value) if has_primal else None
+    row_dual = np.array(solution.row_dual) if info.dual_solution_status == 2 else None
+
+    solver_stats = {'solver': 'highspy',
+                    'mip_nodes': info.mip_node_count,
+                    'mip_iterations': info.simplex_iteration_count,
+                    'mip_best_bound': info.mip_dual_bound,
+                    'mip_gap': info.mip_gap}
+
+    return status, col_value, row_dual, solver_stats
@@ -40,14 +40,20 @@ def get_max_reserves_per_unit(unit, reserve, unit_data):
 
 
 def get_resource_trace(scenario, region, technology, data):
+    trace_name = get_resource_trace_name(technology)
+    trace = data['traces'][trace_name][scenario].to_dict()
+    return trace
+
+
+def get_resource_trace_name(technology):
     if technology == 'Wind':
-        trace = data['traces']['wind'][scenario].to_dict()
+        trace_name = 'wind'
     elif technology == 'SolarPV':
-        trace = data['traces']['solarPV'][scenario].to_dict()
+        trace_name = 'solarPV'
     else:
         print('Technology not known')
         exit()
-    return trace
+    return trace_name
 
 
 def print_preamble(name, path_to_inputs):
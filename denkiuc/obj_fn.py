@@ -1,66 +1,71 @@
+import numpy as np
 import pulp as pp
 import denkiuc.misc_functions as mf
 
 
 def build_obj_capital_term(prob):
-    sets, data, vars, settings = mf.prob_unpacker(prob, ['sets', 'data', 'vars', 'settings'])
+    sets, data, vars = mf.prob_unpacker(prob, ['sets', 'data', 'vars'])
+    params = data['params']
+    capital_cost = params.units['CapitalCost_$pMW'] * params.units['Capacity_MW']
 
     obj_capital_cost = \
         pp.lpSum(
-                 [vars['num_built'].var[u] * data['units']['CapitalCost_$pMW'][u]
-                  * data['units']['Capacity_MW'][u]
-                  for u in sets['units'].indices]
+                 [vars['num_built'].var[u] * capital_cost[pu]
+                  for pu, u in enumerate(sets['units'].indices)]
                 )
 
-    obj_capital_cost /= (8760 * len(sets['intervals'].indices) / settings['INTERVALS_PER_HOUR'])
+    obj_capital_cost /= (8760 * params.interval_hours.sum())
 
     return obj_capital_cost
 
 
 def build_obj_vom_term(prob):
-    sets, data, vars, settings = mf.prob_unpacker(prob, ['sets', 'data', 'vars', 'settings'])
+    sets, data, vars = mf.prob_unpacker(prob, ['sets', 'data', 'vars'])
+    params = data['params']
+    vom_cost = np.outer(params.units['VOM_$pMWh'], params.probability_of_scenario)
+    interval_hours = params.interval_hours
 
     obj_vom_cost = \
         pp.lpSum(
-                 [vars['power_generated'].var[(i, s, u)] * data['units']['VOM_$pMWh'][u]
-                  * data['probability_of_scenario'][s]
-                  for i in sets['intervals'].indices
-                  for u in sets['units'].indices
+                 [vars['power_generated'].var[(i, s, u)] * (vom_cost[pu, s] * interval_hours[pi])
+                  for pi, i in enumerate(sets['intervals'].indices)
+                  for pu, u in enumerate(sets['units'].indices)
                   for s in sets['scenarios'].indices]
                 )
 
-    obj_vom_cost /= settings['INTERVALS_PER_HOUR']
-
     return obj_vom_cost
 
 
 def build_obj_fuel_term(prob):
-    sets, data, vars, settings = mf.prob_unpacker(prob, ['sets', 'data', 'vars', 'settings'])
+    sets, data, vars = mf.prob_unpacker(prob, ['sets', 'data', 'vars'])
+    params = data['params']
+    fuel_cost = \
+        np.outer(3.6 * params.unit_values('FuelCost_$pGJ', 'units_commit')
+                 / params.unit_values('ThermalEfficiency', 'units_commit'),
+                 params.probability_of_scenario)
+    interval_hours = params.interval_hours
 
     obj_fuel_cost = \
         pp.lpSum(
-                 [vars['power_generated'].var[(i, s, u)]
-                  * 3.6 * data['units']['FuelCost_$pGJ'][u] / data['units']['ThermalEfficiency'][u]
-                  * data['probability_of_scenario'][s]
-                  for i in sets['intervals'].indices
-                  for u in sets['units_commit'].indices
+                 [vars['power_generated'].var[(i, s, u)] * (fuel_cost[k, s] * interval_hours[pi])
+                  for pi, i in enumerate(sets['intervals'].indices)
+                  for k, u in enumerate(sets['units_commit'].indices)
                   for s in sets['scenarios'].indices]
                 )
 
-    obj_fuel_cost /= settings['INTERVALS_PER_HOUR']
-
     return obj_fuel_cost
 
 
 def build_obj_start_cost_term(prob):
     sets, data, vars, = mf.prob_unpacker(prob, ['sets', 'data', 'vars'])
+    start_cost = data['params'].unit_values('StartCost_$', 'units_commit')
 
     obj_start_up_cost = \
         pp.lpSum(
-                 [vars['num_starting_up'].var[(i, s, u)] * data['units']['StartCost_$'][u]
+                 [vars['num_starting_up'].var[(i, s, u)] * start_cost[k]
                   for i in sets['intervals'].indices
                   for s in sets['scenarios'].indices
-                  for u in sets['units_commit'].indices]
+                  for k, u in enumerate(sets['units_commit'].indices)]
                 )
 
     return obj_start_up_cost
@@ -68,83 +73,93 @@ def build_obj_start_cost_term(prob):
 
 def build_obj_rec_value_term(prob):
     sets, data, vars, settings = mf.prob_unpacker(prob, ['sets', 'data', 'vars', 'settings'])
+    probability_of_scenario = data['params'].probability_of_scenario
+    interval_hours = data['params'].interval_hours
 
     obj_rec_value = \
         pp.lpSum(
-                 [vars['power_generated'].var[(i, s, u)] * settings['REC_PRICE']
-                  * data['probability_of_scenario'][s]
-                  for i in sets['intervals'].indices
+                 [vars['power_generated'].var[(i, s, u)]
+                  * (settings['REC_PRICE'] * probability_of_scenario[s] * interval_hours[pi])
+                  for pi, i in enumerate(sets['intervals'].indices)
                   for u in sets['units_renewable'].indices
                   for s in sets['scenarios'].indices]
                 )
 
-    obj_rec_value /= settings['INTERVALS_PER_HOUR']
-
     return obj_rec_value
 
 
 def build_obj_carbon_price_term(prob):
     sets, data, vars, settings = mf.prob_unpacker(prob, ['sets', 'data', 'vars', 'settings'])
+    params = data['params']
+    carbon_cost = \
+        np.outer(settings['CARBON_PRICE'] * 3.6
+                 * params.unit_values('Emissions_tonneCO2epGJ', 'units_thermal')
+                 / params.unit_values('ThermalEfficiency', 'units_thermal'),
+                 params.probability_of_scenario)
+    interval_hours = params.interval_hours
 
     obj_rec_value = \
         pp.lpSum(
-                 [vars['power_generated'].var[(i, s, u)]
-                  * settings['CARBON_PRICE']
-                  * data['probability_of_scenario'][s]
-                  * 3.6 * data['units']['Emissions_tonneCO2epGJ'][u]
-                  / data['units']['ThermalEfficiency'][u]
-                  for i in sets['intervals'].indices
-                  for u in sets['units_thermal'].indices
+                 [vars['power_generated'].var[(i, s, u)] * (carbon_cost[k, s] * interval_hours[pi])
+                  for pi, i in enumerate(sets['intervals'].indices)
+                  for k, u in enumerate(sets['units_thermal'].indices)
                   for s in sets['scenarios'].indices]
                 )
 
-    obj_rec_value /= settings['INTERVALS_PER_HOUR']
-
     return obj_rec_value
 
 
 def unserved_obj_fn_terms(prob):
     sets, data, vars, settings = mf.prob_unpacker(prob, ['sets', 'data', 'vars', 'settings'])
+    probability_of_scenario = data['params'].probability_of_scenario
+    interval_hours = data['params'].interval_hours
 
     obj_uns_power = \
         pp.lpSum(
-                 [settings['UNS_LOAD_PNTY'] * vars['unserved_power'].var[(i, s)]
-                  * data['probability_of_scenario'][s]
-                  for i in sets['intervals'].indices for s in sets['scenarios'].indices]
+                 [vars['unserved_power'].var[(i, s)]
+                  * (settings['UNS_LOAD_PNTY'] * probability_of_scenario[s] * interval_hours[pi])
+                  for pi, i in enumerate(sets['intervals'].indices)
+                  for s in sets['scenarios'].indices]
                 )
 
     obj_uns_reserve = \
         pp.lpSum(
-                 [settings['UNS_RESERVE_PNTY'] * vars['unserved_reserve'].var[(i, s, r)]
-                  * data['probability_of_scenario'][s]
-                  for i in sets['intervals'].indices
+                 [vars['unserved_reserve'].var[(i, s, r)]
+                  * (settings['UNS_RESERVE_PNTY'] * probability_of_scenario[s] * interval_hours[pi])
+                  for pi, i in enumerate(sets['intervals'].indices)
                   for s in sets['scenarios'].indices
                   for r in sets['reserves'].indices]
                 )
 
     obj_uns_inertia = \
         pp.lpSum(
-                 [settings['UNS_INERTIA_PNTY'] * vars['unserved_inertia'].var[i]
-                  for i in sets['intervals'].indices]
+                 [vars['unserved_inertia'].var[i]
+                  * (settings['UNS_INERTIA_PNTY'] * interval_hours[pi])
+                  for pi, i in enumerate(sets['intervals'].indices)]
                 )
 
-    obj_unserved_penalties = \
-        (obj_uns_power + obj_uns_reserve + obj_uns_inertia) / settings['INTERVALS_PER_HOUR']
+    obj_unserved_penalties = obj_uns_power + obj_uns_reserve + obj_uns_inertia
 
     return obj_unserved_penalties
 
 
 def obj_fn(prob):
-    obj_capital_cost = build_obj_capital_term(prob)
+    from denkiuc.build_profiler import profile_build_step
 
-    obj_vom_cost = build_obj_vom_term(prob)
-    obj_fuel_cost = build_obj_fuel_term(prob)
-    obj_start_up_cost = build_obj_start_cost_term(prob)
+    obj_capital_cost = \
+        profile_build_step(prob, 'capital_cost', 'obj_fn', build_obj_capital_term)
 
-    obj_unserved_penalties = unserved_obj_fn_terms(prob)
+    obj_vom_cost = profile_build_step(prob, 'vom_cost', 'obj_fn', build_obj_vom_term)
+    obj_fuel_cost = profile_build_step(prob, 'fuel_cost', 'obj_fn', build_obj_fuel_term)
+    obj_start_up_cost = \
+        profile_build_step(prob, 'start_up_cost', 'obj_fn', build_obj_start_cost_term)
+
+    obj_unserved_penalties = \
+        profile_build_step(prob, 'unserved_penalties', 'obj_fn', unserved_obj_fn_terms)
 
-    obj_rec_value = build_obj_rec_value_term(prob)
-    obj_carbon_cost = build_obj_carbon_price_term(prob)
+    obj_rec_value = profile_build_step(prob, 'rec_value', 'obj_fn', build_obj_rec_value_term)
+    obj_carbon_cost = \
+        profile_build_step(prob, 'carbon_cost', 'obj_fn', build_obj_carbon_price_term)
 
     obj_fn = \
         obj_capital_cost \
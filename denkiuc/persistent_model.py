@@ -0,0 +1,193 @@
+import copy
+import itertools
+import numpy as np
+import denkiuc.misc_functions as mf
+
+
+def record_family_rows(prob, family, rows_before):
+    """
+    Keeps the constraints added by a constraint family (in the order they were added), so that
+    their constants can be updated when the model is reused for a later day.
+    """
+    family_rows = prob.setdefault('family_rows', dict())
+    family_rows[family] = \
+        list(itertools.islice(prob['mod'].constraints.values(), rows_before, None))
+
+
+def can_reuse_model(prob, base_prob):
+    """
+    The model of base_prob can be reused if it was built by the pulp backend (without presolve,
+    which changes the structure using the data, or fixed integer pricing, which fixes the
+    integer variables) and all of the sets are the same size, with the same units, scenarios
+    and reserves.
+    """
+    settings = prob['settings']
+
+    if settings['MODEL_BACKEND'] != 'pulp' or settings['PRESOLVE_BOUNDS'] \
+            or settings['SOLVE_MODE'] != 'extensive' or settings['PRICING_MODE'] == 'fixed_integer':
+        print('Persistent model needs the pulp backend, extensive solve mode, no presolve and no'
+              ' fixed integer pricing')
+        return False
+
+    for set_name, dkset in prob['sets'].items():
+        base_indices = base_prob['sets'][set_name].indices
+        if len(dkset.indices) != len(base_indices):
+            return False
+        if 'intervals' not in set_name and dkset.indices != base_indices:
+            return False
+
+    return True
+
+
+def reuse_variables(prob, base_prob):
+    """
+    The variables of base_prob, indexed by the sets of prob. The n-th variable of each dkVar
+    is the same PuLP variable as in base_prob.
+    """
+    vars = dict()
+
+    for name, base_var in base_prob['vars'].items():
+        dkvar = copy.copy(base_var)
+        dkvar.sets = [prob['sets'][dkset.name] for dkset in base_var.sets]
+        dkvar.sets_indices = dkvar.make_var_indices(dkvar.sets)
+        dkvar.var = dict(zip(dkvar.sets_indices,
+                             (base_var.var[ind] for ind in base_var.sets_indices)))
+        vars[name] = dkvar
+
+    return vars
+
+
+def update_model(prob, base_prob):
+    """
+    Reuses the model of base_prob for prob, updating the constants of the constraint families
+    which depend on the traces, reserve requirements or initial state. If the scenarios were
+    reduced from a larger pool their probabilities differ from day to day, so the objective
+    function is rebuilt.
+    """
+    from denkiuc.build_profiler import profile_build_step
+    import denkiuc.obj_fn as obj
+
+    prob['mod'] = base_prob['mod']
+    prob['mod'].name = prob['name']
+    prob['family_rows'] = base_prob['family_rows']
+
+    print('\nUpdating the following constraints')
+    for family, constants_function in update_functions.items():
+        if family not in prob['family_rows']:
+            continue
+
+        print(' -' + family)
+
+        def update_family(prob):
+            rows = prob['family_rows'][family]
+            for row, constant in zip(rows, constants_function(prob)):
+                row.constant = float(constant)
+
+        profile_build_step(prob, family, 'update', update_family)
+
+    if 'scenario_reduction' in prob['data']:
+        print(' -objective function (reduced scenario probabilities)')
+        prob['mod'].setObjective(obj.obj_fn(prob))
+
+    return prob['mod']
+
+
+def supply_eq_demand_constants(prob):
+    return -prob['data']['params'].traces['demand'].ravel()
+
+
+def meet_reserve_requirement_constants(prob):
+    sets, data = mf.prob_unpacker(prob, ['sets', 'data'])
+    num_scenarios = len(sets['scenarios'].indices)
+
+    return np.repeat(-data['params'].as_reqt.T[:, :, None], num_scenarios, axis=2).ravel()
+
+
+def variable_resource_availability_constants(prob):
+    sets, data = mf.prob_unpacker(prob, ['sets', 'data'])
+    params = data['params']
+
+    constants = list()
+    for u in sets['units_variable'].indices:
+        capacity = params.units['Capacity_MW'][params.unit_pos[u]]
+        constants.append(-params.resource_trace(u).T * capacity)
+
+    return np.concatenate([c.ravel() for c in constants]) if len(constants) > 0 else []
+
+
+def commitment_continuity_constants(prob):
+    """
+    Only the rows of the first interval (units x scenarios) have a constant.
+    """
+    sets, data = mf.prob_unpacker(prob, ['sets', 'data'])
+    initial_num_committed = data['params'].initial_state_values('NumCommited', 'units_commit')
+
+    return np.repeat(-initial_num_committed, len(sets['scenarios'].indices))
+
+
+def storage_continuity_first_int_constants(prob):
+    sets, data = mf.prob_unpacker(prob, ['sets', 'data'])
+    params = data['params']
+
+    initial_energy_in_reservoir = \
+        params.initial_state_values('StorageLevel_frac', 'units_storage') \
+        * params.unit_values('StorageCap_h', 'units_storage') \
+        * params.unit_values('Capacity_MW', 'units_storage')
+
+    return np.tile(-initial_energy_in_reservoir, len(sets['scenarios'].indices))
+
+
+def ramp_rate_up_constants(prob):
+    """
+    Only the rows of the first interval (scenarios x units) have a constant.
+    """
+    sets, data = mf.prob_unpacker(prob, ['sets', 'data'])
+    initial_power = data['params'].initial_state_values('PowerGeneration_MW', 'units_commit')
+
+    return np.tile(-initial_power, len(sets['scenarios'].indices))
+
+
+def ramp_rate_down_constants(prob):
+    return -ramp_rate_up_constants(prob)
+
+
+def limit_rocof_constants(prob):
+    """
+    Each (interval, scenario) has a row per unit (after the system inertia row, if there is
+    one). Only units which are not committed have a constant, their contingency size.
+    """
+    sets, data, settings = mf.prob_unpacker(prob, ['sets', 'data', 'settings'])
+    params = data['params']
+
+    trace_shape = (len(sets['intervals'].indices), len(sets['scenarios'].indices))
+    row_constants = list()
+
+    if settings['ROCOF_FORMULATION'] == 'system_inertia':
+        row_constants.append(np.zeros(trace_shape))
+
+    for u in sets['units'].indices:
+        capacity = params.units['Capacity_MW'][params.unit_pos[u]]
+        if u in sets['units_commit'].indices:
+            contingency_size = np.zeros(trace_shape)
+        elif u in sets['units_variable'].indices:
+            contingency_size = params.resource_trace(u) * capacity
+        elif u in sets['units_storage'].indices:
+            contingency_size = np.full(trace_shape, capacity)
+        else:
+            contingency_size = np.zeros(trace_shape)
+
+        row_constants.append(-contingency_size * settings['SYSTEM_FREQUENCY'])
+
+    return np.stack(row_constants, axis=2).ravel()
+
+
+update_functions = {
+    'supply_eq_demand': supply_eq_demand_constants,
+    'meet_reserve_requirement': meet_reserve_requirement_constants,
+    'variable_resource_availability': variable_resource_availability_constants,
+    'commitment_continuity': commitment_continuity_constants,
+    'storage_continuity_first_int': storage_continuity_first_int_constants,
+    'ramp_rate_up': ramp_rate_up_constants,
+    'ramp_rate_down': ramp_rate_down_constants,
+    'limit_rocof': limit_rocof_constants
+    }
@@ -0,0 +1,169 @@
+import math
+import numpy as np
+import pulp as pp
+
+tolerance = 1e-9
+
+
+def single_variable_bounds(coef, lower, upper):
+    """
+    Bounds on x implied by lower <= coef * x <= upper.
+    """
+    if coef > 0:
+        return lower / coef, upper / coef
+
+    return upper / coef, lower / coef
+
+
+def tighten_bounds(var, lower, upper):
+    """
+    Tightens the bounds of var to [lower, upper], rounding to integers for integer variables.
+    Returns False (leaving the bounds unchanged) if the new bounds are inconsistent.
+    """
+    if var.cat in [pp.LpInteger, pp.LpBinary]:
+        lower = math.ceil(lower - tolerance) if lower > -math.inf else lower
+        upper = math.floor(upper + tolerance) if upper < math.inf else upper
+
+    if var.lowBound is not None:
+        lower = max(lower, var.lowBound)
+    if var.upBound is not None:
+        upper = min(upper, var.upBound)
+
+    if lower > upper + tolerance:
+        return False
+
+    var.lowBound = None if lower == -math.inf else lower
+    var.upBound = None if upper == math.inf else upper
+
+    if upper - lower <= tolerance:
+        var.upBound = var.lowBound
+
+    return True
+
+
+def fixed_value(var):
+    if var.lowBound is not None and var.lowBound == var.upBound:
+        return var.lowBound
+
+    return None
+
+
+def presolve_pulp_model(mod):
+    """
+    Removes rows with at most one free (unfixed) variable from mod, folding them into the
+    bounds of that variable. Passes are repeated until no more rows can be removed, since
+    fixing a variable can leave other rows with a single free variable.
+    """
+    rows_removed = 0
+    fixed_before = {v.name for v in mod.variables() if fixed_value(v) is not None}
+
+    while True:
+        rows_to_remove = list()
+
+        for name, constraint in mod.constraints.items():
+            constant = constraint.constant
+            free_terms = list()
+
+            for var, coef in constraint.items():
+                if coef == 0:
+                    continue
+                value = fixed_value(var)
+                if value is None:
+                    free_terms.append((var, coef))
+                else:
+                    constant += coef * value
+
+            if len(free_terms) > 1:
+                continue
+
+            lower = -constant if constraint.sense in [pp.LpConstraintGE, pp.LpConstraintEQ] \
+                else -math.inf
+            upper = -constant if constraint.sense in [pp.LpConstraintLE, pp.LpConstraintEQ] \
+                else math.inf
+
+            if len(free_terms) == 0:
+                if lower - tolerance <= 0 <= upper + tolerance:
+                    rows_to_remove.append(name)
+                continue
+
+            var, coef = free_terms[0]
+            if tighten_bounds(var, *single_variable_bounds(coef, lower, upper)):
+                rows_to_remove.append(name)
+
+        for name in rows_to_remove:
+            del mod.constraints[name]
+
+        rows_removed += len(rows_to_remove)
+        if len(rows_to_remove) == 0:
+            break
+
+    cols_fixed = len({v.name for v in mod.variables() if fixed_value(v) is not None}
+                     - fixed_before)
+
+    return {'presolve_rows_removed': rows_removed, 'presolve_cols_fixed': cols_fixed}
+
+
+def presolve_matrix(matrix):
+    """
+    The matrix model version of presolve_pulp_model. Removed rows are dropped from the COO
+    arrays, and matrix['kept_rows'] keeps the original number of each remaining row.
+    """
+    rows, cols, coefs = matrix['rows'], matrix['cols'], matrix['coefs']
+    num_rows = matrix['shape'][0]
+    col_lb, col_ub = matrix['col_lb'].copy(), matrix['col_ub'].copy()
+    is_int = matrix['integrality'].astype(bool)
+    fixed_before = np.sum(col_lb == col_ub)
+    kept = np.ones(num_rows, dtype=bool)
+
+    while True:
+        is_fixed = col_lb == col_ub
+        live = kept[rows] & (coefs != 0)
+        free = live & ~is_fixed[cols]
+
+        fixed_sum = np.bincount(rows[live & is_fixed[cols]],
+                                (coefs * col_lb[cols])[live & is_fixed[cols]], num_rows)
+        num_free = np.bincount(rows[free], minlength=num_rows)
+        lower = matrix['row_lb'] - fixed_sum
+        upper = matrix['row_ub'] - fixed_sum
+
+        empty = kept & (num_free == 0)
+        remove = empty & (lower - tolerance <= 0) & (0 <= upper + tolerance)
+
+        single = free & (num_free[rows] == 1)
+        r, c, a = rows[single], cols[single], coefs[single]
+        new_lb = np.where(a > 0, lower[r], upper[r]) / a
+        new_ub = np.where(a > 0, upper[r], lower[r]) / a
+        new_lb[is_int[c]] = np.ceil(new_lb[is_int[c]] - tolerance)
+        new_ub[is_int[c]] = np.floor(new_ub[is_int[c]] + tolerance)
+
+        tight_lb, tight_ub = col_lb.copy(), col_ub.copy()
+        np.maximum.at(tight_lb, c, new_lb)
+        np.minimum.at(tight_ub, c, new_ub)
+        consistent = tight_lb <= tight_ub + tolerance
+
+        tight_ub = np.where(consistent & (tight_ub - tight_lb <= tolerance), tight_lb, tight_ub)
+        col_lb = np.where(consistent, tight_lb, col_lb)
+        col_ub = np.where(consistent, tight_ub, col_ub)
+        remove[r[consistent[c]]] = True
+
+        kept &= ~remove
+        if not remove.any():
+            break
+
+    new_row_ids = np.cumsum(kept) - 1
+    keep_entries = kept[rows]
+
+    matrix['rows'] = new_row_ids[rows[keep_entries]]
+    matrix['cols'] = cols[keep_entries]
+    matrix['coefs'] = coefs[keep_entries]
+    for key in ['row_lb', 'row_ub', 'row_sense', 'kept_rows']:
+        matrix[key] = matrix[key][kept]
+    matrix['col_lb'], matrix['col_ub'] = col_lb, col_ub
+    matrix['shape'] = (int(kept.sum()), matrix['shape'][1])
+
+    for v, lb, ub in zip(matrix['col_vars'], col_lb, col_ub):
+        v.lowBound = None if lb == -np.inf else lb
+        v.upBound = None if ub == np.inf else ub
+
+    return {'presolve_rows_removed': int(num_rows - kept.sum()),
+            'presolve_cols_fixed': int(np.sum(col_lb == col_ub) - fixed_before)}
@@ -0,0 +1,137 @@
+import os
+import numpy as np
+import pandas as pd
+import pulp as pp
+import denkiuc.misc_functions as mf
+
+
+def relax_integers(vars):
+    """
+    Makes the integer and binary variables continuous (binary variables keep their upper bound
+    of 1), for PRICING_MODE = 'lp_relaxation'.
+    """
+    for name, dkvar in vars.items():
+        if dkvar.type in ['Integer', 'Binary']:
+            for v in dkvar.var.values():
+                v.cat = pp.LpContinuous
+            dkvar.type = 'Continuous'
+
+
+def fix_integers_and_resolve(prob):
+    """
+    For PRICING_MODE = 'fixed_integer'. The integer variables are fixed at their values in the
+    MIP solution and the remaining LP is solved again, so that the row duals are prices
+    which are consistent with the commitment. Returns None (with no solve) if the MIP solve gave
+    no integer solution to fix the integers at.
+    """
+    import denkiuc.uc_model as uc
+
+    if not uc.has_solution(prob, prob['mod']):
+        print('No MIP solution to fix the integers at, so no prices are found')
+        return None
+
+    if prob['settings']['MODEL_BACKEND'] == 'matrix':
+        matrix = prob['matrix']
+        is_int = matrix['integrality'].astype(bool)
+        fixed_values = np.round(prob['solution']['col_value'][is_int])
+        matrix['col_lb'][is_int] = fixed_values
+        matrix['col_ub'][is_int] = fixed_values
+        matrix['integrality'][:] = 0
+    else:
+        for name, dkvar in prob['vars'].items():
+            if dkvar.type not in ['Integer', 'Binary']:
+                continue
+            for v in dkvar.var.values():
+                v.lowBound = v.upBound = round(v.value())
+                v.cat = pp.LpContinuous
+
+    prob['warm_start'] = None
+    print('Integers fixed at their MIP values, solving again for prices')
+
+    return uc.solve_model(prob)
+
+
+def family_duals(prob, family, shape):
+    """
+    The duals of the rows of a constraint family, in the shape the family was built in.
+    """
+    if prob['settings']['MODEL_BACKEND'] == 'matrix':
+        matrix = prob['matrix']
+        row_dual = prob['solution']['row_dual']
+        if row_dual is None:
+            return np.full(shape, np.nan)
+
+        num_rows = sum(num_rows for start, num_rows, sense in matrix['blocks'].values())
+        all_duals = np.full(num_rows, np.nan)
+        all_duals[matrix['kept_rows']] = row_dual
+        start, num_rows, sense = matrix['blocks'][family]
+        duals = all_duals[start:start + num_rows]
+    else:
+        duals = np.array([np.nan if row.pi is None else row.pi
+                          for row in prob['family_rows'][family]])
+
+    return duals.reshape(shape)
+
+
+def has_family(prob, family):
+    if prob['settings']['MODEL_BACKEND'] == 'matrix':
+        return family in prob['matrix']['blocks']
+
+    return family in prob.get('family_rows', dict())
+
+
+def extract_prices(prob):
+    """
+    Energy and reserve prices ($/MWh) from the duals of the supply_eq_demand and
+    meet_reserve_requirement rows. The objective is weighted by the probability of each
+    scenario and the duration of each interval, which is undone here to get the price in
+    each scenario. The weighted price is the probability weighted sum over the scenarios.
+    """
+    sets, data = mf.prob_unpacker(prob, ['sets', 'data'])
+    probability_of_scenario = data['params'].probability_of_scenario
+    interval_hours = data['params'].interval_hours[:, None]
+
+    if prob['settings']['MODEL_BACKEND'] == 'matrix' and prob['solution']['row_dual'] is None:
+        print('Prices need the row duals, which the matrix backend only gets with SOLVER = highs')
+
+    if not has_family(prob, 'supply_eq_demand'):
+        print('Prices need the supply_eq_demand constraints')
+        return dict()
+
+    intervals, scenarios, reserves = \
+        sets['intervals'].indices, sets['scenarios'].indices, sets['reserves'].indices
+    prices = dict()
+
+    demand_duals = family_duals(prob, 'supply_eq_demand', (len(intervals), len(scenarios)))
+    energy_price = demand_duals / interval_hours / probability_of_scenario
+    prices['energy_price'] = pd.DataFrame(energy_price, index=intervals, columns=scenarios)
+
+    weighted_price = pd.DataFrame(index=intervals)
+    weighted_price['energy'] = energy_price @ probability_of_scenario
+
+    if has_family(prob, 'meet_reserve_requirement'):
+        reserve_duals = family_duals(prob, 'meet_reserve_requirement',
+                                     (len(reserves), len(intervals), len(scenarios)))
+        reserve_price = reserve_duals / interval_hours / probability_of_scenario
+
+        df_cols = pd.MultiIndex.from_product([scenarios, reserves], names=['scenarios', 'reserves'])
+        prices['reserve_price'] = \
+            pd.DataFrame(reserve_price.transpose(1, 2, 0).reshape(len(intervals), -1),
+                         index=intervals, columns=df_cols)
+
+        for pr, r in enumerate(reserves):
+            weighted_price[r] = reserve_price[pr] @ probability_of_scenario
+
+    prices['weighted_price'] = weighted_price
+
+    for name, price_df in prices.items():
+        price_df.index.name = 'intervals'
+
+    return prices
+
+
+def write_prices(prices, results_path):
+    for name, price_df in prices.items():
+        price_df.to_csv(os.path.join(results_path, name + '_$pMWh.csv'))
+
+    print('Prices written')
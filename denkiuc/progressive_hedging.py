@@ -0,0 +1,205 @@
+import concurrent.futures
+import copy
+import os
+import time
+import numpy as np
+import pandas as pd
+import pulp as pp
+import denkiuc.load_data as ld
+import denkiuc.misc_functions as mf
+import denkiuc.row_index as ri
+
+scenario_cache = dict()
+
+
+def run_progressive_hedging(prob):
+    """
+    Solves each scenario as its own subproblem, and uses progressive hedging on the commitment
+    of the inflexible units to bring the scenarios into agreement. The scenarios are split into
+    PH_PROCESSES groups, each pinned to a single worker process which builds the subproblems of
+    its group once, so that each iteration only sends the weights, consensus and rho. Returns
+    the consensus commitment (intervals x units_inflex), and adds the convergence history,
+    lower bound and wall time to prob['stats'].
+    """
+    settings, paths = mf.prob_unpacker(prob, ['settings', 'paths'])
+
+    scenarios = ld.dkSet('scenarios', list(range(settings['NUM_SCENARIOS'])))
+    scenario_probability = \
+        np.array(list(ld.define_scenario_probability(scenarios, prob['data']).values()))
+
+    num_processes = settings['PH_PROCESSES'] if settings['PH_PROCESSES'] > 0 else os.cpu_count()
+    num_groups = min(num_processes, len(scenarios.indices))
+    scenario_groups = [scenarios.indices[g::num_groups] for g in range(num_groups)]
+    group_of_scenario = {s: g for g, group in enumerate(scenario_groups) for s in group}
+
+    rho = settings['PH_RHO']
+    weights = [None] * len(scenarios.indices)
+    consensus = None
+    history = list()
+    converged = False
+
+    time_start = time.perf_counter()
+
+    pools = [concurrent.futures.ProcessPoolExecutor(
+                 max_workers=1, initializer=build_scenario_subproblems,
+                 initargs=([make_scenario_task(prob, s) for s in group],))
+             for group in scenario_groups]
+
+    try:
+        for iteration in range(settings['PH_MAX_ITERATIONS'] + 1):
+            futures = [pools[group_of_scenario[s]].submit(solve_scenario_subproblem, s,
+                                                          weights[s], consensus, rho)
+                       for s in scenarios.indices]
+
+            results = [future.result() for future in futures]
+            commitment = np.array([result['commitment'] for result in results])
+            expected_cost = scenario_probability @ [result['cost'] for result in results]
+
+            consensus = np.tensordot(scenario_probability, commitment, axes=1)
+            convergence = \
+                scenario_probability @ np.abs(commitment - consensus).mean(axis=(1, 2))
+
+            if iteration == 0:
+                lower_bound = scenario_probability @ [result['best_bound'] for result in results]
+                weights = [np.zeros(consensus.shape) for s in scenarios.indices]
+
+            weights = [w + rho * (x - consensus) for w, x in zip(weights, commitment)]
+
+            history.append({'Iteration': iteration, 'Convergence': convergence,
+                            'ExpectedCost': expected_cost,
+                            'WallTime_s': time.perf_counter() - time_start})
+            print('Progressive hedging iteration %d: convergence %f, expected cost %f'
+                  % (iteration, convergence, expected_cost))
+
+            if convergence <= settings['PH_TOLERANCE']:
+                converged = True
+                break
+    finally:
+        for pool in pools:
+            pool.shutdown()
+
+    history_df = pd.DataFrame(history).set_index('Iteration')
+    history_df.to_csv(os.path.join(paths['outputs'], 'ph_convergence.csv'))
+
+    prob['stats']['ph_iterations'] = iteration
+    prob['stats']['ph_converged'] = converged
+    prob['stats']['ph_convergence'] = convergence
+    prob['stats']['ph_lower_bound'] = lower_bound
+    prob['stats']['ph_wall_time'] = time.perf_counter() - time_start
+
+    return np.round(consensus)
+
+
+def make_scenario_task(prob, s):
+    """
+    The inputs for the subproblem of scenario s: the loaded data with the traces of scenario s
+    only (renumbered as scenario 0).
+    """
+    data = copy.copy(prob['data'])
+    data.pop('scenario_reduction', None)
+    data['traces'] = {trace_name: trace[[s]].set_axis([0], axis=1)
+                      for trace_name, trace in prob['data']['traces'].items()}
+
+    settings = dict(prob['settings'], NUM_SCENARIOS=1, MODEL_BACKEND='pulp', WRITE_MPS=False)
+
+    return {'name': prob['name'], 'scenario': s, 'data': data, 'settings': settings,
+            'paths': prob['paths']}
+
+
+def build_scenario_subproblems(tasks):
+    """
+    Runs once in each worker process, and builds the subproblems of its scenarios.
+    """
+    for task in tasks:
+        scenario_cache[task['scenario']] = build_scenario_subproblem(task)
+
+
+def build_scenario_subproblem(task):
+    import denkiuc.uc_model as uc
+
+    sub = uc.init_prob('%s_scenario_%d' % (task['name'], task['scenario']))
+    sub['paths'], sub['settings'], sub['data'] = task['paths'], task['settings'], task['data']
+
+    sub['sets'], sub['data'], sub['m_sets'] = \
+        uc.arrange_sets_and_data(sub['data'], sub['settings'], sub['paths'])
+    sub['vars'] = uc.add_variables(sub['m_sets'], sub['settings'])
+    sub['mod'] = uc.build_model(sub)
+    sub['base_obj'] = sub['mod'].objective
+
+    add_deviation_rows(sub)
+
+    return sub
+
+
+def add_deviation_rows(sub):
+    """
+    Adds the rows num_committed - deviation_above + deviation_below == consensus for each
+    inflexible unit, so that rho * |num_committed - consensus| can be added to the objective
+    linearly. The consensus is set as the constant of each row before each solve.
+    """
+    sets, vars, mod = mf.prob_unpacker(sub, ['sets', 'vars', 'mod'])
+    sub['deviation_rows'] = dict()
+    sub['deviations'] = list()
+
+    for i in sets['intervals'].indices:
+        for u in sets['units_inflex'].indices:
+            above = pp.LpVariable('ph_deviation_above_%d_%s' % (i, u), lowBound=0)
+            below = pp.LpVariable('ph_deviation_below_%d_%s' % (i, u), lowBound=0)
+            sub['deviations'] += [above, below]
+
+            label = ri.row_label(sub, 'ph_deviation_i_%(i)d_u_%(u)s', i=i, u=u)
+            mod += vars['num_committed'].var[(i, 0, u)] - above + below == 0, label
+            sub['deviation_rows'][(i, u)] = mod.constraints[label]
+
+
+def update_objective(sub, weights, consensus, rho):
+    sets, vars, mod = mf.prob_unpacker(sub, ['sets', 'vars', 'mod'])
+
+    if weights is None:
+        mod.setObjective(sub['base_obj'])
+        return
+
+    weight_terms = list()
+    for pi, i in enumerate(sets['intervals'].indices):
+        for k, u in enumerate(sets['units_inflex'].indices):
+            weight_terms.append(weights[pi, k] * vars['num_committed'].var[(i, 0, u)])
+            sub['deviation_rows'][(i, u)].constant = -consensus[pi, k]
+
+    mod.setObjective(sub['base_obj'] + pp.lpSum(weight_terms) + rho * pp.lpSum(sub['deviations']))
+
+
+def solve_scenario_subproblem(s, weights, consensus, rho):
+    """
+    Runs in the worker process which built the subproblem of scenario s, so that each
+    iteration only updates the objective and the consensus. The best bound of the solve is
+    returned with the cost (the objective value if the solver does not report one, e.g. for a
+    linear program).
+    """
+    import denkiuc.uc_model as uc
+
+    sub = scenario_cache[s]
+
+    update_objective(sub, weights, consensus, rho)
+    stats = uc.solve_model(sub)
+
+    commitment = \
+        np.array([[sub['vars']['num_committed'].var[(i, 0, u)].value()
+                   for u in sub['sets']['units_inflex'].indices]
+                  for i in sub['sets']['intervals'].indices])
+
+    best_bound = stats['mip_best_bound']
+    if best_bound is None:
+        best_bound = stats['obj_fn_value']
+
+    return {'commitment': commitment, 'cost': pp.value(sub['base_obj']),
+            'best_bound': best_bound, 'status': stats['optimality_status']}
+
+
+def fix_inflexible_commitment(prob, consensus):
+    sets, vars = mf.prob_unpacker(prob, ['sets', 'vars'])
+
+    for pi, i in enumerate(sets['intervals'].indices):
+        for k, u in enumerate(sets['units_inflex'].indices):
+            for s in sets['scenarios'].indices:
+                vars['num_committed'].var[(i, s, u)].lowBound = consensus[pi, k]
+                vars['num_committed'].var[(i, s, u)].upBound = consensus[pi, k]
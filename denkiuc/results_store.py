@@ -0,0 +1,98 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+
+def write_results(vars, sets, results_path):
+    """
+    Writes each variable once, as a compressed Parquet file in long form: a typed column for
+    each of the variable's sets, a value column and (for variables indexed by interval) a
+    look_ahead column. Trimmed results are the rows where look_ahead is False.
+    """
+    import importlib.util
+
+    if importlib.util.find_spec('pyarrow') is None:
+        print('The parquet results format needs pyarrow to be installed')
+        exit()
+
+    store_path = os.path.join(results_path, 'store')
+    os.makedirs(store_path, exist_ok=True)
+
+    for name, dkvar in vars.items():
+        long_df = long_form(dkvar, sets['look_ahead_intervals'].indices)
+        long_df.to_parquet(os.path.join(store_path, store_filename(dkvar)),
+                           compression='zstd', index=False)
+
+    print("Variables written to the results store")
+
+
+def store_filename(dkvar):
+    return dkvar.name + '_' + dkvar.units + '.parquet'
+
+
+def long_form(dkvar, look_ahead_intervals):
+    """
+    The variable's result values (in the order of sets_indices) as a long frame. Each set
+    column is built by repeating the set's indices, and sets of strings are categoricals.
+    """
+    long_df = pd.DataFrame()
+
+    for n, dkset in enumerate(dkvar.sets):
+        inner = int(np.prod(dkvar.shape[n + 1:]))
+        outer = int(np.prod(dkvar.shape[:n]))
+        codes = np.tile(np.repeat(np.arange(dkvar.shape[n]), inner), outer)
+
+        indices = pd.Index(dkset.indices)
+        if pd.api.types.is_integer_dtype(indices):
+            long_df[dkset.name] = indices.to_numpy()[codes]
+        else:
+            long_df[dkset.name] = pd.Categorical.from_codes(codes, categories=indices)
+
+    values = np.nan_to_num(dkvar.result_values, nan=-9999)
+    if dkvar.type in ['Integer', 'Binary']:
+        values = values.round().astype(int)
+    long_df['value'] = values
+
+    if 'intervals' in long_df.columns:
+        long_df['look_ahead'] = np.isin(long_df['intervals'], look_ahead_intervals)
+
+    return long_df
+
+
+def read_variable(results_path, filename, look_ahead=True):
+    """
+    Reads a variable from the results store, without the look ahead intervals unless
+    look_ahead is True.
+    """
+    long_df = pd.read_parquet(os.path.join(results_path, 'store', filename))
+
+    if not look_ahead and 'look_ahead' in long_df.columns:
+        long_df = long_df[~long_df['look_ahead']]
+
+    return long_df
+
+
+def export_csv(results_path, look_ahead=True):
+    """
+    Writes a CSV of each variable in the results store to <results>/csv, for when the
+    results are needed outside of Python.
+    """
+    csv_path = os.path.join(results_path, 'csv')
+    os.makedirs(csv_path, exist_ok=True)
+
+    for filename in sorted(os.listdir(os.path.join(results_path, 'store'))):
+        long_df = read_variable(results_path, filename, look_ahead)
+        long_df.to_csv(os.path.join(csv_path, filename[:-len('.parquet')] + '.csv'),
+                       index=False)
+
+    print("Results store exported to", csv_path)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print("Not enough arguments. Should be 1) path to a results folder and 2) (optional)",
+              " 'trimmed' to leave out the look ahead intervals.")
+        exit()
+
+    export_csv(sys.argv[1], look_ahead=not (len(sys.argv) > 2 and sys.argv[2] == 'trimmed'))
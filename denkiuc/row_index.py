@@ -0,0 +1,177 @@
+import numpy as np
+import pandas as pd
+
+
+class dkRowIndex():
+    """
+    Side index for NAMING_MODE = 'compact'. Rows are named c0, c1, ... and this keeps the
+    family and (interval, scenario, unit, reserve) of each row, so that the full row names
+    are only made when they are asked for (e.g. when diagnosing an infeasible model).
+
+    The index is kept as int32 arrays appended a block of rows at a time, with units and
+    reserves as codes into self.labels and -1 where a row has no such index. Matrix blocks are
+    added whole, and the rows of the pulp backend are gathered until the end of each family.
+    """
+    keys = ['i', 's', 'u', 'r']
+    coded_keys = ['u', 'r']
+    name_chunk_size = 4096
+
+    def __init__(self):
+        self.family = None
+        self.label_formats = list()
+        self.format_families = list()
+        self.format_ids = dict()
+        self.labels = {key: list() for key in self.coded_keys}
+        self.label_codes = {key: dict() for key in self.coded_keys}
+        self.blocks = {key: list() for key in ['format'] + self.keys}
+        self.pending_rows = list()
+        self.num_rows = 0
+        self.row_names = list()
+
+    def get_format_id(self, label_format):
+        if label_format not in self.format_ids:
+            self.format_ids[label_format] = len(self.label_formats)
+            self.label_formats.append(label_format)
+            self.format_families.append(self.family)
+
+        return self.format_ids[label_format]
+
+    def get_code(self, key, label):
+        if label not in self.label_codes[key]:
+            self.label_codes[key][label] = len(self.labels[key])
+            self.labels[key].append(label)
+
+        return self.label_codes[key][label]
+
+    def start_family(self, family):
+        self.flush_rows()
+        self.family = family
+
+    def add_row(self, label_format, index):
+        row = [self.get_format_id(label_format)]
+        for key in self.keys:
+            if index.get(key) is None:
+                row.append(-1)
+            elif key in self.coded_keys:
+                row.append(self.get_code(key, index[key]))
+            else:
+                row.append(index[key])
+
+        self.pending_rows.append(row)
+
+        return self.row_name(self.num_rows + len(self.pending_rows) - 1)
+
+    def flush_rows(self):
+        """
+        Appends the rows gathered by add_row as a block.
+        """
+        if len(self.pending_rows) == 0:
+            return
+
+        pending = np.array(self.pending_rows, dtype=np.int32)
+        for n, key in enumerate(['format'] + self.keys):
+            self.blocks[key].append(pending[:, n])
+
+        self.num_rows += len(self.pending_rows)
+        self.pending_rows = list()
+
+    def add_block(self, blk, sets, dim_keys):
+        """
+        Adds every row of a matrix block, with the index of each row taken from the block's
+        dims (a set name per axis of the block).
+        """
+        self.flush_rows()
+
+        keys = [dim_keys[dim] for dim in blk.dims]
+        label_format = blk.name + ''.join('_%s_%%(%s)s' % (key, key) for key in keys)
+        format_id = self.get_format_id(label_format)
+        self.format_families[format_id] = blk.name
+
+        positions = np.unravel_index(np.arange(blk.num_rows), blk.shape)
+        block_index = {key: np.full(blk.num_rows, -1, dtype=np.int32) for key in self.keys}
+        for key, dim, pos, offset in zip(keys, blk.dims, positions, blk.dim_offsets):
+            if key in self.coded_keys:
+                set_codes = [self.get_code(key, label) for label in sets[dim].indices]
+            else:
+                set_codes = sets[dim].indices
+            block_index[key] = np.asarray(set_codes, dtype=np.int32)[pos + offset]
+
+        self.blocks['format'].append(np.full(blk.num_rows, format_id, dtype=np.int32))
+        for key in self.keys:
+            self.blocks[key].append(block_index[key])
+
+        self.num_rows += blk.num_rows
+
+    def row_name(self, row):
+        """
+        Row names are made a chunk at a time and kept, as the pulp model refers to them.
+        """
+        while row >= len(self.row_names):
+            first_row = len(self.row_names)
+            row_numbers = np.arange(first_row, first_row + self.name_chunk_size).astype(str)
+            self.row_names += np.char.add('c', row_numbers).tolist()
+
+        return self.row_names[row]
+
+    def row_number(self, row_name):
+        return int(row_name[1:])
+
+    def arrays(self):
+        """
+        The format and index arrays of all of the rows, joined into one array each.
+        """
+        self.flush_rows()
+
+        for key, blocks in self.blocks.items():
+            if len(blocks) != 1:
+                self.blocks[key] = [np.concatenate(blocks + [np.zeros(0, dtype=np.int32)])]
+
+        return {key: blocks[0] for key, blocks in self.blocks.items()}
+
+    def index_value(self, key, code):
+        if code < 0:
+            return None
+        if key in self.coded_keys:
+            return self.labels[key][code]
+
+        return int(code)
+
+    def label(self, row_name):
+        row = self.row_number(row_name)
+        arrays = self.arrays()
+        index = {key: self.index_value(key, arrays[key][row]) for key in self.keys}
+
+        return self.label_formats[arrays['format'][row]] % index
+
+    def to_df(self, with_labels=False):
+        arrays = self.arrays()
+        if self.num_rows > 0:
+            self.row_name(self.num_rows - 1)
+
+        row_index_df = pd.DataFrame(index=pd.Index(self.row_names[:self.num_rows], name='Row'))
+        row_index_df['Family'] = np.array(self.format_families, dtype=object)[arrays['format']]
+
+        for key in self.keys:
+            if key in self.coded_keys:
+                labels = np.array(self.labels[key] + [None], dtype=object)
+                row_index_df[key] = labels[arrays[key]]
+            else:
+                row_index_df[key] = \
+                    pd.arrays.IntegerArray(arrays[key].astype('int64'), arrays[key] < 0)
+
+        if with_labels:
+            row_index_df['Label'] = [self.label(row) for row in row_index_df.index]
+
+        return row_index_df
+
+
+def row_label(prob, label_format, **index):
+    """
+    Returns the name for a constraint row. label_format uses named fields (i, s, u, r), e.g.
+    'power_lt_cap_%(u)s_i_%(i)d_s_%(s)d'. In compact naming mode the index is recorded in
+    prob['row_index'] and a short name is returned instead.
+    """
+    if prob['settings']['NAMING_MODE'] == 'compact':
+        return prob['row_index'].add_row(label_format, index)
+
+    return label_format % index
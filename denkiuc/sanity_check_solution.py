@@ -1,356 +1,224 @@
-def process_error_msg(warnings, settings):
-    settings['PRINT_WARNINGS'] = True
+import os
+import numpy as np
+import pandas as pd
+import denkiuc.misc_functions as mf
 
-    if settings['PRINT_WARNINGS']:
-        for warning in warnings:
-            print()
-            print('Warning: ' + warning)
-    else:
-        pass
-
-
-def check_power_lower_reserves_gt_min_gen(sets, data, results):
-    warnings = []
-    errors_count = 0
-    lower_reserves = sets['lower_reserves'].indices
-
-    for u in sets['units_commit'].indices:
-        mingen_MW \
-            = data.units['Capacity_MW'][u] \
-            * data.units['MinGen'][u] \
-
-        for i in sets['intervals'].indices:
-            for s in sets['scenarios'].indices:
-                minimum_generation = results['num_commited'][(s, u)][i] * mingen_MW
-                power = results['power_generated'][(s, u)][i]
-                lower_reserve_enable = \
-                    sum(results['reserve_enabled'][(s, u, r)][i] for r in lower_reserves)
-
-                if power - lower_reserve_enable < minimum_generation - 0.005:
-                    warnings.append(
-                        'Warning: Unit ' + u + ' Interval ' + str(i) + ' scenario ' +
-                        str(s) + ' gen less lower reserve less than capacity '
-                        + ' \nPower: ' + str(power)
-                        + ' \nLower reserve: ' + str(lower_reserve_enable)
-                        + ' \nMinimum gen (given commited cap.): ' + str(minimum_generation)
-                        )
-                    errors_count += 1
-
-    return errors_count, warnings
-
-
-def check_power_raise_reserves_lt_commit_cap(sets, data, results):
-    warnings = []
-    errors_count = 0
-    raise_reserves = sets['raise_reserves'].indices
-
-    for u in sets['units_commit'].indices:
-        unit_capacity = data.units['Capacity_MW'][u]
-
-        for i in sets['intervals'].indices:
-            for s in sets['scenarios'].indices:
-                maximum_generation = results['num_commited'][(s, u)][i] * unit_capacity
-                power = results['power_generated'][(s, u)][i]
-                raise_reserve_enable = \
-                    sum(results['reserve_enabled'][(s, u, r)][i] for r in raise_reserves)
-
-                if power + raise_reserve_enable > maximum_generation + 0.005:
-                    warnings.append('Warning: Unit ' + u + ' Interval ' + str(i) + ' scenario ' +
-                        str(s) + ' gen plus raise reserve greater than capacity '
-                        + ' \nPower: ' + str(power)
-                        + ' \nRaise reserve: ' + str(raise_reserve_enable)
-                        + ' \nCommitted capacity: ' + str(maximum_generation))
-                    errors_count += 1
-
-    return errors_count, warnings
-
-
-def check_power_lt_capacity(sets, data, results):
-    warnings = []
-    errors_count = 0
-
-    for u in list(sets['units'].indices):
-        total_capacity = data.units['Capacity_MW'][u] * data.units['NoUnits'][u]
-
-        for i in sets['intervals'].indices:
-            for s in sets['scenarios'].indices:
-                if results['power_generated'][(s, u)][i] > total_capacity:
-                    warnings.append('Warning: Unit' + u + 'Interval' + str(i)
-                        + 'generating above capacity' +
-                        '(%f > %f)' % (results['power_generated'][(s, u)][i], total_capacity))
-                    errors_count += 1
-
-    return errors_count, warnings
-
-
-def check_energy_charged_lt_charge_capacity(sets, data, results):
-    warnings = []
-    errors_count = 0
-
-    for u in sets['units_storage'].indices:
-        charge_capacity = \
-            data.units['NoUnits'][u] * data.units['Capacity_MW'][u] * data.units['RTEfficiency'][u]
-        for s in sets['scenarios'].indices:
-            for i in sets['intervals'].indices:
-                if results['charge_after_losses'][(s, u)][i] > charge_capacity:
-                    warnings.append('Warning: Unit' + u + 'Interval' + str(i) +
-                        'charging above its charge capacity')
-                    errors_count += 1
-
-    return errors_count, warnings
+violation_columns = ['rule', 'i', 's', 'u', 'value', 'limit']
 
 
-def total_gen_equals_demand(sets, results):
-    warnings = []
-    errors_count = 0
+def run_sanity_checks(prob, tolerance=None):
+    """
+    Checks the solution (as stored in the results of each variable) against the rules of the
+    model, with each rule evaluated over (interval, scenario, unit) arrays. Returns a frame
+    with a row (rule, i, s, u, value, limit) for each place where the value is on the wrong
+    side of its limit by more than the tolerance (SANITY_CHECK_TOLERANCE by default).
+    """
+    settings = prob['settings']
+    if tolerance is None:
+        tolerance = settings['SANITY_CHECK_TOLERANCE']
 
-    dispatch = results['dispatch']
-    df_cols = dispatch.columns.to_list()
+    checks = [check_power_lt_capacity, check_reserve_capability, check_storage_continuity,
+              check_stored_energy_lt_capacity, check_charge_lt_capacity]
 
-    for s in sets['scenarios'].indices:
-        filtered_cols = [c for c in df_cols if c[0] == s]
-        dispatch_sum = dispatch[filtered_cols].sum(axis=1).round(4)
-
-        if dispatch_sum.sum() != 0:
-            dispatch_sum = dispatch_sum[dispatch_sum[:] != 0]
-            warnings.append('Sanity check: Supply doesnt equal demand in intervals', dispatch_sum)
-            errors_count += len(dispatch_sum.index.to_list())
-
-    return errors_count, warnings
-
-
-def minimum_up_time_is_respected(sets, data, results, settings):
-    warnings = []
-    errors_count = 0
-
-    i0 = min(sets['intervals'].indices)
-
-    for u in sets['units_commit'].indices:
-        minimum_up_time = data.units['MinUpTime_h'][u]
-
-        for s in sets['scenarios'].indices:
-            time_on = 0
-            prev_commit_status = 0
-
-            for i in sets['intervals'].indices:
-                current_commit_status = results['num_commited'].loc[i, (s, u)]
-
-                if current_commit_status == 1:
-                    time_on += 1
-
-                if current_commit_status == 0:
-                    if prev_commit_status == 1:
-                        if i > i0 + minimum_up_time + settings['INTERVALS_PER_HOUR']:
-                            if time_on < minimum_up_time * settings['INTERVALS_PER_HOUR']:
-                                warnings.append('Min up time error for unit' + u + 'interval' +
-                                                str(i) + 'scenario' + str(s) + 'time on is' +
-                                                str(time_on) + 'periods' + 'min_up_time is' +
-                                                str(minimum_up_time
-                                                    * settings['INTERVALS_PER_HOUR']) +
-                                                'periods')
-                                errors_count = errors_count + 1
-
-                    time_on = 0
-
-                prev_commit_status = current_commit_status
-
-    return errors_count, warnings
-
-
-def minimum_down_time_is_respected(sets, data, results, settings):
-    warnings = []
-    errors_count = 0
+    if settings['INCL_UNIT_COMMITMENT']:
+        checks += [check_raise_reserve_headroom, check_min_generation, check_minimum_up_time,
+                   check_minimum_down_time, check_rocof]
 
-    i0 = min(sets['intervals'].indices)
+    arrays = result_arrays(prob['vars'])
+    violations = [violation for check in checks for violation in check(prob, arrays)]
+    violations = [find_violations(prob, tolerance, *violation) for violation in violations]
 
-    for u in sets['units_commit'].indices:
-        minimum_down_time = data.units['MinDownTime_h'][u]
-        time_off = 0
-        prev_commit_status = 1
+    return pd.concat(violations, ignore_index=True)
 
-        for i in sets['intervals'].indices:
-            for s in sets['scenarios'].indices:
-                if i > i0 + minimum_down_time * settings['INTERVALS_PER_HOUR']:
-                    current_commit_status = results['num_commited'].loc[i, (s, u)]
 
-                    if current_commit_status == 0:
-                        time_off += 1
+def result_arrays(vars):
+    return {name: dkvar.result_values.reshape(dkvar.shape) for name, dkvar in vars.items()}
 
-                    if current_commit_status == 1:
-                        if prev_commit_status == 0:
-                            if time_off < minimum_down_time * settings['INTERVALS_PER_HOUR']:
-                                warnings.append('Min down time error for unit ' + u + ' interval '
-                                                + str(i) + ' scenario ' + str(s) + ' time off is '
-                                                + str(time_off) + ' periods ' +
-                                                ' min_down_time is ' +
-                                                str(minimum_down_time
-                                                    * settings['INTERVALS_PER_HOUR']) +
-                                                ' periods')
-                                errors_count = errors_count + 1
 
-                        time_off = 0
+def find_violations(prob, tolerance, rule, value, limit, units_set, sense='<='):
+    """
+    Rows of the violations frame for one rule, where value and limit are (interval, scenario,
+    unit) arrays over the units of units_set. With sense '==' the value must be within the
+    tolerance of the limit.
+    """
+    sets = prob['sets']
+    value, limit = np.broadcast_arrays(value, limit)
 
-                    prev_commit_status = current_commit_status
+    if sense == '<=':
+        excess = value - limit
+    elif sense == '>=':
+        excess = limit - value
+    else:
+        excess = np.abs(value - limit)
 
-    return errors_count, warnings
+    i, s, u = np.nonzero(excess > tolerance)
 
+    return pd.DataFrame({'rule': rule,
+                         'i': np.asarray(sets['intervals'].indices)[i],
+                         's': np.asarray(sets['scenarios'].indices)[s],
+                         'u': np.asarray(sets[units_set].indices, dtype=object)[u],
+                         'value': value[i, s, u],
+                         'limit': limit[i, s, u]},
+                        columns=violation_columns)
 
-def is_there_any_unserved(unserved):
-    warnings = []
-    unserved_power = unserved['Power'].sum(axis=0)
-    unserved_reserve = unserved['Reserve'].sum(axis=0)
-    unserved_inertia = unserved['Inertia'].sum(axis=0)
-    unserved_sysstrength = unserved['SysStrength'].sum(axis=0)
 
-    if unserved_power > 0:
-        warnings.append('*** There was unserved power:', unserved_power)
+def reserve_totals(prob, arrays, reserve_subset):
+    reserve_pos = prob['data']['params'].subset_pos[reserve_subset]
+    return arrays['reserve_enabled'][:, :, :, reserve_pos].sum(axis=3)
 
-    if unserved_power > 0:
-        warnings.append('*** There was unserved reserve:', unserved_reserve)
 
-    if unserved_inertia > 0:
-        warnings.append('*** There was unserved inertia:', unserved_inertia)
+def check_power_lt_capacity(prob, arrays):
+    params = prob['data']['params']
+    power = arrays['power_generated'] + reserve_totals(prob, arrays, 'raise_reserves')
 
-    if unserved_sysstrength > 0:
-        warnings.append('*** There was unserved system strength:', unserved_sysstrength)
+    yield 'power_lt_capacity', power, params.units['Capacity_MW'] * arrays['num_built'], 'units'
 
 
-def check_storage_continiuity(sets, data, results):
-    warnings = []
-    errors_count = 0
+def check_raise_reserve_headroom(prob, arrays):
+    params = prob['data']['params']
+    commit_pos = params.subset_pos['units_commit']
+    power = arrays['power_generated'] + reserve_totals(prob, arrays, 'raise_reserves')
 
-    for u in list(sets['units_storage'].indices):
-        for s in sets['scenarios'].indices:
-            for i in sets['intervals'].indices:
+    yield 'raise_reserve_headroom', power[:, :, commit_pos], \
+        arrays['num_committed'] * params.unit_values('Capacity_MW', 'units_commit'), \
+        'units_commit'
 
-                if i == min(sets['intervals'].indices):
-                    initial_energy_in_storage_MWh \
-                        = data.initial_state['StorageLevel_frac'][u] \
-                        * data.units['StorageCap_h'][u] \
-                        * data.units['Capacity_MW'][u] \
-                        * data.units['NoUnits'][u]
 
-                    net_flow = \
-                        (
-                         initial_energy_in_storage_MWh
-                         - results['energy_in_reservoir'][(s, u)][i]
-                         + results['charge_after_losses'][(s, u)][i] / 2
-                         - results['power_generated'][(s, u)][i] / 2
-                        )
+def check_min_generation(prob, arrays):
+    params = prob['data']['params']
+    commit_pos = params.subset_pos['units_commit']
+    power = arrays['power_generated'] - reserve_totals(prob, arrays, 'lower_reserves')
+    min_gen_MW = \
+        params.unit_values('Capacity_MW', 'units_commit') \
+        * params.unit_values('MinGen_pctCap', 'units_commit')
 
-                if i > min(sets['intervals'].indices):
-                    net_flow = \
-                        (
-                         results['energy_in_reservoir'][(s, u)][i-1]
-                         - results['energy_in_reservoir'][(s, u)][i]
-                         + results['charge_after_losses'][(s, u)][i] / 2
-                         - results['power_generated'][(s, u)][i] / 2
-                        )
+    yield 'min_generation', power[:, :, commit_pos], arrays['num_committed'] * min_gen_MW, \
+        'units_commit', '>='
 
-                if net_flow.round(4) != 0:
-                    warnings.append('Warning: Unit', u, 'Interval', i,
-                        'net storage flow is not zero:', net_flow)
-                    errors_count += 1
 
-    return errors_count, warnings
+def check_reserve_capability(prob, arrays):
+    """
+    Commit units can enable reserves on their committed units, and others on their built
+    units.
+    """
+    sets, data = mf.prob_unpacker(prob, ['sets', 'data'])
+    params = data['params']
+    available_units = \
+        np.broadcast_to(arrays['num_built'], arrays['power_generated'].shape).copy()
+    available_units[:, :, params.subset_pos['units_commit']] = arrays['num_committed']
 
+    for pr, r in enumerate(sets['reserves'].indices):
+        yield 'reserve_capability_' + r, arrays['reserve_enabled'][:, :, :, pr], \
+            available_units * params.max_reserves_per_unit[:, pr], 'units'
 
-def check_stored_energy_lt_storage_capacity(sets, data, results):
-    warnings = []
-    errors_count = 0
 
-    for u in sets['units_storage'].indices:
-        storage_capacity_MWh = \
-            data.units['StorageCap_h'][u] \
-            * data.units['Capacity_MW'][u] \
-            * data.units['NoUnits'][u]
+def check_storage_continuity(prob, arrays):
+    params = prob['data']['params']
+    storage_pos = params.subset_pos['units_storage']
+    energy = arrays['energy_in_reservoir']
 
-        for s in sets['scenarios'].indices:
-            for i in sets['intervals'].indices:
-                if results['energy_in_reservoir'][(s, u)][i] > storage_capacity_MWh:
-                    warnings.append('Warning: Unit', u, 'Interval', i, 'scenario', s,
-                        'stored energy exceeds storage capacity')
+    initial_energy = \
+        params.initial_state_values('StorageLevel_frac', 'units_storage') \
+        * params.unit_values('StorageCap_h', 'units_storage') \
+        * params.unit_values('Capacity_MW', 'units_storage')
+    previous_energy = np.concatenate([np.broadcast_to(initial_energy, energy[:1].shape),
+                                      energy[:-1]])
+    net_flow = arrays['charge_after_losses'] - arrays['power_generated'][:, :, storage_pos]
 
-                    errors_count += 1
+    yield 'storage_continuity', energy, \
+        previous_energy + net_flow * params.interval_hours[:, None, None], 'units_storage', '=='
 
-    return errors_count, warnings
 
+def check_stored_energy_lt_capacity(prob, arrays):
+    params = prob['data']['params']
+    storage_capacity_MWh = \
+        params.unit_values('StorageCap_h', 'units_storage') \
+        * params.unit_values('Capacity_MW', 'units_storage')
 
-def check_reserve_lt_capability(sets, data, results):
-    warnings = []
-    import denkiuc.misc_functions as mf
+    yield 'stored_energy_lt_capacity', arrays['energy_in_reservoir'], storage_capacity_MWh, \
+        'units_storage'
 
-    errors_count = 0
 
-    for u in sets['units_commit'].indices:
-        for r in sets['reserves'].indices:
-            max_reserves_per_unit = mf.get_max_reserves_per_unit(u, r, data.units)
+def check_charge_lt_capacity(prob, arrays):
+    params = prob['data']['params']
+    charge_capacity_MW = \
+        params.unit_values('RTEfficiency', 'units_storage') \
+        * params.unit_values('Capacity_MW', 'units_storage')
 
-            for i in sets['intervals'].indices:
-                for s in sets['scenarios'].indices:
-                    max_reserves = max_reserves_per_unit * results['num_commited'][(s, u)][i]
+    yield 'charge_lt_capacity', arrays['charge_after_losses'], charge_capacity_MW, \
+        'units_storage'
 
-                    if results['reserve_enabled'][(s, u, r)][i] > max_reserves:
-                        warnings.append('Warning: Unit', u, 'Interval', i, 'scenario', s,
-                            'reserve', r, '\nReserve enablement exceeds reserve capability',
-                            '\nUnit committed: ', results['num_commited'][(s, u)][i],
-                            '\nMax reserve (total): ', max_reserves)
 
-                        errors_count += 1
+def window_totals(values, window_starts):
+    """
+    Sum of values (interval, scenario, unit) over the window from window_starts[i, u] to
+    interval i.
+    """
+    cumulative = np.concatenate([np.zeros_like(values[:1]), values.cumsum(axis=0)])
+    window_starts = np.broadcast_to(window_starts[:, None, :], values.shape)
 
-    return errors_count, warnings
+    return cumulative[1:] - np.take_along_axis(cumulative, window_starts, axis=0)
 
 
-def check_max_rocof(sets, results):
-    warnings = []
-    errors_count = 0
+def check_minimum_up_time(prob, arrays):
+    from denkiuc.constraints import min_time_window_starts
 
-    for i in sets['intervals'].indices:
-        max_rocof = results['max_rocof']['MaxRocof'][i]
-        rocof_limit = results['max_rocof']['RocofLimit'][i]
-        if max_rocof > rocof_limit:
-            warnings.append('Warning: Interval', i, ': Max RoCoF of', max_rocof,
-                'exceeds RoCoF limit of', rocof_limit)
+    window_starts = min_time_window_starts(prob['data']['params'], 'MinUpTime_h')
 
-            errors_count += 1
-    return errors_count, warnings
+    yield 'minimum_up_time', window_totals(arrays['num_starting_up'], window_starts), \
+        arrays['num_committed'], 'units_commit'
 
 
-def run_sanity_checks(sets, data, results, settings):
-    all_warnings = []
+def check_minimum_down_time(prob, arrays):
+    from denkiuc.constraints import min_time_window_starts
 
-    errors_count, warnings = check_power_lt_capacity(sets, data, results)
-    all_warnings += warnings
+    params = prob['data']['params']
+    window_starts = min_time_window_starts(params, 'MinDownTime_h')
+    num_off = arrays['num_built'][params.subset_pos['units_commit']] - arrays['num_committed']
 
-    errors_count, warnings = total_gen_equals_demand(sets, results)
-    all_warnings += warnings
+    yield 'minimum_down_time', window_totals(arrays['num_shutting_down'], window_starts), \
+        num_off, 'units_commit'
 
-    errors_count, warnings = check_energy_charged_lt_charge_capacity(sets, data, results)
-    all_warnings += warnings
 
-    errors_count, warnings = check_storage_continiuity(sets, data, results)
-    all_warnings += warnings
+def check_rocof(prob, arrays):
+    """
+    The RoCoF (Hz/s) if each unit fails, given the inertia of the other committed units.
+    Commit units fail with one unit's capacity, variable units with their available
+    resource and storage units with their capacity.
+    """
+    sets, data, settings = mf.prob_unpacker(prob, ['sets', 'data', 'settings'])
+    params = data['params']
+    commit_pos = params.subset_pos['units_commit']
+    capacity = params.units['Capacity_MW']
 
-    errors_count, warnings = check_stored_energy_lt_storage_capacity(sets, data, results)
-    all_warnings += warnings
+    unit_inertia = np.zeros(arrays['power_generated'].shape)
+    unit_inertia[:, :, commit_pos] = \
+        arrays['num_committed'] * params.unit_values('InertialConst_s', 'units_commit') \
+        * params.unit_values('Capacity_MW', 'units_commit')
+    available_inertia = unit_inertia.sum(axis=2, keepdims=True) - unit_inertia
 
-    errors_count, warnings = check_reserve_lt_capability(sets, data, results)
-    all_warnings += warnings
+    contingency_size = np.zeros(unit_inertia.shape)
+    contingency_size[:, :, commit_pos] = \
+        arrays['is_committed'] * params.unit_values('Capacity_MW', 'units_commit')
+    for u in sets['units_variable'].indices:
+        contingency_size[:, :, params.unit_pos[u]] = \
+            params.resource_trace(u) * capacity[params.unit_pos[u]]
+    contingency_size[:, :, params.subset_pos['units_storage']] = \
+        params.unit_values('Capacity_MW', 'units_storage')
 
-    if settings['INCL_UNIT_COMMITMENT']:
-        errors_count, warnings = minimum_up_time_is_respected(sets, data, results, settings)
-        all_warnings += warnings
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rocof = np.where(contingency_size > 0,
+                         contingency_size * settings['SYSTEM_FREQUENCY'] / (2 * available_inertia),
+                         0)
 
-        errors_count, warnings = minimum_down_time_is_respected(sets, data, results, settings)
-        all_warnings += warnings
+    yield 'rocof', rocof, settings['MAX_ROCOF'], 'units'
 
-        errors_count, warnings = check_max_rocof(sets, results)
-        all_warnings += warnings
 
-        errors_count, warnings = check_power_raise_reserves_lt_commit_cap(sets, data, results)
-        all_warnings += warnings
+def write_violations(violations, results_path):
+    violations.to_csv(os.path.join(results_path, 'sanity_check_violations.csv'), index=False)
 
-        errors_count, warnings = check_power_lower_reserves_gt_min_gen(sets, data, results)
-        all_warnings += warnings
-
-    process_error_msg(all_warnings, settings)
+    if len(violations) > 0:
+        print('Sanity checks found %d violations:' % len(violations))
+        print(violations.groupby('rule').size().to_string())
+    else:
+        print('Sanity checks found no violations')
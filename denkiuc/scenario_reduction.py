@@ -0,0 +1,91 @@
+import os
+import time
+import numpy as np
+import pandas as pd
+
+
+def reduce_traces(traces, pool_size, num_scenarios):
+    """
+    Reduces a pool of pool_size ARMA scenarios to num_scenarios by fast forward selection on
+    the joint demand, wind and solar paths. The probability of each scenario which is not kept
+    moves to the nearest kept scenario. Returns the traces of the kept scenarios (renumbered
+    from 0, in the order of the pool) and a dict with the kept pool scenarios, their
+    probabilities, the reduction error (the Kantorovich distance between the pool and the
+    reduced set) and the time taken.
+    """
+    time_start = time.perf_counter()
+
+    pool = list(range(pool_size))
+    pool_probability = np.full(pool_size, 1 / pool_size)
+    distances = scenario_distances(traces, pool)
+
+    kept = fast_forward_selection(distances, pool_probability, num_scenarios)
+    nearest_kept = np.array(kept)[distances[:, kept].argmin(axis=1)]
+
+    probability = np.bincount(nearest_kept, weights=pool_probability, minlength=pool_size)[kept]
+    error = pool_probability @ distances[:, kept].min(axis=1)
+
+    reduced_traces = dict()
+    for trace_name, trace in traces.items():
+        reduced_traces[trace_name] = trace[kept].set_axis(list(range(num_scenarios)), axis=1)
+
+    reduction = {'kept': kept,
+                 'probability': dict(enumerate(probability)),
+                 'error': error,
+                 'time': time.perf_counter() - time_start}
+
+    print('Reduced %d scenarios to %d in %.2f seconds, reduction error %f'
+          % (pool_size, num_scenarios, reduction['time'], error))
+
+    return reduced_traces, reduction
+
+
+def scenario_distances(traces, pool):
+    """
+    Euclidean distances (pool x pool) between the scenarios. Each trace is scaled by the
+    standard deviation of its spread about the interval mean, so that demand (MW) and the
+    resource traces (fractions) count equally.
+    """
+    paths = list()
+
+    for trace_name, trace in traces.items():
+        values = trace[pool].to_numpy(dtype=float).T
+        spread = values - values.mean(axis=0)
+        scale = spread.std()
+        paths.append(spread / scale if scale > 0 else spread)
+
+    paths = np.concatenate(paths, axis=1)
+    squared_norms = (paths ** 2).sum(axis=1)
+    squared_distances = squared_norms[:, None] + squared_norms[None, :] - 2 * paths @ paths.T
+
+    return np.sqrt(np.maximum(squared_distances, 0))
+
+
+def fast_forward_selection(distances, probability, num_scenarios):
+    """
+    Greedily selects the scenario which most reduces the probability weighted distance from the
+    scenarios not yet selected to their nearest selected scenario. Returns the selected
+    scenarios in the order of the pool.
+    """
+    num_pool = len(probability)
+    nearest_distance = np.full(num_pool, np.inf)
+    remaining = np.ones(num_pool, dtype=bool)
+    kept = list()
+
+    for n in range(num_scenarios):
+        candidates = np.flatnonzero(remaining)
+        capped = np.minimum(nearest_distance[remaining, None], distances[remaining][:, candidates])
+        u = candidates[(probability[remaining] @ capped).argmin()]
+
+        kept.append(u)
+        remaining[u] = False
+        nearest_distance = np.minimum(nearest_distance, distances[:, u])
+
+    return sorted(kept)
+
+
+def write_reduction(reduction, outputs_path):
+    reduction_df = pd.DataFrame({'PoolScenario': reduction['kept'],
+                                 'Probability': list(reduction['probability'].values())})
+    reduction_df.index.name = 'Scenario'
+    reduction_df.to_csv(os.path.join(outputs_path, 'scenario_reduction.csv'))
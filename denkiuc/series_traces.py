@@ -0,0 +1,152 @@
+import os
+import shutil
+import hashlib
+import threading
+import numpy as np
+import pandas as pd
+
+
+class dkTraceProgress():
+    """
+    The number of intervals of the series traces generated so far, which the days wait on.
+    """
+    def __init__(self, num_generated=0):
+        self.condition = threading.Condition()
+        self.num_generated = num_generated
+        self.error = None
+
+    def advance(self, num_generated):
+        with self.condition:
+            self.num_generated = num_generated
+            self.condition.notify_all()
+
+    def fail(self, error):
+        with self.condition:
+            self.error = error
+            self.condition.notify_all()
+
+    def wait_for(self, num_intervals):
+        with self.condition:
+            self.condition.wait_for(
+                lambda: self.num_generated >= num_intervals or self.error is not None)
+
+        if self.error is not None:
+            raise self.error
+
+
+def series_traces_hash(deterministic_traces, arma_vals_df, random_seed, num_scenarios):
+    import denkiuc.arma_generator as ag
+
+    series_sha = hashlib.sha256(
+        ('%d_%d_%d' % (ag.generator_version, random_seed, num_scenarios)).encode())
+
+    for trace_name, trace in deterministic_traces.items():
+        series_sha.update(trace_name.encode())
+        series_sha.update(np.ascontiguousarray(trace.iloc[:, 0].to_numpy(dtype=float)))
+
+    series_sha.update(arma_vals_df.to_csv().encode())
+
+    return series_sha.hexdigest()[:16]
+
+
+def load_series_traces(deterministic_traces, inputs_path, settings):
+    """
+    The traces of the whole series as a memory mapped (interval, trace, scenario) array, with
+    ARMA scenarios over the whole series (so the forecast errors carry on from one day to the
+    next). The array is kept in <inputs>/series_traces and reused while the deterministic
+    traces, ARMA values, seed and number of scenarios are unchanged. It has enough scenarios
+    for SCENARIO_POOL_SIZE if that is more than NUM_SCENARIOS.
+
+    A new array is generated ARMA_CHUNK_INTS intervals at a time in a background thread
+    (series_traces['generator']), and day_window waits only until the intervals of its day
+    have been written.
+    """
+    import denkiuc.arma_generator as ag
+
+    store_path = os.path.join(inputs_path, 'series_traces')
+    arma_vals_df = ag.load_arma_values(inputs_path)
+    num_scenarios = max(settings['NUM_SCENARIOS'], settings['SCENARIO_POOL_SIZE'])
+    trace_names = list(deterministic_traces.keys())
+    num_intervals = len(deterministic_traces[trace_names[0]])
+    series_traces = {'trace_names': trace_names,
+                     'intervals': deterministic_traces[trace_names[0]].index.to_numpy()}
+
+    tensor_name = series_traces_hash(deterministic_traces, arma_vals_df,
+                                     settings['RANDOM_SEED'], num_scenarios)
+    tensor_path = os.path.join(store_path, tensor_name + '.npy')
+
+    if os.path.exists(tensor_path):
+        series_traces['values'] = np.load(tensor_path, mmap_mode='r')
+        series_traces['progress'] = dkTraceProgress(num_intervals)
+        return series_traces
+
+    shutil.rmtree(store_path, ignore_errors=True)
+    os.makedirs(store_path)
+    temporary_path = '%s.tmp%d.npy' % (tensor_path[:-len('.npy')], os.getpid())
+
+    series_traces['values'] = \
+        np.lib.format.open_memmap(temporary_path, mode='w+', dtype=float,
+                                  shape=(num_intervals, len(trace_names), num_scenarios))
+    series_traces['progress'] = dkTraceProgress()
+
+    paramters = {'RANDOM_SEED': settings['RANDOM_SEED'], 'NUM_SCENARIOS': num_scenarios}
+    chunks = ag.stream_arma_scenarios(paramters, deterministic_traces, arma_vals_df,
+                                      settings['ARMA_CHUNK_INTS'])
+    series_traces['generator'] = \
+        threading.Thread(target=write_series_traces, daemon=True,
+                         args=(chunks, series_traces, temporary_path, tensor_path))
+    series_traces['generator'].start()
+
+    return series_traces
+
+
+def write_series_traces(chunks, series_traces, temporary_path, tensor_path):
+    """
+    Writes each chunk into the memory mapped array as it is generated, and renames the file to
+    tensor_path once it is complete.
+    """
+    tensor, progress = series_traces['values'], series_traces['progress']
+
+    try:
+        for start, chunk in chunks:
+            for t, trace_name in enumerate(series_traces['trace_names']):
+                tensor[start:start + len(chunk[trace_name]), t, :] = chunk[trace_name]
+            progress.advance(start + len(chunk[trace_name]))
+
+        tensor.flush()
+        os.replace(temporary_path, tensor_path)
+    except Exception as error:
+        progress.fail(error)
+        return
+
+    print('Series traces of %d intervals and %d scenarios written to'
+          % (tensor.shape[0], tensor.shape[2]), tensor_path)
+
+
+def day_window(series_traces, first_interval, num_intervals):
+    """
+    The traces of a day, as a view of the series traces (no copy is made), once they have been
+    generated.
+    """
+    interval_range = slice(first_interval, first_interval + num_intervals)
+    series_traces['progress'].wait_for(min(interval_range.stop, len(series_traces['intervals'])))
+
+    return {'values': series_traces['values'][interval_range],
+            'trace_names': series_traces['trace_names'],
+            'intervals': series_traces['intervals'][interval_range]}
+
+
+def window_traces(window, num_scenarios):
+    """
+    Each trace of a window as an (interval, scenario) DataFrame over the first num_scenarios
+    scenarios, in the form load_stochastic_traces gives them.
+    """
+    traces = dict()
+
+    for t, trace_name in enumerate(window['trace_names']):
+        traces[trace_name] = \
+            pd.DataFrame(window['values'][:, t, :num_scenarios],
+                         index=pd.Index(window['intervals'], name='Interval'),
+                         columns=list(range(num_scenarios)), copy=False)
+
+    return traces
@@ -0,0 +1,147 @@
+import os
+import pulp as pp
+import denkiuc.misc_functions as mf
+
+
+def solver_settings(settings):
+    """
+    The solver configuration from settings.csv, as it is recorded in prob['stats'].
+    """
+    return {'solver': settings['SOLVER'],
+            'solver_threads': settings['SOLVER_THREADS'],
+            'solver_time_limit': settings['SOLVER_TIME_LIMIT'],
+            'solver_rel_gap': settings['SOLVER_REL_GAP'],
+            'solver_presolve': settings['SOLVER_PRESOLVE'],
+            'solver_cuts': settings['SOLVER_CUTS']}
+
+
+def solve_pulp_model(prob, warm_start=False):
+    """
+    Solves prob['mod'] with the solver named by the SOLVER setting, and returns the solver
+    statistics (nodes, iterations, best bound, gap and time to the first incumbent).
+    """
+    solver = prob['settings']['SOLVER']
+
+    if solver not in solvers:
+        print('Solver %s not known, options are %s' % (solver, ', '.join(solvers)))
+        exit()
+
+    return solvers[solver](prob, warm_start)
+
+
+def cbc_options(settings):
+    """
+    Presolve and cuts are left at CBC's defaults unless they are turned off.
+    """
+    return {'msg': 0,
+            'threads': settings['SOLVER_THREADS'],
+            'timeLimit': settings['SOLVER_TIME_LIMIT'],
+            'gapRel': settings['SOLVER_REL_GAP'],
+            'presolve': None if settings['SOLVER_PRESOLVE'] else False,
+            'cuts': None if settings['SOLVER_CUTS'] else False}
+
+
+def solve_cbc(prob, warm_start):
+    """
+    CBC as bundled with PuLP.
+    """
+    log_path = os.path.join(prob['paths']['outputs'], '%s_cbc.log' % prob['name'])
+
+    prob['mod'].solve(pp.PULP_CBC_CMD(warmStart=warm_start, logPath=log_path,
+                                      **cbc_options(prob['settings'])))
+
+    return read_cbc_log(log_path)
+
+
+def solve_cbc_mps(prob, warm_start):
+    """
+    File based fallback. The model and solution files are kept in the outputs folder, and
+    the CBC executable at SOLVER_PATH is used (or the one bundled with PuLP if it is blank).
+    """
+    settings, paths = mf.prob_unpacker(prob, ['settings', 'paths'])
+    log_path = os.path.join(paths['outputs'], '%s_cbc.log' % prob['name'])
+
+    if settings['SOLVER_PATH'] == '':
+        solver_path = pp.PULP_CBC_CMD().path
+    else:
+        solver_path = settings['SOLVER_PATH']
+
+    solver = pp.COIN_CMD(path=solver_path, keepFiles=True, warmStart=warm_start,
+                         logPath=log_path, **cbc_options(settings))
+
+    # Kept files are named after the model, so the name is pointed at the outputs folder
+    mod_name = prob['mod'].name
+    prob['mod'].name = os.path.join(paths['outputs'], prob['name'])
+    prob['mod'].solve(solver)
+    prob['mod'].name = mod_name
+
+    return read_cbc_log(log_path)
+
+
+def solve_highs(prob, warm_start):
+    """
+    HiGHS through its Python API (highspy), solved in process.
+    """
+    settings = prob['settings']
+
+    if not pp.HiGHS().available():
+        print('The highs solver needs highspy to be installed')
+        exit()
+
+    if warm_start:
+        print('Warm starts are not supported by the highs solver')
+
+    if not settings['SOLVER_CUTS']:
+        print('Cuts cannot be turned off in the highs solver')
+
+    solver = pp.HiGHS(msg=False,
+                      threads=settings['SOLVER_THREADS'],
+                      timeLimit=settings['SOLVER_TIME_LIMIT'],
+                      gapRel=settings['SOLVER_REL_GAP'],
+                      presolve='on' if settings['SOLVER_PRESOLVE'] else 'off')
+    prob['mod'].solve(solver)
+
+    info = prob['mod'].solverModel.getInfo()
+
+    return {'mip_nodes': info.mip_node_count,
+            'mip_iterations': info.simplex_iteration_count,
+            'mip_best_bound': info.mip_dual_bound,
+            'mip_gap': info.mip_gap,
+            'time_to_first_incumbent': float('nan')}
+
+
+def read_cbc_log(log_path):
+    """
+    Statistics from the end of a CBC log, and the time (in seconds) at which CBC first reports
+    an integer solution, taken from the most recent time printed in the log at that point.
+    """
+    import re
+
+    log_stats = {'mip_nodes': None, 'mip_iterations': None, 'mip_best_bound': None,
+                 'mip_gap': None, 'time_to_first_incumbent': float('nan')}
+    summary_lines = {'Enumerated nodes:': ('mip_nodes', int),
+                     'Total iterations:': ('mip_iterations', int),
+                     'Lower bound:': ('mip_best_bound', float),
+                     'Gap:': ('mip_gap', float)}
+
+    last_time = 0.0
+    found_incumbent = False
+
+    with open(log_path) as f:
+        for line in f:
+            times = re.findall(r'\(([\d.]+) seconds\)', line)
+            if len(times) > 0:
+                last_time = float(times[-1])
+
+            if not found_incumbent and re.search('Solution found of|Integer solution of', line):
+                log_stats['time_to_first_incumbent'] = last_time
+                found_incumbent = True
+
+            for start, (key, value_type) in summary_lines.items():
+                if line.startswith(start):
+                    log_stats[key] = value_type(line.split()[-1])
+
+    return log_stats
+
+
+solvers = {'cbc': solve_cbc, 'cbc_mps': solve_cbc_mps, 'highs': solve_highs}
@@ -0,0 +1,117 @@
+import concurrent.futures
+import os
+import time
+import pandas as pd
+import denkiuc.misc_functions as mf
+
+objective_settings = ['CARBON_PRICE', 'REC_PRICE', 'UNS_LOAD_PNTY', 'UNS_RESERVE_PNTY',
+                      'UNS_INERTIA_PNTY']
+
+sweep_prob = dict()
+
+
+def run_sweep(name, prob_path, cases_df, outputs_path=False, num_processes=None):
+    """
+    Solves the problem at prob_path once for each row of cases_df (indexed by case name, with a
+    column per setting). The inputs are loaded and the constraints are built once, and each case
+    only swaps the objective, so only the settings used by the objective can be swept. The
+    results of each case are written to <outputs>/<case>/results, and a summary of all of the
+    cases to <outputs>/sweep_summary.csv.
+    """
+    for setting in cases_df.columns:
+        if setting not in objective_settings:
+            print('Setting %s cannot be swept, options are %s'
+                  % (setting, ', '.join(objective_settings)))
+            exit()
+
+    prob = build_sweep_model(name, prob_path, outputs_path)
+
+    if num_processes is None:
+        num_processes = prob['settings']['SWEEP_PROCESSES']
+    if num_processes <= 0:
+        num_processes = os.cpu_count()
+
+    cases = [(str(case), case_settings.to_dict()) for case, case_settings in cases_df.iterrows()]
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=num_processes,
+                                                initializer=init_worker,
+                                                initargs=(prob,)) as pool:
+        summary = list(pool.map(solve_case, cases))
+
+    summary_df = pd.DataFrame(summary).set_index('Case')
+    summary_df.to_csv(os.path.join(prob['sweep_outputs'], 'sweep_summary.csv'))
+
+    return summary_df
+
+
+def build_sweep_model(name, prob_path, outputs_path):
+    import denkiuc.load_data as ld
+    import denkiuc.uc_model as uc
+
+    prob = uc.init_prob(name)
+
+    prob['paths'] = uc.init_paths(prob_path, outputs_path)
+    prob['settings'] = ld.load_settings(prob['paths'])
+    prob['paths'] = uc.complete_paths(prob['paths'], prob['settings'], prob['name'])
+    mf.make_folder(prob['paths']['outputs'])
+
+    if prob['settings']['SOLVE_MODE'] != 'extensive':
+        print('Sweeps are only run in the extensive solve mode')
+        exit()
+
+    time_start = time.perf_counter()
+
+    prob['data'] = ld.load_data(prob['paths'], prob['settings'])
+    prob['sets'], prob['data'], prob['m_sets'] = \
+        uc.arrange_sets_and_data(prob['data'], prob['settings'], prob['paths'])
+    prob['vars'] = uc.add_variables(prob['m_sets'], prob['settings'])
+    prob['mod'] = uc.build_model(prob)
+
+    prob['stats']['sweep_build_time'] = time.perf_counter() - time_start
+    prob['sweep_outputs'] = prob['paths']['outputs']
+
+    return prob
+
+
+def init_worker(prob):
+    sweep_prob.update(prob)
+
+
+def solve_case(case):
+    """
+    Runs in the process pool, on the model passed to the worker when it started.
+    """
+    import denkiuc.obj_fn as obj
+    import denkiuc.uc_model as uc
+
+    case_name, case_settings = case
+    prob = sweep_prob
+
+    prob['name'] = case_name
+    prob['settings'] = dict(prob['settings'], **{k: float(v) for k, v in case_settings.items()})
+    prob['stats'] = dict()
+
+    prob['paths'] = dict(prob['paths'])
+    prob['paths']['outputs'] = os.path.join(prob['sweep_outputs'], case_name)
+    prob['paths'] = uc.complete_paths(prob['paths'], prob['settings'], case_name)
+    mf.make_folder(prob['paths']['outputs'])
+
+    time_start = time.perf_counter()
+    prob['mod'].setObjective(obj.obj_fn(prob))
+    if prob['settings']['MODEL_BACKEND'] == 'matrix':
+        import denkiuc.matrix_model as mm
+        prob['matrix']['obj'], prob['matrix']['obj_constant'] = \
+            mm.objective_vector(prob['mod'].objective, prob['matrix']['col_vars'])
+    objective_time = time.perf_counter() - time_start
+
+    stats = uc.solve_model(prob)
+    uc.store_results(prob)
+
+    summary = {'Case': case_name}
+    summary.update(case_settings)
+    summary.update({'OptimalityStatus': stats['optimality_status'],
+                    'ObjFnVal': stats['obj_fn_value'],
+                    'ObjectiveTime': objective_time,
+                    'SolverTime': stats['solver_time']})
+
+    return summary
@@ -0,0 +1,143 @@
+import os
+import shutil
+import hashlib
+import numpy as np
+import pandas as pd
+import denkiuc.misc_functions as mf
+
+store_version = '1'
+
+
+def inputs_hash(inputs_path):
+    """
+    SHA-256 of the files the ARMA traces are generated from: the trace locations, each
+    deterministic trace and the ARMA values (from the inputs folder, or the default file).
+    """
+    import denkiuc.arma_generator as ag
+
+    source_files = [os.path.join(inputs_path, 'arma_trace_locations.csv')]
+    for trace_name in ag.load_trace_locations(inputs_path)['TraceName']:
+        source_files.append(os.path.join(inputs_path, trace_name + '.csv'))
+
+    arma_values_file = os.path.join(inputs_path, 'arma_values.csv')
+    if not os.path.exists(arma_values_file):
+        arma_values_file = os.path.join(mf.default_files_path, 'arma_values.csv')
+    source_files.append(arma_values_file)
+
+    inputs_sha = hashlib.sha256(('%s_%d' % (store_version, ag.generator_version)).encode())
+    for source_file in source_files:
+        inputs_sha.update(os.path.basename(source_file).encode())
+        with open(source_file, 'rb') as f:
+            inputs_sha.update(f.read())
+
+    return inputs_sha.hexdigest()[:16]
+
+
+def entry_name(inputs_hash, random_seed):
+    return '%s_seed%d' % (inputs_hash, random_seed)
+
+
+def load_traces(store_path, inputs_path, num_scenarios, random_seed, chunk_intervals=None):
+    """
+    The first num_scenarios scenarios of each trace from the store entry of the inputs and
+    seed. The entry holds a pool of scenarios, which is generated (or regenerated with more
+    scenarios) when it has too few. As the scenarios of a seed do not depend on the size of the
+    pool, the first scenarios of a larger pool are the same as those of a smaller one. Entries
+    of other inputs are evicted. The scenarios are generated chunk_intervals intervals at a
+    time (all at once if None).
+    """
+    mf.make_folder(store_path, keep_existing=True)
+    current_hash = inputs_hash(inputs_path)
+    evict_stale_entries(store_path, current_hash)
+
+    entry_path = os.path.join(store_path, entry_name(current_hash, random_seed))
+
+    if pool_size(entry_path) < num_scenarios:
+        write_entry(entry_path, inputs_path, num_scenarios, random_seed, chunk_intervals)
+
+    return read_entry(entry_path, num_scenarios)
+
+
+def evict_stale_entries(store_path, current_hash):
+    for name in os.listdir(store_path):
+        entry_path = os.path.join(store_path, name)
+        if os.path.isdir(entry_path) and '_seed' in name and not name.startswith(current_hash):
+            print('Evicting ARMA traces of changed inputs', entry_path)
+            shutil.rmtree(entry_path, ignore_errors=True)
+
+
+def pool_size(entry_path):
+    pool_size_file = os.path.join(entry_path, 'pool_size.npy')
+
+    if not os.path.exists(pool_size_file):
+        return 0
+
+    return int(np.load(pool_size_file))
+
+
+def write_entry(entry_path, inputs_path, num_scenarios, random_seed, chunk_intervals=None):
+    """
+    Generates the scenarios a chunk at a time into an (interval, scenario) memory mapped .npy
+    array for each trace, in a temporary folder which then replaces the entry, so that a
+    reader never sees a half written entry. If another process has written the entry in the
+    meantime, its entry (of the same traces) is kept.
+    """
+    import denkiuc.arma_generator as ag
+
+    deterministic_traces = \
+        ag.load_deterministic_traces(ag.load_trace_locations(inputs_path), inputs_path)
+    arma_vals_df = ag.load_arma_values(inputs_path)
+    intervals = list(deterministic_traces.values())[0].index.to_numpy()
+    chunk_intervals = chunk_intervals or max(len(intervals), 1)
+
+    temporary_path = '%s.tmp%d' % (entry_path, os.getpid())
+    mf.make_folder(temporary_path)
+
+    stored = dict()
+    for trace_name in deterministic_traces.keys():
+        stored[trace_name] = \
+            np.lib.format.open_memmap(os.path.join(temporary_path, trace_name + '.npy'),
+                                      mode='w+', dtype=float,
+                                      shape=(len(intervals), num_scenarios))
+
+    paramters = {'RANDOM_SEED': random_seed, 'NUM_SCENARIOS': num_scenarios}
+    for start, chunk in ag.stream_arma_scenarios(paramters, deterministic_traces, arma_vals_df,
+                                                 chunk_intervals):
+        for trace_name, traces in chunk.items():
+            stored[trace_name][start:start + len(traces)] = traces
+
+    for trace_name in deterministic_traces.keys():
+        stored[trace_name].flush()
+    del stored
+
+    np.save(os.path.join(temporary_path, 'intervals.npy'), intervals)
+    np.save(os.path.join(temporary_path, 'pool_size.npy'), num_scenarios)
+
+    shutil.rmtree(entry_path, ignore_errors=True)
+    try:
+        os.rename(temporary_path, entry_path)
+    except OSError:
+        shutil.rmtree(temporary_path, ignore_errors=True)
+
+    print('ARMA traces of %d scenarios written to' % num_scenarios, entry_path)
+
+
+def read_entry(entry_path, num_scenarios):
+    """
+    Each trace as a DataFrame over a memory mapped slice of the stored array (no copy is made).
+    """
+    intervals = np.load(os.path.join(entry_path, 'intervals.npy'))
+    traces = dict()
+
+    for trace_file in sorted(os.listdir(entry_path)):
+        trace_name = trace_file[:-len('.npy')]
+        if trace_name in ['intervals', 'pool_size']:
+            continue
+
+        stored = np.load(os.path.join(entry_path, trace_file), mmap_mode='r')
+        traces[trace_name] = \
+            pd.DataFrame(stored[:, :num_scenarios],
+                         index=pd.Index(intervals, name='Interval'),
+                         columns=list(range(num_scenarios)), copy=False)
+
+    return traces
@@ -1,13 +1,24 @@
 import denkiuc.denki_paths
 import denkiuc.load_data as ld
 import denkiuc.misc_functions as mf
+import denkiuc.persistent_model as pm
+import denkiuc.solvers as solvers
 import denkiuc.variables as va
+import numpy as np
 import os
 import pulp as pp
 
 
-def run_opt_problem(name, prob_path, outputs_path=False):
+def run_opt_problem(name, prob_path, outputs_path=False, warm_start=None, base_prob=None,
+                    series_window=None):
+    """
+    Builds and solves the problem at prob_path. If base_prob is given (a solved problem with
+    the same structure, e.g. the previous day of a series), its model is reused with updated
+    constants instead of being built again. If series_window is given (a day of a series), the
+    traces are taken from it instead of the trace files in prob_path.
+    """
     prob = init_prob(name)
+    prob['warm_start'] = warm_start
 
     prob['paths'] = init_paths(prob_path, outputs_path)
     prob['settings'] = ld.load_settings(prob['paths'])
@@ -16,14 +27,38 @@ def run_opt_problem(name, prob_path, outputs_path=False):
     mf.make_folder(prob['paths']['outputs'])
     mf.set_logger_path(prob['paths']['outputs'])
 
-    prob['data'] = ld.load_data(prob['paths'], prob['settings'])
+    prob['data'] = ld.load_data(prob['paths'], prob['settings'], series_window)
+
+    if 'scenario_reduction' in prob['data']:
+        import denkiuc.scenario_reduction as sr
+        sr.write_reduction(prob['data']['scenario_reduction'], prob['paths']['outputs'])
+        prob['stats']['scenario_reduction_error'] = prob['data']['scenario_reduction']['error']
+        prob['stats']['scenario_reduction_time'] = prob['data']['scenario_reduction']['time']
+
+    if prob['settings']['SOLVE_MODE'] == 'progressive_hedging':
+        import denkiuc.progressive_hedging as ph
+        consensus_commitment = ph.run_progressive_hedging(prob)
+    elif prob['settings']['SOLVE_MODE'] != 'extensive':
+        print('Solve mode %s not known' % prob['settings']['SOLVE_MODE'])
+        exit()
+
     prob['sets'], prob['data'], prob['m_sets'] = \
         arrange_sets_and_data(prob['data'], prob['settings'], prob['paths'])
 
-    prob['vars'] = add_variables(prob['m_sets'])
+    if base_prob is not None and pm.can_reuse_model(prob, base_prob):
+        prob['vars'] = pm.reuse_variables(prob, base_prob)
+        prob['mod'] = pm.update_model(prob, base_prob)
+    else:
+        prob['vars'] = add_variables(prob['m_sets'], prob['settings'])
+
+        if prob['settings']['SOLVE_MODE'] == 'progressive_hedging':
+            ph.fix_inflexible_commitment(prob, consensus_commitment)
 
-    prob['mod'] = build_model(prob)
-    prob['stats'] = run_model(prob)
+        prob['mod'] = build_model(prob)
+    prob['stats'].update(run_model(prob))
+
+    if prob['settings']['SOLVE_MODE'] == 'progressive_hedging':
+        prob['stats']['ph_upper_bound'] = prob['stats']['obj_fn_value']
 
     return prob
 
@@ -31,6 +66,7 @@ def run_opt_problem(name, prob_path, outputs_path=False):
 def init_prob(name):
     prob = dict()
     prob['name'] = name
+    prob['stats'] = dict()
 
     return prob
 
@@ -51,80 +87,178 @@ def complete_paths(paths, settings, name):
     paths['LA_results_db'] = os.path.join(paths['results'], 'LA_results.db')
     paths['TR_results_db'] = os.path.join(paths['results'], 'TR_results.db')
     paths['arma_out_dir'] = os.path.join(paths['inputs'], 'arma_traces')
+    paths['compiled_inputs'] = os.path.join(paths['inputs'], 'compiled_inputs')
 
     return paths
 
 
 def arrange_sets_and_data(data, settings, paths):
+    data = ld.aggregate_look_ahead(data, settings)
     sets = ld.load_master_sets(data, settings)
     sets = ld.load_unit_subsets(data, sets, paths)
     sets = ld.add_reserve_subsets(sets)
     sets = ld.load_interval_subsets(settings, sets)
     m_sets = ld.make_multi_sets(sets)
 
-    data['probability_of_scenario'] = ld.define_scenario_probability(sets['scenarios'])
+    data['probability_of_scenario'] = ld.define_scenario_probability(sets['scenarios'], data)
 
     if not data['missing_values']['initial_state']:
         data = ld.validate_initial_state_data(data, sets)
 
     data = ld.add_default_values(data, sets)
     data = ld.replace_reserve_requirement_index(data)
+    data['params'] = ld.dkParams(data, sets)
 
     print("\nParameters and sets are ready")
 
     return sets, data, m_sets
 
 
-def add_variables(m_sets):
+def add_variables(m_sets, settings):
     vars = dict()
 
-    vars['power_generated'] = va.dkVar('power_generated', 'MW', m_sets['in_sc_un'])
+    def new_var(name, units, var_sets, var_type='C'):
+        if settings['NAMING_MODE'] == 'compact':
+            compact_col_start = sum(len(v.sets_indices) for v in vars.values())
+        else:
+            compact_col_start = None
+
+        return va.dkVar(name, units, var_sets, var_type, compact_col_start)
+
+    vars['power_generated'] = new_var('power_generated', 'MW', m_sets['in_sc_un'])
 
-    vars['num_built'] = va.dkVar('num_built', '#Units', m_sets['un'], 'I')
+    vars['num_built'] = new_var('num_built', '#Units', m_sets['un'], 'I')
 
-    vars['num_committed'] = va.dkVar('num_committed', '#Units', m_sets['in_sc_unco'], 'I')
-    vars['inertia_provided'] = va.dkVar('inertia_provided', 'MW.s', m_sets['in_sc_unco'])
-    vars['is_committed'] = va.dkVar('is_committed', 'Binary', m_sets['in_sc_unco'], 'B')
-    vars['num_shutting_down'] = va.dkVar('num_shutting_down', '#Units', m_sets['in_sc_unco'], 'I')
-    vars['num_starting_up'] = va.dkVar('num_starting_up', '#Units', m_sets['in_sc_unco'], 'I')
+    vars['num_committed'] = new_var('num_committed', '#Units', m_sets['in_sc_unco'], 'I')
+    vars['inertia_provided'] = new_var('inertia_provided', 'MW.s', m_sets['in_sc_unco'])
+    vars['is_committed'] = new_var('is_committed', 'Binary', m_sets['in_sc_unco'], 'B')
+    vars['num_shutting_down'] = new_var('num_shutting_down', '#Units', m_sets['in_sc_unco'], 'I')
+    vars['num_starting_up'] = new_var('num_starting_up', '#Units', m_sets['in_sc_unco'], 'I')
 
-    vars['reserve_enabled'] = va.dkVar('reserve_enabled', 'MW', m_sets['in_sc_un_re'])
+    if settings['MIN_UP_DOWN_FORMULATION'] == 'cumulative':
+        vars['cumulative_num_starting_up'] = \
+            new_var('cumulative_num_starting_up', '#Units', m_sets['in_sc_unco'])
+        vars['cumulative_num_shutting_down'] = \
+            new_var('cumulative_num_shutting_down', '#Units', m_sets['in_sc_unco'])
 
-    vars['charge_after_losses'] = va.dkVar('charge_after_losses', 'MW', m_sets['in_sc_unst'])
-    vars['energy_in_reservoir'] = va.dkVar('energy_in_reservoir', 'MWh', m_sets['in_sc_unst'])
+    vars['reserve_enabled'] = new_var('reserve_enabled', 'MW', m_sets['in_sc_un_re'])
 
-    vars['unserved_inertia'] = va.dkVar('unserved_inertia', 'MW.s', m_sets['in'])
+    vars['charge_after_losses'] = new_var('charge_after_losses', 'MW', m_sets['in_sc_unst'])
+    vars['energy_in_reservoir'] = new_var('energy_in_reservoir', 'MWh', m_sets['in_sc_unst'])
 
-    vars['unserved_power'] = va.dkVar('unserved_power', 'MW', m_sets['in_sc'])
+    vars['unserved_inertia'] = new_var('unserved_inertia', 'MW.s', m_sets['in'])
 
-    vars['unserved_reserve'] = va.dkVar('unserved_reserve', 'MW', m_sets['in_sc_re'])
+    vars['unserved_power'] = new_var('unserved_power', 'MW', m_sets['in_sc'])
+
+    if settings['ROCOF_FORMULATION'] == 'system_inertia':
+        vars['system_inertia'] = new_var('system_inertia', 'MW.s', m_sets['in_sc'])
+
+    vars['unserved_reserve'] = new_var('unserved_reserve', 'MW', m_sets['in_sc_re'])
+
+    if settings['PRICING_MODE'] == 'lp_relaxation':
+        import denkiuc.pricing as pr
+        pr.relax_integers(vars)
 
     return vars
 
 
 def build_model(prob):
+    import denkiuc.build_profiler as bp
     import denkiuc.constraints as cnts
     import denkiuc.obj_fn as obj
 
+    bp.start_memory_tracing(prob['settings'])
+
+    if prob['settings']['NAMING_MODE'] == 'compact':
+        import denkiuc.row_index as ri
+        prob['row_index'] = ri.dkRowIndex()
+
     prob['mod'] = pp.LpProblem(prob['name'], sense=pp.LpMinimize)
     prob['mod'] += obj.obj_fn(prob)
 
     cnts_df = cnts.create_cnts_df(prob['paths']['inputs'])
-    prob['mod'] = cnts.add_all_constraints_to_dataframe(prob, cnts_df)
+
+    if prob['settings']['MODEL_BACKEND'] == 'pulp':
+        prob['mod'] = cnts.add_all_constraints_to_dataframe(prob, cnts_df)
+    elif prob['settings']['MODEL_BACKEND'] == 'matrix':
+        import denkiuc.matrix_model as mm
+        prob['matrix'] = mm.assemble_model(prob, cnts_df)
+    else:
+        print('Model backend %s not known' % prob['settings']['MODEL_BACKEND'])
+        exit()
+
+    if prob['settings']['PRESOLVE_BOUNDS']:
+        presolve_model(prob)
+
+    bp.stop_memory_tracing()
 
     return prob['mod']
 
 
+def presolve_model(prob):
+    import denkiuc.presolve as ps
+    import time
+
+    time_start = time.perf_counter()
+
+    if prob['settings']['MODEL_BACKEND'] == 'matrix':
+        presolve_stats = ps.presolve_matrix(prob['matrix'])
+    else:
+        presolve_stats = ps.presolve_pulp_model(prob['mod'])
+
+    presolve_stats['presolve_time'] = time.perf_counter() - time_start
+    prob['stats'].update(presolve_stats)
+
+    print('Presolve removed %d rows and fixed %d columns'
+          % (presolve_stats['presolve_rows_removed'], presolve_stats['presolve_cols_fixed']))
+
+
 def run_model(prob):
     from denkiuc.add_custom_results import add_final_state
+    from denkiuc.build_profiler import write_build_profile
     import sqlite3
 
     sets, data, vars, mod, paths, name = \
         mf.prob_unpacker(prob, ['sets', 'data', 'vars', 'mod', 'paths', 'name'])
 
-    stats = solve_model(mod, name)
+    if prob['settings']['WRITE_MPS']:
+        write_mps(prob)
+
+    stats = solve_model(prob)
     store_results(prob)
 
+    if prob['settings']['PRICING_MODE'] == 'fixed_integer':
+        import denkiuc.pricing as pr
+        pricing_stats = pr.fix_integers_and_resolve(prob)
+        if pricing_stats is None:
+            stats['pricing_optimality_status'] = pp.LpStatus[pp.LpStatusNotSolved]
+        else:
+            stats['pricing_solver_time'] = pricing_stats['solver_time']
+            stats['pricing_optimality_status'] = pricing_stats['optimality_status']
+
+    if prob['settings']['PRICING_MODE'] != 'none':
+        import denkiuc.pricing as pr
+        pricing_status = stats.get('pricing_optimality_status', stats['optimality_status'])
+
+        if pricing_status == 'Optimal':
+            prob['prices'] = pr.extract_prices(prob)
+            pr.write_prices(prob['prices'], paths['results'])
+            if prob['settings']['PRICING_MODE'] == 'fixed_integer':
+                write_row_duals(prob)
+        else:
+            print('Prices not written, as the solve for the prices was %s' % pricing_status)
+
+    write_build_profile(prob['stats'], paths['results'])
+
+    if prob['settings']['SANITY_CHECKS']:
+        import denkiuc.sanity_check_solution as sc
+        prob['violations'] = sc.run_sanity_checks(prob)
+        sc.write_violations(prob['violations'], paths['results'])
+        stats['sanity_violations'] = len(prob['violations'])
+
+    if 'row_index' in prob and stats['optimality_status'] in ['Infeasible', 'Unbounded']:
+        write_row_index(prob)
+
     final_state = add_final_state(data, vars, sets, paths)
 
     connection = sqlite3.connect(paths['final_state'])
@@ -137,38 +271,167 @@ def run_model(prob):
     return stats
 
 
-def solve_model(mod, name):
+def write_row_index(prob):
+    row_index_path = os.path.join(prob['paths']['results'], 'row_index.csv')
+    prob['row_index'].to_df(with_labels=True).to_csv(row_index_path)
+    print('Row index written')
+
+
+def write_row_duals(prob):
+    """
+    The row duals of the matrix backend, if the solver gave them.
+    """
+    import denkiuc.matrix_model as mm
+    import pandas as pd
+
+    if prob.get('solution', dict()).get('row_dual') is None:
+        return
+
+    row_duals = pd.Series(prob['solution']['row_dual'], name='Dual',
+                          index=pd.Index(mm.make_row_names(prob['matrix']), name='Row'))
+    row_duals.to_csv(os.path.join(prob['paths']['results'], 'row_duals.csv'))
+    print("Row duals written")
+
+
+def write_mps(prob):
+    mps_path = os.path.join(prob['paths']['outputs'], 'model.mps')
+
+    if prob['settings']['MODEL_BACKEND'] == 'matrix':
+        import denkiuc.matrix_model as mm
+        mm.write_mps(prob['matrix'], mps_path)
+    else:
+        prob['mod'].writeMPS(mps_path)
+
+
+def solve_model(prob):
     import time
 
+    mod, name = mf.prob_unpacker(prob, ['mod', 'name'])
+
     def print_stats(stats):
         print('Model status: %s' % stats['optimality_status'])
-        print('Objective function = %f' % stats['obj_fn_value'])
+        if np.isnan(stats['obj_fn_value']):
+            print('Objective function = no solution')
+        else:
+            print('Objective function = %f' % stats['obj_fn_value'])
         print('Solve time = %.2f sec\n' % stats['solver_time'])
 
     time_start_solve = time.perf_counter()
     print('Begin solving the model\nOptimising...')
-    mod.solve(pp.PULP_CBC_CMD(timeLimit=5, threads=0, msg=0, gapRel=0.01))
+    if prob['settings']['MODEL_BACKEND'] == 'matrix':
+        import denkiuc.matrix_model as mm
+        if prob.get('warm_start'):
+            print('Warm starts are not supported by the matrix backend')
+        warm_start = False
+        mod, solver_stats = mm.solve_matrix_model(prob)
+    else:
+        warm_start = set_warm_start(prob)
+        solver_stats = solvers.solve_pulp_model(prob, warm_start)
     print("Finished optimising\n")
     time_end_solve = time.perf_counter()
 
-    stats = dict()
+    stats = solvers.solver_settings(prob['settings'])
+    stats.update(solver_stats)
     stats['solver_time'] = time_end_solve - time_start_solve
+    stats['warm_start'] = warm_start
     stats['optimality_status'] = pp.LpStatus[mod.status]
     mf.exit_if_infeasible(stats['optimality_status'], name)
-    stats['obj_fn_value'] = mod.objective.value()
+    stats['obj_fn_value'] = objective_value(prob, mod)
     print_stats(stats)
 
     return stats
 
 
+def has_solution(prob, mod):
+    """
+    True if the solver gave a solution (for a MIP, an integer incumbent). On the pulp backend
+    CBC leaves values in the variables even when it has none (e.g. the LP relaxation when the
+    time limit is reached before an incumbent is found), so PuLP's solution status is used.
+    """
+    if prob['settings']['MODEL_BACKEND'] == 'matrix':
+        return prob['solution']['col_value'] is not None
+
+    return mod.sol_status in [pp.LpSolutionOptimal, pp.LpSolutionIntegerFeasible]
+
+
+def objective_value(prob, mod):
+    """
+    The objective function value of the solution, or NaN if the solver gave no solution (e.g.
+    an infeasible model, or a time limit reached before an incumbent was found).
+    """
+    if not has_solution(prob, mod):
+        return float('nan')
+
+    if prob['settings']['MODEL_BACKEND'] == 'matrix':
+        return prob['matrix']['obj'] @ prob['solution']['col_value'] \
+            + prob['matrix']['obj_constant']
+
+    return mod.objective.value()
+
+
+def get_warm_start(prob):
+    """
+    Commitment values of a solved problem (taken from its results), to be used as a MIP start
+    for a later problem (e.g. the next day of a series, whose first intervals are this
+    problem's look-ahead).
+    """
+    warm_start = dict()
+
+    for var_name in ['num_committed', 'is_committed', 'num_starting_up', 'num_shutting_down']:
+        dkvar = prob['vars'][var_name]
+        values = dkvar.result_df.to_numpy().ravel()
+        warm_start[var_name] = \
+            {ind: int(value) for ind, value in zip(dkvar.sets_indices, values) if value != -9999}
+
+    return warm_start
+
+
+def set_warm_start(prob):
+    """
+    Sets the initial values of the variables in prob['warm_start'] that are also in this
+    problem. Intervals after the last one in the warm start hold the last commitment (with no
+    start-ups or shut-downs), so that the solver is given a complete commitment schedule.
+    Returns True if any values were set.
+    """
+    if not prob.get('warm_start'):
+        return False
+
+    num_set = 0
+    for var_name, values in prob['warm_start'].items():
+        pulp_vars = prob['vars'][var_name].var
+        held_values = dict()
+
+        for ind in sorted(pulp_vars):
+            if ind in values:
+                value = values[ind]
+                held_values[ind[1:]] = value
+            elif ind[1:] in held_values:
+                value = held_values[ind[1:]] if var_name in ['num_committed', 'is_committed'] else 0
+            else:
+                continue
+
+            pulp_vars[ind].setInitialValue(value)
+            num_set += 1
+
+    print('Warm start values set for %d variables' % num_set)
+
+    return num_set > 0
+
+
 def store_results(prob):
     import sqlite3
 
     sets, settings, vars, paths = mf.prob_unpacker(prob, ['sets', 'settings', 'vars', 'paths'])
 
     def make_results_dfs(vars, sets):
+        col_value = prob.get('solution', dict()).get('col_value')
+
         for name, dkvar in vars.items():
-            dkvar.to_df()
+            if col_value is None:
+                dkvar.to_df()
+            else:
+                num_cols = len(dkvar.sets_indices)
+                dkvar.to_df(col_value[dkvar.col_offset:dkvar.col_offset + num_cols])
             dkvar.remove_LA_int_from_results(sets['main_intervals'].indices)
 
     def write_LA_results(vars, paths):
@@ -189,9 +452,24 @@ def store_results(prob):
 
     os.makedirs(paths['results'])
     make_results_dfs(vars, sets)
-
-    if settings['WRITE_RESULTS_WITH_LOOK_AHEAD']:
-        write_LA_results(vars, paths)
-
-    if settings['WRITE_RESULTS_WITHOUT_LOOK_AHEAD']:
-        write_TR_results(vars, paths)
+    prob['data']['interval_hours'].to_csv(os.path.join(paths['results'], 'interval_hours.csv'))
+
+    if settings['RESULTS_FORMAT'] == 'parquet':
+        import denkiuc.results_store as rs
+        rs.write_results(vars, sets, paths['results'])
+    elif settings['RESULTS_FORMAT'] != 'csv_db':
+        print('Results format %s not known, options are csv_db or parquet'
+              % settings['RESULTS_FORMAT'])
+        exit()
+    else:
+        if settings['WRITE_RESULTS_WITH_LOOK_AHEAD']:
+            write_LA_results(vars, paths)
+
+        if settings['WRITE_RESULTS_WITHOUT_LOOK_AHEAD']:
+            write_TR_results(vars, paths)
+
+    if settings['WRITE_INERTIA_RESULTS']:
+        import denkiuc.add_custom_results as acr
+        acr.write_inertia_results(prob['data'], vars, paths['results'], settings)
+
+    write_row_duals(prob)
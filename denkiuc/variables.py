@@ -2,15 +2,18 @@ import pulp as pp
 
 
 class dkVar():
-    def __init__(self, name, units, sets, var_type='C'):
+    def __init__(self, name, units, sets, var_type='C', compact_col_start=None):
         var_type_dict = {'C': 'Continuous', 'I': 'Integer', 'B': 'Binary'}
 
         self.name = name
         self.units = units
         self.sets = sets
         self.type = var_type_dict[var_type]
+        self.shape = tuple(len(x.indices) for x in sets)
         self.sets_indices = self.make_var_indices(sets)
+        self.compact_col_start = compact_col_start
         self.var = self.make_pulp_variable(self.sets_indices)
+        self.col_offset = None
 
     def make_var_indices(self, sets):
         import itertools
@@ -37,56 +40,58 @@ class dkVar():
         return indices_permut_list
 
     def make_pulp_variable(self, sets_indices):
+        if self.compact_col_start is not None:
+            var = {ind: pp.LpVariable('x%d' % (self.compact_col_start + n), lowBound=0,
+                                      cat=self.type)
+                   for n, ind in enumerate(sets_indices)}
+            return var
+
         var = pp.LpVariable.dicts(self.name,
                                   (ind for ind in sets_indices),
                                   lowBound=0,
                                   cat=self.type)
         return var
 
-    def one_dim_to_df(self):
-        import pandas as pd
-
-        values = [self.var[i].value() for i in self.sets_indices]
-        self.result_df = pd.Series(data=values, index=self.sets_indices, name=self.name)
-
-    def two_dim_to_df(self, sets_order):
-        import pandas as pd
-
-        self.result_df = \
-            pd.DataFrame(index=sets_order[0].indices, columns=sets_order[1].indices)
-        for x0 in sets_order[0].indices:
-            for x1 in sets_order[1].indices:
-                self.result_df.loc[x0, x1] = self.var[(x0, x1)].value()
-
-    def three_dim_to_df(self, sets_order):
+    def columns(self, *positions):
+        import numpy as np
+
+        positions = tuple(np.broadcast_arrays(*positions))
+        return self.col_offset + np.ravel_multi_index(positions, self.shape)
+
+    def pulp_values(self):
+        """
+        The values of the PuLP variables as a flat float array, in the order of sets_indices.
+        Variables without a value are NaN.
+        """
+        import numpy as np
+
+        return np.fromiter((np.nan if self.var[ind].varValue is None else self.var[ind].varValue
+                            for ind in self.sets_indices),
+                           dtype=float, count=len(self.sets_indices))
+
+    def array_to_df(self, values, sets_order):
+        """
+        Makes the result dataframe from an array of this variable's values, in the order of
+        sets_indices (e.g. this variable's slice of an in-memory solver's primal values, or
+        pulp_values). The array is reshaped, so the frame is float with no copy per cell.
+        """
+        import numpy as np
         import pandas as pd
 
-        iterables = [sets_order[1].indices, sets_order[2].indices]
-        iterables_names = [sets_order[1].name, sets_order[2].name]
-        df_cols = pd.MultiIndex.from_product(iterables, names=iterables_names)
+        values = np.asarray(values, dtype=float).reshape(self.shape[0], -1)
 
-        self.result_df = pd.DataFrame(index=sets_order[0].indices, columns=df_cols)
-        self.result_df.index.name = sets_order[0].name
-        for x0 in sets_order[0].indices:
-            for x1 in sets_order[1].indices:
-                for x2 in sets_order[2].indices:
-                    self.result_df.loc[x0, (x1, x2)] = self.var[(x0, x1, x2)].value()
-
-    def four_dim_to_df(self, sets_order):
-        import pandas as pd
+        if len(self.sets) == 1:
+            self.result_df = pd.Series(data=values[:, 0], index=self.sets_indices, name=self.name)
+            return
 
-        iterables = [sets_order[1].indices, sets_order[2].indices, sets_order[3].indices]
-        iterables_names = [sets_order[1].name, sets_order[2].name, sets_order[3].name]
-        df_cols = pd.MultiIndex.from_product(iterables, names=iterables_names)
+        if len(self.sets) == 2:
+            df_cols = sets_order[1].indices
+        else:
+            iterables = [sets_order[n].indices for n in range(1, len(self.sets))]
+            iterables_names = [sets_order[n].name for n in range(1, len(self.sets))]
+            df_cols = pd.MultiIndex.from_product(iterables, names=iterables_names)
 
-        self.result_df = pd.DataFrame(index=sets_order[0].indices, columns=df_cols)
-        self.result_df.index.name = sets_order[0].name
-        for x0 in sets_order[0].indices:
-            for x1 in sets_order[1].indices:
-                for x2 in sets_order[2].indices:
-                    for x3 in sets_order[3].indices:
-                        self.result_df.loc[x0, (x1, x2, x3)] = \
-                            self.var[(x0, x1, x2, x3)].value()
+        self.result_df = pd.DataFrame(values, index=sets_order[0].indices, columns=df_cols)
 
     def get_vars_sets_order(self):
         sets_order = dict()
@@ -94,25 +99,20 @@ class dkVar():
             sets_order[n] = set
         return sets_order
 
-    def to_df(self):
-        num_indexes = len(self.sets)
+    def to_df(self, values=None):
         sets_order = self.get_vars_sets_order()
 
-        if num_indexes == 1:
-            self.one_dim_to_df()
-        elif num_indexes == 2:
-            self.two_dim_to_df(sets_order)
-        elif num_indexes == 3:
-            self.three_dim_to_df(sets_order)
-        elif num_indexes == 4:
-            self.four_dim_to_df(sets_order)
+        if values is None:
+            values = self.pulp_values()
+
+        self.result_values = values
+        self.array_to_df(values, sets_order)
 
         self.result_df.index.name = sets_order[0].name
         self.result_df = self.result_df.fillna(-9999)
-        self.result_df = self.result_df.astype(float)
 
         if self.type == 'Binary' or self.type == 'Integer':
-            self.result_df = self.result_df.astype(int)
+            self.result_df = self.result_df.round().astype(int)
 
     def remove_LA_int_from_results(self, main_intervals):
         if 'intervals' not in [setx.name for setx in self.sets]:
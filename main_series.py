@@ -3,6 +3,7 @@ import denkiuc.load_data as ld
 import denkiuc.misc_functions as mf
 import denkiuc.uc_model as uc
 import denkiuc.arma_generator as ag
+import denkiuc.series_traces as st
 from rich.console import Console
 import os
 import time
@@ -27,9 +28,12 @@ def run_series(name, prob_path):
     series['traces'] = trim_traces_to_integer_days(series['traces'], series['settings'])
     series['traces'] = add_last_look_ahead(series['traces'], series['settings'])
     series['traces'] = reset_trace_index_to_zero(series['traces'])
+    series['series_traces'] = \
+        st.load_series_traces(series['traces'], paths['inputs'], series['settings'])
 
     series['days_summary'] = cycle_days(series)
     print_status_table(series['days_summary'])
+    print_warm_start_summary(series['days_summary'])
 
 
 def init_series(name):
@@ -100,26 +104,24 @@ def add_last_look_ahead(traces, settings):
 def cycle_days(series):
     import pandas as pd
 
-    settings, traces = mf.prob_unpacker(series, ['settings', 'traces'])
-
-    def get_days_intervals(d, num_keep_intervals, intervals_per_day):
-        first_interval = settings['NUM_KEEP_INTERVALS'] * d
-        last_interval = first_interval + settings['INTERVALS_PER_DAY']
-        days_intervals = list(range(first_interval, last_interval))
-        return days_intervals
+    settings, series_traces = mf.prob_unpacker(series, ['settings', 'series_traces'])
 
     all_days = dict()
     all_days_folder = os.path.join(paths['inputs'], 'days')
     days_summary = pd.DataFrame(columns=['OptimalityStatus'])
+    warm_start = None
+    base_prob = None
 
     for d in range(settings['NUM_DAYS']):
-        days_intervals = \
-            get_days_intervals(d, settings['NUM_KEEP_INTERVALS'], settings['INTERVALS_PER_DAY'])
-
-        days_traces = filter_days_traces(days_intervals, traces)
-
-        day = denkiDay(d, days_traces, all_days_folder, paths['outputs'])
-        day.solve_day()
+        days_window = st.day_window(series_traces, settings['NUM_KEEP_INTERVALS'] * d,
+                                    settings['INTERVALS_PER_DAY'])
+
+        day = denkiDay(d, days_window, all_days_folder, paths['outputs'])
+        day_prob = day.solve_day(warm_start, base_prob)
+        if settings['WARM_START_SERIES']:
+            warm_start = day.warm_start
+        if settings['PERSISTENT_MODEL']:
+            base_prob = day_prob
         all_days['day' + str(d)] = day
         days_summary = days_summary.append(pd.Series(day.days_status, name=day.name))
 
@@ -129,16 +131,6 @@ def cycle_days(series):
     return days_summary
 
 
-def filter_days_traces(days_intervals, traces):
-    days_traces = dict()
-
-    for trace_name, trace in traces.items():
-        trace.index = trace.index.set_names(['Interval'])
-        days_traces[trace_name] = trace.loc[days_intervals, :]
-
-    return days_traces
-
-
 def print_status_table(days_summary):
     from rich.table import Table
 
@@ -157,8 +149,25 @@ def print_status_table(days_summary):
     console.print(all_days_table)
 
 
+def print_warm_start_summary(days_summary):
+    """
+    Mean solver time and time to the first incumbent of the days solved with and without a
+    warm start from the previous day.
+    """
+    if not days_summary['WarmStart'].any():
+        return
+
+    summary = days_summary.groupby('WarmStart')[['TimeToFirstIncumbent', 'SolverTime']]
+    console.print("Warm start summary (mean seconds)", style='bold')
+    console.print(summary.mean().astype(float).round(3).to_string())
+
+
 class denkiDay():
-    def __init__(self, day_number, days_traces, all_days_folder, path_to_outputs):
+    """
+    A day of the series, with its inputs folder (the series inputs other than the traces, and
+    the final state of the previous day) and its window of the series traces.
+    """
+    def __init__(self, day_number, days_window, all_days_folder, path_to_outputs):
         import denkiuc.misc_functions as mf
         import shutil
 
@@ -171,40 +180,51 @@ class denkiDay():
         self.prev_day = 'day' + str(day_number - 1)
         self.input_path = os.path.join(self.all_days_folder, self.name)
         self.prev_day_outputs_folder = os.path.join(path_to_outputs, self.prev_day)
+        self.days_window = days_window
 
         mf.make_folder(self.input_path)
 
         files_in_folder = \
             [f for f in os.listdir(self.all_days_inputs_folder)
-             if f[-4:] == '.csv' and f[:-4] not in days_traces.keys()]
+             if f[-4:] == '.csv' and f[:-4] not in days_window['trace_names']]
 
         for f in files_in_folder:
             src_path = os.path.join(self.all_days_inputs_folder, f)
             dst_path = os.path.join(self.input_path, f)
             shutil.copyfile(src_path, dst_path)
 
-        for trace_name, trace in days_traces.items():
-            dst_path = os.path.join(self.input_path, trace_name+'.csv')
-            trace.to_csv(dst_path)
-
         if os.path.exists(self.prev_day_outputs_folder):
             src_path = os.path.join(self.prev_day_outputs_folder, 'results', 'final_state.db')
             dst_path = os.path.join(self.input_path, 'initial_state.db')
             shutil.copyfile(src_path, dst_path)
 
-    def solve_day(self):
-        day_prob = uc.run_opt_problem(self.name, self.input_path)
+    def solve_day(self, warm_start=None, base_prob=None):
+        day_prob = uc.run_opt_problem(self.name, self.input_path, warm_start=warm_start,
+                                      base_prob=base_prob, series_window=self.days_window)
+        self.warm_start = uc.get_warm_start(day_prob)
 
         self.days_status = dict()
         self.days_status['OptimalityStatus'] = day_prob['stats']['optimality_status']
         self.days_status['ObjFnVal'] = day_prob['stats']['obj_fn_value']
         self.days_status['SolverTime'] = day_prob['stats']['solver_time']
+        self.days_status['WarmStart'] = day_prob['stats']['warm_start']
+        self.days_status['TimeToFirstIncumbent'] = day_prob['stats']['time_to_first_incumbent']
+        self.days_status['BuildTime'] = \
+            sum(step['WallTime_s'] for step in day_prob['stats']['build_profile'])
+        self.days_status['SanityViolations'] = \
+            day_prob['stats'].get('sanity_violations', float('nan'))
+        self.days_status['ScenarioReductionError'] = \
+            day_prob['stats'].get('scenario_reduction_error', float('nan'))
+        self.days_status['ScenarioReductionTime'] = \
+            day_prob['stats'].get('scenario_reduction_time', float('nan'))
 
         time_end_day = time.perf_counter()
         self.days_status['TotalRunTime'] = time_end_day - self.time_start_day
 
         print()
 
+        return day_prob
+
 
 paths = denkiuc.denki_paths.dk_paths
 path_to_test_series = os.path.join(paths['denki_examples'], 'test_series')
@@ -0,0 +1,34 @@
+"""
+Solves one problem for each case in a csv file of objective settings, e.g.
+
+    python run_sweep.py examples/test1 carbon_price_cases.csv 4
+
+where the csv file has a Case column and a column for each swept setting (CARBON_PRICE,
+REC_PRICE, UNS_LOAD_PNTY, UNS_RESERVE_PNTY or UNS_INERTIA_PNTY). The optional last argument
+is the number of worker processes (SWEEP_PROCESSES in settings.csv is used otherwise).
+"""
+import denkiuc.sweep as sw
+import os
+import sys
+import pandas as pd
+
+
+def main():
+    if len(sys.argv) < 3:
+        print('Usage: python run_sweep.py <prob_path> <cases_csv> [<num_processes>]')
+        exit()
+
+    prob_path, cases_path = sys.argv[1], sys.argv[2]
+    num_processes = int(sys.argv[3]) if len(sys.argv) > 3 else None
+
+    cases_df = pd.read_csv(cases_path, index_col='Case')
+    name = os.path.splitext(os.path.basename(cases_path))[0]
+
+    summary_df = sw.run_sweep(name, prob_path, cases_df, num_processes=num_processes)
+
+    print('\nSweep summary')
+    print(summary_df.to_string())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,24 @@
+import types
+import numpy as np
+import pandas as pd
+import denkiuc.add_custom_results as acr
+
+
+def test_maximum_rocof_finds_worst_contingency():
+    params = types.SimpleNamespace(unit_pos={'Coal': 0, 'Gas': 1},
+                                   units={'InertialConst_s': np.array([4., 2.]),
+                                          'Capacity_MW': np.array([500., 100.])})
+    cols = pd.MultiIndex.from_product([[0, 1], ['Coal', 'Gas']])
+    num_committed = pd.DataFrame([[1, 2, 1, 4], [0, 0, 0, 0]], columns=cols)
+    settings = {'SYSTEM_FREQUENCY': 50, 'MAX_ROCOF': 1}
+
+    inertia_dispatch = acr.add_inertia_dispatch({'params': params},
+                                                {'num_committed': num_committed})
+    max_rocof = acr.add_maximum_rocof({'params': params}, {'num_committed': num_committed},
+                                      settings)
+
+    assert inertia_dispatch[(0, 'SystemInertia')].to_list() == [2400, 0]
+    assert max_rocof.loc[0, 'MaxRocof'] == 500 * 50 / (2 * 400)
+    assert max_rocof.loc[0, 'ResponsibleUnit'] == 'Coal'
+    assert max_rocof.loc[1, 'MaxRocof'] == 0
+    assert max_rocof.loc[1, 'ResponsibleUnit'] is None
@@ -0,0 +1,60 @@
+import denkiuc.arma_generator as ag
+import numpy as np
+import pandas as pd
+
+
+arma_vals_df = pd.DataFrame({'demand': [0.4, 0.7, 0.03], 'wind': [0.9, -0.2, 0.4]},
+                            index=['alpha', 'beta', 'sigma'])
+deterministic_traces = {'demand': pd.DataFrame({'Demand': [600., 1070., 1090., 1110.]}),
+                        'wind': pd.DataFrame({'Wind': [0., 0.5, 0.99, 1.]})}
+paramters = {'RANDOM_SEED': 7, 'NUM_SCENARIOS': 3}
+
+
+def test_forecast_error_follows_arma_recursion():
+    random_generators = [np.random.default_rng(s) for s in range(2)]
+    forecast_error = np.concatenate(list(
+        ag.arma_forecast_error_chunks(arma_vals_df['demand'], 5, random_generators, 2)))
+
+    for s in range(2):
+        noise = np.random.default_rng(s).normal(0, 0.03, 5)
+        expected = [0]
+        for i in range(1, 5):
+            expected.append(0.4 * expected[i - 1] + noise[i] + 0.7 * noise[i - 1])
+        assert np.allclose(forecast_error[:, s], expected)
+
+
+def test_chunks_do_not_change_the_scenarios():
+    stochastic_traces = ag.add_arma_scenarios(paramters, deterministic_traces, arma_vals_df)
+    chunks = list(ag.stream_arma_scenarios(paramters, deterministic_traces, arma_vals_df, 3))
+
+    assert [start for start, chunk in chunks] == [0, 3]
+    for trace_name, traces in stochastic_traces.items():
+        chunked_traces = np.concatenate([chunk[trace_name] for start, chunk in chunks])
+        assert (chunked_traces == traces.to_numpy()).all()
+
+
+def test_arma_scenarios():
+    stochastic_traces = ag.add_arma_scenarios(paramters, deterministic_traces, arma_vals_df)
+    one_scenario_traces = \
+        ag.add_arma_scenarios(dict(paramters, NUM_SCENARIOS=1), deterministic_traces, arma_vals_df)
+    repeated_traces = ag.add_arma_scenarios(paramters, deterministic_traces, arma_vals_df)
+
+    for trace_name, traces in stochastic_traces.items():
+        assert list(traces.columns) == [0, 1, 2]
+        assert traces.dtypes.unique().tolist() == [np.dtype(float)]
+        assert (traces.to_numpy() == repeated_traces[trace_name].to_numpy()).all()
+        assert (traces[0] == deterministic_traces[trace_name].iloc[:, 0]).all()
+        assert (traces.iloc[0] == traces.iloc[0, 0]).all()
+        assert (one_scenario_traces[trace_name][0] == traces[0]).all()
+
+    assert stochastic_traces['wind'].to_numpy().max() <= 1
+    assert stochastic_traces['wind'].to_numpy().min() >= 0
+
+
+def test_first_scenarios_do_not_depend_on_the_number_of_scenarios():
+    stochastic_traces = ag.add_arma_scenarios(paramters, deterministic_traces, arma_vals_df)
+    more_traces = ag.add_arma_scenarios(dict(paramters, NUM_SCENARIOS=5), deterministic_traces,
+                                        arma_vals_df)
+
+    for trace_name, traces in stochastic_traces.items():
+        assert (more_traces[trace_name][[0, 1, 2]].to_numpy() == traces.to_numpy()).all()
@@ -0,0 +1,41 @@
+import denkiuc.compiled_inputs as ci
+import numpy as np
+import os
+import pandas as pd
+import shutil
+
+
+test1_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'test1')
+
+
+def test_table_round_trip(tmp_path):
+    units = pd.DataFrame({'NoUnits': [1, 2], 'Capacity_MW': [510., 300.],
+                          'Technology': ['Coal', np.nan]},
+                         index=pd.Index(['Coal1', 'Gas1'], name='Unit'))
+
+    np.savez(tmp_path / 'table.npz', **ci.pack_table('units', units))
+    with np.load(tmp_path / 'table.npz', allow_pickle=False) as arrays:
+        unpacked = ci.unpack_table('units', arrays)
+
+    pd.testing.assert_frame_equal(unpacked, units)
+
+
+def test_snapshot_is_keyed_by_source_files(tmp_path):
+    inputs_path = tmp_path / 'test1'
+    shutil.copytree(test1_path, inputs_path)
+    paths = {'inputs': str(inputs_path), 'compiled_inputs': str(inputs_path / 'compiled_inputs')}
+
+    compiled = ci.load_compiled_inputs(paths)
+    first_hash = ci.inputs_hash(paths)
+    reread = ci.load_compiled_inputs(paths)
+
+    assert reread['unit_subsets'] == compiled['unit_subsets']
+    assert reread['reserve_indices'] == compiled['reserve_indices']
+    pd.testing.assert_frame_equal(reread['units'], compiled['units'])
+
+    with open(inputs_path / 'unit_data.csv', 'a') as f:
+        f.write('\n')
+
+    assert ci.inputs_hash(paths) != first_hash
+    ci.load_compiled_inputs(paths)
+    assert os.listdir(paths['compiled_inputs']) == [ci.inputs_hash(paths) + '.npz']
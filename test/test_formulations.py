@@ -0,0 +1,75 @@
+import denkiuc.load_data as ld
+import denkiuc.uc_model as uc
+import os
+import pandas as pd
+import pytest
+import shutil
+
+
+test1_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                          'examples', 'test1')
+trace_files = ['demand', 'wind', 'solarPV', 'reserve_requirement', 'inertia_requirement']
+
+
+def solve_test1(tmp_path, settings, unit_data=None):
+    """
+    The objective of test1 solved to optimality, cut to its first 16 intervals (4 of them look
+    ahead) so that it solves in about a second, with the given settings and unit data changed.
+    """
+    inputs_path = tmp_path / 'test1'
+    shutil.copytree(test1_path, inputs_path)
+
+    for trace_file in trace_files:
+        trace_df = pd.read_csv(inputs_path / (trace_file + '.csv'), index_col=0)
+        trace_df.iloc[:16].to_csv(inputs_path / (trace_file + '.csv'))
+
+    units_df = pd.read_csv(inputs_path / 'unit_data.csv', index_col=0)
+    for (unit, column), value in (unit_data or dict()).items():
+        units_df.loc[unit, column] = value
+    units_df.to_csv(inputs_path / 'unit_data.csv')
+
+    settings_df = pd.read_csv(inputs_path / 'settings.csv', index_col=0)
+    settings = dict({'LOOK_AHEAD_INTS': 4, 'SOLVER_REL_GAP': 0.0, 'SOLVER_TIME_LIMIT': 60.0},
+                    **settings)
+    for parameter, value in settings.items():
+        settings_df.loc[parameter, ['Value', 'Type']] = [value, type(value).__name__]
+    settings_df.to_csv(inputs_path / 'settings.csv')
+
+    prob = uc.init_prob('test1')
+    prob['paths'] = {'inputs': str(inputs_path), 'outputs': str(tmp_path / 'outputs'),
+                     'settings': str(inputs_path / 'settings.csv')}
+    prob['settings'] = ld.load_settings(prob['paths'])
+    prob['paths'] = uc.complete_paths(prob['paths'], prob['settings'], prob['name'])
+    os.makedirs(prob['paths']['outputs'])
+
+    prob['data'] = ld.load_data(prob['paths'], prob['settings'])
+    prob['sets'], prob['data'], prob['m_sets'] = \
+        uc.arrange_sets_and_data(prob['data'], prob['settings'], prob['paths'])
+    prob['vars'] = uc.add_variables(prob['m_sets'], prob['settings'])
+    prob['mod'] = uc.build_model(prob)
+    stats = uc.solve_model(prob)
+
+    assert stats['optimality_status'] == 'Optimal'
+    return stats['obj_fn_value']
+
+
+def test_rocof_formulations_give_the_same_objective(tmp_path):
+    # The RoCoF limit binds at 3 Hz/s (the objective is higher than with the test1 limit)
+    full = solve_test1(tmp_path / 'full', {'MAX_ROCOF': 3.0, 'ROCOF_FORMULATION': 'full'})
+    system_inertia = solve_test1(tmp_path / 'system_inertia',
+                                 {'MAX_ROCOF': 3.0, 'ROCOF_FORMULATION': 'system_inertia'})
+    unbound = solve_test1(tmp_path / 'unbound', {'MAX_ROCOF': 20.0})
+
+    assert system_inertia == pytest.approx(full, rel=1e-7)
+    assert full > unbound
+
+
+def test_min_up_down_formulations_give_the_same_objective(tmp_path):
+    window = solve_test1(tmp_path / 'window', {'MIN_UP_DOWN_FORMULATION': 'window'})
+    cumulative = solve_test1(tmp_path / 'cumulative', {'MIN_UP_DOWN_FORMULATION': 'cumulative'})
+    no_min_times = {(unit, column): 0 for unit in ['Coal1', 'Coal2', 'Gas1', 'Gas2']
+                    for column in ['MinUpTime_h', 'MinDownTime_h']}
+    unbound = solve_test1(tmp_path / 'unbound', dict(), no_min_times)
+
+    assert cumulative == pytest.approx(window, rel=1e-7)
+    assert window > unbound
@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+import denkiuc.constraints as cnt
+import denkiuc.load_data as ld
+
+
+class fakeParams():
+    def __init__(self, interval_hours, min_up_time):
+        self.interval_hours = np.array(interval_hours)
+        self.interval_start_hours = np.concatenate(([0], np.cumsum(interval_hours)[:-1]))
+        self.min_up_time = np.array(min_up_time)
+
+    def unit_values(self, column, subset_name='units'):
+        return self.min_up_time
+
+
+def test_aggregate_look_ahead():
+    demand = pd.DataFrame({0: [10., 20., 30., 40., 50., 60.]}, index=range(1, 7))
+    as_reqt = pd.DataFrame({'PrimaryRaise': [1., 1., 2., 4., 6., 8.]})
+    data = {'traces': {'demand': demand}, 'as_reqt': as_reqt,
+            'missing_values': {'as_reqt': False}}
+    settings = {'LOOK_AHEAD_INTS': 4, 'LOOK_AHEAD_BLOCK_INTS': 3, 'INTERVALS_PER_HOUR': 2}
+
+    data = ld.aggregate_look_ahead(data, settings)
+
+    assert data['traces']['demand'][0].to_list() == [10, 20, 40, 60]
+    assert data['traces']['demand'].index.to_list() == [1, 2, 3, 4]
+    assert data['as_reqt']['PrimaryRaise'].to_list() == [1, 1, 4, 8]
+    assert data['interval_hours'].to_list() == [0.5, 0.5, 1.5, 0.5]
+    assert ld.num_look_ahead_intervals(settings) == 2
+
+
+def test_min_time_window_starts_uniform_intervals():
+    params = fakeParams([0.5] * 6, [0, 0.5, 1.5, 10])
+    window_starts = cnt.min_time_window_starts(params, 'MinUpTime_h')
+
+    window_length = np.ceil(2 * params.min_up_time)
+    expected = np.maximum(0, np.arange(6)[:, None] - window_length[None, :].astype(int) + 1)
+    assert (window_starts == expected).all()
+
+
+def test_min_time_window_starts_merged_intervals():
+    params = fakeParams([0.5, 0.5, 2, 2], [1, 2.5])
+    window_starts = cnt.min_time_window_starts(params, 'MinUpTime_h')
+
+    assert window_starts.tolist() == [[0, 0], [0, 0], [1, 0], [3, 2]]
@@ -0,0 +1,21 @@
+import denkiuc.matrix_model as mm
+import numpy as np
+
+
+def test_block_rows_follow_block_shape():
+    blk = mm.dkBlock('test_block', (2, 3), 'L')
+    blk.add_terms(np.array([[5], [7]]), 1.5)
+    rows, cols, coefs = blk.coo()
+    assert rows.tolist() == [0, 1, 2, 3, 4, 5]
+    assert cols.tolist() == [5, 5, 5, 7, 7, 7]
+    assert coefs.tolist() == [1.5] * 6
+
+
+def test_duplicate_entries_are_summed():
+    rows = np.array([0, 0, 1, 1])
+    cols = np.array([3, 3, 2, 4])
+    coefs = np.array([1.0, 2.0, 1.0, 0.0])
+    rows, cols, coefs = mm.sum_duplicate_entries(rows, cols, coefs)
+    assert rows.tolist() == [0, 1]
+    assert cols.tolist() == [3, 2]
+    assert coefs.tolist() == [3.0, 1.0]
@@ -0,0 +1,94 @@
+import denkiuc.load_data as ld
+import denkiuc.persistent_model as pm
+import denkiuc.uc_model as uc
+import os
+import pandas as pd
+import shutil
+
+
+test1_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                          'examples', 'test1')
+
+
+def make_day_prob(inputs_path, outputs_path, probability=None):
+    prob = uc.init_prob('day')
+    prob['paths'] = {'inputs': str(inputs_path), 'outputs': str(outputs_path),
+                     'settings': os.path.join(inputs_path, 'settings.csv')}
+    prob['settings'] = ld.load_settings(prob['paths'])
+    prob['paths'] = uc.complete_paths(prob['paths'], prob['settings'], prob['name'])
+
+    data = ld.load_data(prob['paths'], prob['settings'])
+    if probability is not None:
+        data['scenario_reduction']['probability'] = probability
+    prob['sets'], prob['data'], prob['m_sets'] = \
+        uc.arrange_sets_and_data(data, prob['settings'], prob['paths'])
+
+    return prob
+
+
+def build_day_model(prob):
+    prob['vars'] = uc.add_variables(prob['m_sets'], prob['settings'])
+    prob['mod'] = uc.build_model(prob)
+
+    return prob
+
+
+def reuse_day_model(prob, base_prob):
+    assert pm.can_reuse_model(prob, base_prob)
+    prob['vars'] = pm.reuse_variables(prob, base_prob)
+    prob['mod'] = pm.update_model(prob, base_prob)
+
+    return prob
+
+
+def change_csv(csv_path, changes):
+    df = pd.read_csv(csv_path, index_col=0)
+    for (row, column), value in changes.items():
+        df.loc[row, column] = value
+    df.to_csv(csv_path)
+
+
+def row_constants(mod):
+    return {name: round(row.constant, 6) for name, row in mod.constraints.items()}
+
+
+def objective_coefficients(mod):
+    return {var.name: round(coef, 9) for var, coef in mod.objective.items()}
+
+
+def test_reused_model_uses_probabilities_of_the_day(tmp_path):
+    inputs_path = tmp_path / 'test1'
+    shutil.copytree(test1_path, inputs_path)
+    with open(inputs_path / 'settings.csv', 'a') as f:
+        f.write('NUM_SCENARIOS,2,int,\nSCENARIO_POOL_SIZE,4,int,\n')
+
+    base_prob = build_day_model(make_day_prob(inputs_path, tmp_path / 'day1', {0: 0.75, 1: 0.25}))
+    prob = reuse_day_model(make_day_prob(inputs_path, tmp_path / 'day2', {0: 0.25, 1: 0.75}),
+                           base_prob)
+    reused_objective = objective_coefficients(prob['mod'])
+
+    fresh_prob = build_day_model(make_day_prob(inputs_path, tmp_path / 'day2', {0: 0.25, 1: 0.75}))
+    fresh_objective = objective_coefficients(fresh_prob['mod'])
+
+    assert reused_objective == fresh_objective
+
+
+def test_reused_model_has_constants_of_the_day(tmp_path):
+    day1_path, day2_path = tmp_path / 'day1_inputs', tmp_path / 'day2_inputs'
+    shutil.copytree(test1_path, day1_path)
+    shutil.copytree(test1_path, day2_path)
+
+    change_csv(day2_path / 'demand.csv', {(i, 'Demand'): 900 + 10 * i for i in range(48)})
+    change_csv(day2_path / 'wind.csv', {(i, 'Wind'): 0.3 for i in range(48)})
+    change_csv(day2_path / 'initial_state.csv',
+               {('Coal1', 'PowerGeneration_MW'): 350, ('Gas1', 'NumCommited'): 1,
+                ('Gas1', 'PowerGeneration_MW'): 150, ('Battery1', 'StorageLevel_frac'): 0.2})
+
+    base_prob = build_day_model(make_day_prob(day1_path, tmp_path / 'day1'))
+    day1_constants = row_constants(base_prob['mod'])
+
+    prob = reuse_day_model(make_day_prob(day2_path, tmp_path / 'day2'), base_prob)
+    fresh_prob = build_day_model(make_day_prob(day2_path, tmp_path / 'day2'))
+
+    assert row_constants(prob['mod']) == row_constants(fresh_prob['mod'])
+    assert row_constants(prob['mod']) != day1_constants
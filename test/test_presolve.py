@@ -0,0 +1,21 @@
+import denkiuc.presolve as ps
+import pulp as pp
+
+
+def test_single_variable_rows_become_bounds():
+    num_built = pp.LpVariable('num_built', lowBound=0, cat='Integer')
+    energy = pp.LpVariable('energy', lowBound=0)
+    power = pp.LpVariable('power', lowBound=0)
+
+    mod = pp.LpProblem('test')
+    mod += energy + power
+    mod += num_built == 2, 'num_built_fixed'
+    mod += energy <= 100 * num_built, 'max_stored_energy'
+    mod += energy + power >= 50, 'meet_demand'
+
+    stats = ps.presolve_pulp_model(mod)
+
+    assert list(mod.constraints) == ['meet_demand']
+    assert (num_built.lowBound, num_built.upBound) == (2, 2)
+    assert energy.upBound == 200
+    assert stats == {'presolve_rows_removed': 2, 'presolve_cols_fixed': 1}
@@ -0,0 +1,53 @@
+import types
+import pulp as pp
+import denkiuc.pricing as pr
+
+
+def make_prob(tmp_path, demand):
+    """
+    min 10 n + p with p <= 4 n and p == demand, for 0 <= n <= 3 integer.
+    """
+    n = pp.LpVariable('n', lowBound=0, upBound=3, cat=pp.LpInteger)
+    p = pp.LpVariable('p', lowBound=0)
+    mod = pp.LpProblem('pricing', pp.LpMinimize)
+    mod += 10 * n + p
+    mod += p - 4 * n <= 0, 'capacity'
+    mod += p == demand, 'demand'
+
+    settings = {'MODEL_BACKEND': 'pulp', 'SOLVER': 'cbc', 'SOLVER_THREADS': 0,
+                'SOLVER_TIME_LIMIT': 10, 'SOLVER_REL_GAP': 0, 'SOLVER_PRESOLVE': True,
+                'SOLVER_CUTS': True}
+    vars = {'num_committed': types.SimpleNamespace(type='Integer', var={0: n}),
+            'power_generated': types.SimpleNamespace(type='Continuous', var={0: p})}
+
+    return {'name': 'pricing', 'mod': mod, 'settings': settings, 'vars': vars,
+            'paths': {'outputs': str(tmp_path)}}
+
+
+def test_integers_are_fixed_at_the_mip_solution(tmp_path):
+    prob = make_prob(tmp_path, 5)
+    prob['mod'].solve(pp.PULP_CBC_CMD(msg=0))
+    n = prob['vars']['num_committed'].var[0]
+
+    stats = pr.fix_integers_and_resolve(prob)
+
+    assert stats['optimality_status'] == 'Optimal'
+    assert (n.lowBound, n.upBound, n.cat) == (2, 2, pp.LpContinuous)
+    assert prob['mod'].constraints['demand'].pi == 1
+
+
+def test_no_resolve_without_a_mip_solution(tmp_path):
+    prob = make_prob(tmp_path, 20)
+    prob['mod'].solve(pp.PULP_CBC_CMD(msg=0))
+    n = prob['vars']['num_committed'].var[0]
+
+    assert pr.fix_integers_and_resolve(prob) is None
+    assert (n.lowBound, n.upBound, n.cat) == (0, 3, pp.LpInteger)
+
+
+def test_relax_integers():
+    prob = make_prob(None, 5)
+    pr.relax_integers(prob['vars'])
+
+    assert prob['vars']['num_committed'].type == 'Continuous'
+    assert prob['vars']['num_committed'].var[0].cat == pp.LpContinuous
@@ -0,0 +1,22 @@
+import denkiuc.load_data as ld
+import denkiuc.results_store as rs
+import denkiuc.variables as va
+import numpy as np
+
+
+def test_long_form_matches_result_df():
+    sets = [ld.dkSet('intervals', [0, 1, 2]), ld.dkSet('scenarios', [0, 1]),
+            ld.dkSet('units', ['Coal', 'Gas'])]
+    dkvar = va.dkVar('num_committed', '#Units', sets, 'I')
+    values = np.arange(12.) + 1e-9
+    values[3] = np.nan
+    dkvar.to_df(values)
+
+    long_df = rs.long_form(dkvar, [2])
+
+    assert list(long_df.columns) == ['intervals', 'scenarios', 'units', 'value', 'look_ahead']
+    assert long_df['units'].dtype == 'category'
+    assert long_df['look_ahead'].sum() == 4
+    wide_df = long_df.pivot(index='intervals', columns=['scenarios', 'units'], values='value')
+    assert (wide_df.to_numpy() == dkvar.result_df.to_numpy()).all()
+    assert wide_df.loc[0, (1, 'Gas')] == -9999
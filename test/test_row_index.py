@@ -0,0 +1,43 @@
+import denkiuc.load_data as ld
+import denkiuc.matrix_model as mm
+import denkiuc.row_index as ri
+
+
+def test_block_rows_map_back_to_index():
+    sets = {'intervals': ld.dkSet('intervals', [0, 1, 2]),
+            'scenarios': ld.dkSet('scenarios', [0, 1])}
+    row_index = ri.dkRowIndex()
+    blk = mm.dkBlock('storage_continuity', (2, 2), 'E', ('intervals', 'scenarios'),
+                     dim_offsets=(1, 0))
+    row_index.add_block(blk, sets, mm.dim_keys)
+
+    assert row_index.label('c3') == 'storage_continuity_i_2_s_1'
+    assert row_index.to_df()['i'].tolist() == [1, 1, 2, 2]
+
+
+def test_full_and_compact_labels_match():
+    row_index = ri.dkRowIndex()
+    label_format = 'power_lt_cap_%(u)s_i_%(i)d_s_%(s)d'
+    prob = {'settings': {'NAMING_MODE': 'compact'}, 'row_index': row_index}
+
+    row_name = ri.row_label(prob, label_format, i=4, s=1, u='Coal1')
+
+    prob['settings']['NAMING_MODE'] = 'full'
+    assert row_name == 'c0'
+    assert row_index.label(row_name) == ri.row_label(prob, label_format, i=4, s=1, u='Coal1')
+
+
+def test_units_and_reserves_are_stored_as_codes():
+    row_index = ri.dkRowIndex()
+    row_index.start_family('reserve_rows')
+    row_index.add_row('reserve_i_%(i)d_u_%(u)s_r_%(r)s', {'i': 0, 'u': 'Gas1', 'r': 'Raise'})
+    row_index.add_row('reserve_i_%(i)d_u_%(u)s_r_%(r)s', {'i': 1, 'u': 'Gas1', 'r': 'Lower'})
+    row_index.start_family('unit_rows')
+    row_index.add_row('unit_%(u)s', {'u': 'Coal1'})
+
+    arrays = row_index.arrays()
+    assert arrays['u'].dtype == 'int32'
+    assert arrays['u'].tolist() == [0, 0, 1]
+    assert arrays['s'].tolist() == [-1, -1, -1]
+    assert row_index.to_df()['Family'].tolist() == ['reserve_rows', 'reserve_rows', 'unit_rows']
+    assert row_index.label('c2') == 'unit_Coal1'
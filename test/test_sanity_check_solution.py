@@ -0,0 +1,26 @@
+import numpy as np
+import denkiuc.load_data as ld
+import denkiuc.sanity_check_solution as sc
+
+
+def test_window_totals():
+    values = np.arange(8.).reshape(4, 1, 2)
+    window_starts = np.array([[0, 0], [0, 1], [1, 2], [1, 4]])
+
+    totals = sc.window_totals(values, window_starts)
+
+    assert totals[:, 0, 0].tolist() == [0, 2, 6, 12]
+    assert totals[:, 0, 1].tolist() == [1, 3, 5, 0]
+
+
+def test_find_violations():
+    sets = {'intervals': ld.dkSet('intervals', [1, 2]), 'scenarios': ld.dkSet('scenarios', [0]),
+            'units': ld.dkSet('units', ['Coal', 'Gas'])}
+    value = np.array([[[10., 20.]], [[30., 40.]]])
+
+    violations = sc.find_violations({'sets': sets}, 0.005, 'power_lt_capacity', value,
+                                    np.array([10.001, 35.]), 'units')
+
+    assert violations.to_dict('records') == \
+        [{'rule': 'power_lt_capacity', 'i': 2, 's': 0, 'u': 'Coal', 'value': 30, 'limit': 10.001},
+         {'rule': 'power_lt_capacity', 'i': 2, 's': 0, 'u': 'Gas', 'value': 40, 'limit': 35}]
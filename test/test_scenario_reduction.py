@@ -0,0 +1,26 @@
+import numpy as np
+import pandas as pd
+import denkiuc.scenario_reduction as sr
+
+
+def make_traces():
+    demand = pd.DataFrame({0: [100, 100], 1: [101, 101], 2: [150, 150], 3: [99, 99]})
+    wind = pd.DataFrame({0: [0.5, 0.5], 1: [0.5, 0.5], 2: [0.2, 0.2], 3: [0.5, 0.5]})
+    return {'demand': demand, 'wind': wind}
+
+
+def test_reduce_traces_keeps_outlier_and_moves_probability():
+    traces, reduction = sr.reduce_traces(make_traces(), 4, 2)
+
+    assert reduction['kept'] == [0, 2]
+    assert reduction['probability'] == {0: 0.75, 1: 0.25}
+    assert list(traces['demand'].columns) == [0, 1]
+    assert traces['demand'][1].to_list() == [150, 150]
+    assert reduction['error'] > 0
+
+
+def test_fast_forward_selection_keeps_all_scenarios():
+    distances = sr.scenario_distances(make_traces(), [0, 1, 2, 3])
+    kept = sr.fast_forward_selection(distances, np.full(4, 0.25), 4)
+
+    assert kept == [0, 1, 2, 3]
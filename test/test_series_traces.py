@@ -0,0 +1,34 @@
+import denkiuc.arma_generator as ag
+import denkiuc.series_traces as st
+import numpy as np
+import os
+import pandas as pd
+
+
+deterministic_traces = {'demand': pd.DataFrame({'Demand': np.linspace(600., 1100., 12)}),
+                        'wind': pd.DataFrame({'Wind': np.linspace(0., 1., 12)})}
+settings = {'NUM_SCENARIOS': 3, 'SCENARIO_POOL_SIZE': 0, 'RANDOM_SEED': 11, 'ARMA_CHUNK_INTS': 5}
+
+
+def test_series_traces(tmp_path):
+    series_traces = st.load_series_traces(deterministic_traces, str(tmp_path), settings)
+    first_window = st.day_window(series_traces, 0, 6)
+    series_traces['generator'].join()
+    tensor_file = os.listdir(tmp_path / 'series_traces')
+    reloaded = st.load_series_traces(deterministic_traces, str(tmp_path), settings)
+
+    assert series_traces['values'].shape == (12, 2, 3)
+    assert tensor_file[0].endswith('.npy') and '.tmp' not in tensor_file[0]
+    assert (first_window['values'] == reloaded['values'][:6]).all()
+    assert os.listdir(tmp_path / 'series_traces') == tensor_file
+    assert (reloaded['values'] == series_traces['values']).all()
+
+    stochastic_traces = ag.add_arma_scenarios(settings, deterministic_traces,
+                                              ag.load_arma_values(str(tmp_path)))
+    window = st.day_window(series_traces, 4, 6)
+    traces = st.window_traces(window, 2)
+
+    assert np.shares_memory(window['values'], series_traces['values'])
+    assert np.shares_memory(traces['wind'].to_numpy(), series_traces['values'])
+    assert traces['demand'].index.to_list() == [4, 5, 6, 7, 8, 9]
+    assert (traces['wind'].to_numpy() == stochastic_traces['wind'].iloc[4:10, :2].to_numpy()).all()
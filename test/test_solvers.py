@@ -0,0 +1,43 @@
+import denkiuc.solvers as solvers
+import denkiuc.uc_model as uc
+import math
+import pulp as pp
+
+
+def test_read_cbc_log(tmp_path):
+    log_path = tmp_path / 'cbc.log'
+    log_path.write_text(
+        'Continuous objective value is 285022 - 0.44 seconds\n'
+        'Cbc0038I Pass   1: (1.25 seconds) suminf.    0.10000 (1) obj. 285106 iterations 36\n'
+        'Cbc0038I Solution found of 290000\n'
+        'Cbc0012I Integer solution of 286000 found by DiveCoefficient after 0 iterations and '
+        '0 nodes (2.70 seconds)\n'
+        'Result - Optimal solution found (within gap tolerance)\n'
+        '\n'
+        'Objective value:                286000.00000000\n'
+        'Lower bound:                    285500.000\n'
+        'Gap:                            0.00\n'
+        'Enumerated nodes:               12\n'
+        'Total iterations:               6429\n')
+
+    log_stats = solvers.read_cbc_log(log_path)
+
+    assert log_stats == {'mip_nodes': 12, 'mip_iterations': 6429, 'mip_best_bound': 285500,
+                         'mip_gap': 0, 'time_to_first_incumbent': 1.25}
+
+
+def test_objective_value_without_solution():
+    prob = {'settings': {'MODEL_BACKEND': 'matrix'}, 'solution': {'col_value': None}}
+
+    assert math.isnan(uc.objective_value(prob, None))
+
+
+def test_objective_value_of_infeasible_pulp_model():
+    x = pp.LpVariable('x', lowBound=0, upBound=1)
+    mod = pp.LpProblem('infeasible', pp.LpMinimize)
+    mod += 3 * x
+    mod += x >= 2
+    mod.solve(pp.PULP_CBC_CMD(msg=0))
+
+    assert x.value() is not None
+    assert math.isnan(uc.objective_value({'settings': {'MODEL_BACKEND': 'pulp'}}, mod))
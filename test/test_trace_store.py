@@ -0,0 +1,32 @@
+import denkiuc.trace_store as ts
+import os
+import shutil
+
+
+test1_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'test1')
+
+
+def test_trace_store(tmp_path):
+    inputs_path = tmp_path / 'test1'
+    shutil.copytree(test1_path, inputs_path)
+    with open(inputs_path / 'arma_trace_locations.csv', 'w') as f:
+        f.write('TraceName\ndemand\nwind\nsolarPV\n')
+    store_path = str(inputs_path / 'arma_traces')
+
+    traces = ts.load_traces(store_path, str(inputs_path), 4, 466)
+    fewer_traces = ts.load_traces(store_path, str(inputs_path), 2, 466)
+    other_seed_traces = ts.load_traces(store_path, str(inputs_path), 2, 5)
+
+    assert sorted(traces) == ['demand', 'solarPV', 'wind']
+    assert traces['demand'].shape == (48, 4)
+    assert fewer_traces['demand'].shape == (48, 2)
+    assert (fewer_traces['demand'].to_numpy() == traces['demand'].iloc[:, :2].to_numpy()).all()
+    assert not (other_seed_traces['demand'][1] == traces['demand'][1]).all()
+    assert len(os.listdir(store_path)) == 2
+
+    demand = (inputs_path / 'demand.csv').read_text()
+    (inputs_path / 'demand.csv').write_text(demand.replace('\n0,1000\n', '\n0,900\n'))
+    changed_traces = ts.load_traces(store_path, str(inputs_path), 2, 466)
+
+    assert changed_traces['demand'][0].to_list()[:2] == [900, 2070]
+    assert os.listdir(store_path) == [ts.entry_name(ts.inputs_hash(str(inputs_path)), 466)]
@@ -0,0 +1,36 @@
+import denkiuc.load_data as ld
+import denkiuc.variables as va
+import numpy as np
+
+
+def make_num_committed():
+    sets = [ld.dkSet('intervals', [0, 1]), ld.dkSet('scenarios', [0, 1]),
+            ld.dkSet('units', ['Coal', 'Gas'])]
+    return va.dkVar('num_committed', 'units', sets, 'I')
+
+
+def test_results_from_array_match_pulp_values():
+    dkvar = make_num_committed()
+    values = np.array([1, 0, 2, 1, 0, 0, 1, 1]) + 1e-9
+
+    for ind, value in zip(dkvar.sets_indices, values):
+        dkvar.var[ind].varValue = value
+    dkvar.to_df()
+    from_pulp_df = dkvar.result_df
+
+    dkvar.to_df(values)
+
+    assert dkvar.result_df.equals(from_pulp_df)
+    assert dkvar.result_df.loc[0, (1, 'Coal')] == 2
+    assert dkvar.result_df.loc[1, (0, 'Gas')] == 0
+    assert dkvar.result_df.columns.names == ['scenarios', 'units']
+
+
+def test_unsolved_values_are_filled():
+    dkvar = make_num_committed()
+    dkvar.var[(1, 1, 'Gas')].varValue = 3
+
+    dkvar.to_df()
+
+    assert dkvar.result_df.loc[1, (1, 'Gas')] == 3
+    assert dkvar.result_df.loc[0, (0, 'Coal')] == -9999